@@ -1,15 +1,24 @@
 from fastapi import APIRouter, HTTPException
-from app.models.schemas import CompileRequest, CompileResponse, SemanticResult, IntermediateCode, LintResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from app.models.schemas import (CompileRequest, CompileResponse, SemanticResult, IntermediateCode, LintResponse,
+                                RunRequest, RunResponse)
 from app.compiler.lexer import Lexer
 from app.compiler.parser import Parser
-from app.compiler.semantic import SemanticAnalyzer
+from app.compiler.semantic import SemanticAnalyzer, SemanticCache
 from app.compiler.intermediate import IntermediateCodeGenerator
 from app.compiler.generator import CodeGenerator
+from app.compiler.codeobject import CodeObjectGenerator, code_cache
 from app.compiler.optimizer import CodeOptimizer
+from app.compiler.sandbox import worker_pool, RunLimits, BACKENDS, BACKEND_PYTHON
+from app.compiler.disk_cache import disk_cache
 import time
 
 router = APIRouter()
 
+# Caché compartida entre peticiones: al editar una función solo se re-analiza esa función
+semantic_cache = SemanticCache()
+
 # Añadir al final del archivo compile.py, antes del cierre del router
 
 @router.post("/lint", response_model=LintResponse)
@@ -51,7 +60,7 @@ async def lint_code(request: CompileRequest):
     
     if ast:
         try:
-            semantic_analyzer = SemanticAnalyzer()
+            semantic_analyzer = SemanticAnalyzer(cache=semantic_cache)
             semantic_result = semantic_analyzer.analyze(ast)
             semantic_errors = semantic_result.errors
             semantic_warnings = semantic_result.warnings
@@ -88,6 +97,19 @@ async def compile_code(request: CompileRequest):
     
     print("=== INICIANDO COMPILACIÓN ===")
     print(f"Código recibido:\n{request.code}")
+
+    # Caché en disco compartida entre procesos: el mismo programa con el mismo compilador no se recompila
+    if disk_cache is not None:
+        try:
+            cached = disk_cache.load(request.code, request.optimization_level)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo la caché en disco: {e}")
+            cached = None
+        if cached is not None:
+            response = CompileResponse(**cached)
+            response.metrics = dict(response.metrics or {}, cached=True, compilation_time=time.time() - start_time)
+            print("=== COMPILACIÓN RECUPERADA DE LA CACHÉ EN DISCO ===")
+            return response
     
     # Inicializar métricas
     metrics = {
@@ -123,7 +145,7 @@ async def compile_code(request: CompileRequest):
     
     if ast:
         try:
-            semantic_analyzer = SemanticAnalyzer()
+            semantic_analyzer = SemanticAnalyzer(cache=semantic_cache)
             semantic_result = semantic_analyzer.analyze(ast)
             semantic_errors = semantic_result.errors
             semantic_warnings = semantic_result.warnings
@@ -164,16 +186,23 @@ async def compile_code(request: CompileRequest):
     optimized_code = None
     if intermediate_code and intermediate_code.quadruples and success:
         try:
-            optimizer = CodeOptimizer()
-            optimized_quadruples = optimizer.optimize(intermediate_code.quadruples)
+            optimizer = CodeOptimizer(level=request.optimization_level, symbol_table=symbol_table)
+            # Se optimiza una copia del almacén: el original se muestra como código intermedio
+            optimized_store = optimizer.optimize_store(code_generator.store.copy())
             
             # Crear un nuevo objeto IntermediateCode para el código optimizado
+            temporal_counter = intermediate_code.temporal_counter
+            if optimizer.temporaries is not None:
+                temporal_counter = optimizer.temporaries.temporal_counter
+                metrics["temporals_peak_live"] = optimizer.temporaries.peak_live
             optimized_code = IntermediateCode(
-                quadruples=optimized_quadruples,
-                temporal_counter=intermediate_code.temporal_counter,
+                quadruples=optimized_store.to_quadruples(),
+                temporal_counter=temporal_counter,
                 label_counter=intermediate_code.label_counter
             )
             print(f"Código optimizado exitosamente: {len(intermediate_code.quadruples)} -> {len(optimized_code.quadruples)} cuádruplos")
+            metrics["optimization_level"] = optimizer.level
+            metrics["optimization_report"] = optimizer.get_optimization_report()
         except Exception as e:
             print(f"Error en optimización: {str(e)}")
             all_errors.append(f"Error en optimización: {str(e)}")
@@ -194,6 +223,8 @@ async def compile_code(request: CompileRequest):
         try:
             object_gen = CodeGenerator(symbol_table)
             object_code = object_gen.generate(quads_to_generate)
+            # El objeto código se construye del AST de Python y queda en caché junto al texto
+            code_cache.put(object_code, CodeObjectGenerator(symbol_table).compile_generated(object_gen))
             print("Código objeto Python generado exitosamente.")
         except Exception as e:
             print(f"Error en generación de código objeto: {str(e)}")
@@ -222,7 +253,61 @@ async def compile_code(request: CompileRequest):
             warnings=all_warnings,
             metrics=metrics
         )
-        return response
     except Exception as e:
         print(f"Error creando respuesta: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error al serializar la respuesta: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al serializar la respuesta: {e}")
+
+    if disk_cache is not None:
+        try:
+            # El código intermedio se guarda en el formato binario, no como JSON
+            intermediate = {"intermediate_code": intermediate_code, "optimized_code": optimized_code}
+            disk_cache.store(request.code, request.optimization_level,
+                             jsonable_encoder(response, exclude=set(intermediate)), intermediate)
+        except (OSError, ValueError) as e:
+            print(f"Error guardando en la caché en disco: {e}")
+    return response
+
+@router.post("/run", response_model=RunResponse)
+async def run_code(request: RunRequest):
+    """
+    Compila el programa y lo ejecuta en el pool de trabajadores con límites de CPU, memoria y salida
+    """
+    if request.backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Backend desconocido: {request.backend}")
+
+    compiled = await compile_code(CompileRequest(code=request.code, optimization_level=request.optimization_level))
+    if not compiled.success or not compiled.object_code:
+        return RunResponse(success=False, status="compile_error", errors=compiled.errors,
+                           warnings=compiled.warnings, metrics=compiled.metrics)
+
+    # Los límites del cliente solo pueden ser más estrictos que los del servidor
+    server = worker_pool.limits
+    limits = RunLimits(
+        cpu_time=min(request.cpu_time or server.cpu_time, server.cpu_time),
+        wall_time=server.wall_time,
+        memory=server.memory,
+        max_output=min(request.max_output or server.max_output, server.max_output),
+        max_steps=server.max_steps
+    )
+
+    if request.backend == BACKEND_PYTHON:
+        code = code_cache.code_for(compiled.object_code)
+        result = await run_in_threadpool(worker_pool.run_python, code, limits)
+    else:
+        quadruples = (compiled.optimized_code or compiled.intermediate_code).quadruples
+        result = await run_in_threadpool(worker_pool.run_quadruples, quadruples, limits)
+
+    errors = [result["error"]] if result["error"] else []
+    metrics = dict(compiled.metrics or {})
+    metrics["run"] = {key: result.get(key) for key in ("elapsed", "cpu_time", "worker", "instructions")}
+    metrics["run"]["backend"] = request.backend
+    return RunResponse(
+        success=result["status"] == "ok",
+        status=result["status"],
+        output=result["output"],
+        truncated=result["truncated"],
+        return_value=result["return_value"],
+        errors=errors,
+        warnings=compiled.warnings,
+        metrics=metrics
+    )
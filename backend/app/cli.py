@@ -0,0 +1,244 @@
+"""Compilador por lotes desde la línea de comandos.
+
+Compila archivos (rutas, patrones glob o directorios) con el mismo
+pipeline que /api/compile, repartiéndolos en un pool de procesos, y
+escribe los artefactos pedidos junto a un resumen de tiempos y errores.
+
+Uso (desde backend/):
+    python -m app.cli programas/*.src -O O2 --emit py,opt -o salida -j 4
+    python -m app.cli programas/ --pattern "*.src" --json
+"""
+from app.models.schemas import IntermediateCode
+from app.compiler.lexer import Lexer
+from app.compiler.parser import Parser
+from app.compiler.semantic import SemanticAnalyzer
+from app.compiler.intermediate import IntermediateCodeGenerator
+from app.compiler.optimizer import CodeOptimizer
+from app.compiler.generator import CodeGenerator
+from app.compiler import ir_binary
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import argparse
+import contextlib
+import fnmatch
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+LEVELS = ("O0", "O1", "O2", "O3")
+# Artefacto -> extensión del archivo que se escribe
+ARTIFACTS = {
+    "ir": ".ir.json",  # Código intermedio (IntermediateCode en JSON)
+    "opt": ".opt.json",  # Código intermedio optimizado
+    "qir": ".qir",  # Código intermedio optimizado en el formato binario de ir_binary
+    "py": ".py",  # Código objeto Python
+}
+
+def expand_inputs(inputs: List[str], pattern: str) -> List[str]:
+    """Rutas de los archivos a compilar: archivos, patrones glob (con **) y directorios"""
+    paths: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for directory, _, names in os.walk(item):
+                paths.extend(os.path.join(directory, name) for name in sorted(names)
+                             if fnmatch.fnmatch(name, pattern))
+        elif glob.has_magic(item):
+            paths.extend(path for path in sorted(glob.glob(item, recursive=True)) if os.path.isfile(path))
+        else:
+            paths.append(item)
+    seen = set()
+    return [path for path in paths if not (path in seen or seen.add(path))]
+
+def output_base(path: str, root: Optional[str], output: str) -> str:
+    """Ruta de salida sin extensión, conservando la estructura relativa a ``root``"""
+    relative = os.path.relpath(path, root) if root else os.path.basename(path)
+    if relative.startswith(".."):
+        relative = os.path.basename(path)
+    return os.path.join(output, os.path.splitext(relative)[0])
+
+def compile_file(path: str, level: str, emit: List[str], output: Optional[str],
+                 root: Optional[str]) -> Dict[str, Any]:
+    """Compila un archivo y escribe sus artefactos. Se ejecuta en un proceso del pool"""
+    result: Dict[str, Any] = {"path": path, "success": False, "errors": [], "warnings": [],
+                              "timings": {}, "quadruples": 0, "optimized_quadruples": 0, "written": []}
+    timings = result["timings"]
+    started = time.perf_counter()
+
+    def phase(name: str, mark: float) -> float:
+        now = time.perf_counter()
+        timings[name] = now - mark
+        return now
+
+    try:
+        source_file = open(path, "rb")
+    except OSError as e:
+        result["errors"].append(f"No se pudo leer el archivo: {e}")
+        return result
+
+    # Las fases imprimen su progreso; en lote solo interesa el resumen
+    with source_file, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            mark = time.perf_counter()
+            # El parser consume los tokens a medida que el lexer los lee del mmap:
+            # ni el texto ni la lista de tokens llegan a estar enteros en memoria
+            lexer = Lexer()
+            ast, parser_errors = Parser().parse(lexer.stream_file(source_file))
+            mark = phase("lexer+parser", mark)
+            result["errors"] = lexer.errors + parser_errors
+            if ast is None or result["errors"]:
+                return finish(result, started)
+            semantic = SemanticAnalyzer().analyze(ast)
+            mark = phase("semantic", mark)
+            result["errors"] += semantic.errors
+            result["warnings"] += semantic.warnings
+            if result["errors"]:
+                return finish(result, started)
+            intermediate_generator = IntermediateCodeGenerator(semantic.symbol_table)
+            intermediate = intermediate_generator.generate(ast)
+            mark = phase("intermediate", mark)
+            optimizer = CodeOptimizer(level=level, symbol_table=semantic.symbol_table)
+            optimized_store = optimizer.optimize_store(intermediate_generator.store.copy())
+            temporal_counter = intermediate.temporal_counter
+            if optimizer.temporaries is not None:
+                temporal_counter = optimizer.temporaries.temporal_counter
+            optimized = IntermediateCode(quadruples=optimized_store.to_quadruples(),
+                                         temporal_counter=temporal_counter,
+                                         label_counter=intermediate.label_counter)
+            mark = phase("optimizer", mark)
+            python = CodeGenerator(semantic.symbol_table).generate(optimized.quadruples)
+            mark = phase("generator", mark)
+        except Exception as e:
+            result["errors"].append(f"Error interno del compilador: {e}")
+            return finish(result, started)
+
+    result["quadruples"] = len(intermediate.quadruples)
+    result["optimized_quadruples"] = len(optimized.quadruples)
+    if output is not None:
+        contents = {
+            "ir": lambda: intermediate.model_dump_json(indent=2),
+            "opt": lambda: optimized.model_dump_json(indent=2),
+            "qir": lambda: ir_binary.encode_store(optimized_store, optimized.temporal_counter,
+                                                  optimized.label_counter),
+            "py": lambda: python,
+        }
+        base = output_base(path, root, output)
+        try:
+            os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+            for artifact in emit:
+                target = base + ARTIFACTS[artifact]
+                data = contents[artifact]()
+                mode = "wb" if isinstance(data, bytes) else "w"
+                with open(target, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as artifact_file:
+                    artifact_file.write(data)
+                result["written"].append(target)
+        except OSError as e:
+            result["errors"].append(f"No se pudieron escribir los artefactos: {e}")
+            return finish(result, started)
+        phase("write", mark)
+    result["success"] = True
+    return finish(result, started)
+
+def finish(result: Dict[str, Any], started: float) -> Dict[str, Any]:
+    result["timings"]["total"] = time.perf_counter() - started
+    return result
+
+def summarize(results: List[Dict[str, Any]], elapsed: float, jobs: int) -> Dict[str, Any]:
+    phases: Dict[str, float] = {}
+    for result in results:
+        for name, seconds in result["timings"].items():
+            phases[name] = phases.get(name, 0.0) + seconds
+    failed = [result for result in results if not result["success"]]
+    slowest = sorted(results, key=lambda result: result["timings"].get("total", 0.0), reverse=True)[:5]
+    return {
+        "files": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "errors": sum(len(result["errors"]) for result in results),
+        "warnings": sum(len(result["warnings"]) for result in results),
+        "jobs": jobs,
+        "elapsed": elapsed,
+        "files_per_second": len(results) / elapsed if elapsed > 0 else None,
+        "phase_totals": phases,
+        "slowest": [{"path": result["path"], "total": result["timings"].get("total", 0.0)} for result in slowest],
+    }
+
+def print_report(results: List[Dict[str, Any]], summary: Dict[str, Any], verbose: bool):
+    for result in results:
+        total = result["timings"].get("total", 0.0)
+        status = "OK   " if result["success"] else "ERROR"
+        detail = (f"{result['quadruples']} -> {result['optimized_quadruples']} cuádruplos"
+                  if result["success"] else f"{len(result['errors'])} errores")
+        if result["success"] and not verbose:
+            continue
+        print(f"{status} {result['path']} ({1000 * total:.1f} ms, {detail})")
+        for error in result["errors"]:
+            print(f"      {error}")
+        if verbose:
+            for warning in result["warnings"]:
+                print(f"      advertencia: {warning}")
+    print(f"\n{summary['files']} archivos: {summary['succeeded']} compilados, {summary['failed']} con errores "
+          f"({summary['errors']} errores, {summary['warnings']} advertencias)")
+    rate = summary["files_per_second"]
+    print(f"Tiempo total {summary['elapsed']:.2f} s con {summary['jobs']} procesos"
+          + (f" ({rate:.1f} archivos/s)" if rate else ""))
+    phases = summary["phase_totals"]
+    if phases:
+        print("Tiempo acumulado por fase: " + ", ".join(
+            f"{name} {seconds:.2f} s" for name, seconds in phases.items() if name != "total"))
+    if verbose and summary["slowest"]:
+        print("Más lentos: " + ", ".join(
+            f"{item['path']} ({1000 * item['total']:.1f} ms)" for item in summary["slowest"]))
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Compilador por lotes")
+    parser.add_argument("inputs", nargs="+", help="archivos, patrones glob (admiten **) o directorios")
+    parser.add_argument("-O", "--level", default="O2", choices=LEVELS, help="nivel de optimización")
+    parser.add_argument("-o", "--output", help="directorio donde escribir los artefactos")
+    parser.add_argument("--emit", default="py",
+                        help=f"artefactos separados por comas: {', '.join(ARTIFACTS)} (por defecto py)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="procesos del pool")
+    parser.add_argument("--pattern", default="*.src", help="archivos a tomar de los directorios")
+    parser.add_argument("--json", action="store_true", help="resultado en JSON por la salida estándar")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar también los archivos correctos")
+    arguments = parser.parse_args(argv)
+    arguments.emit = [artifact.strip() for artifact in arguments.emit.split(",") if artifact.strip()]
+    unknown = [artifact for artifact in arguments.emit if artifact not in ARTIFACTS]
+    if unknown:
+        parser.error(f"artefactos desconocidos: {', '.join(unknown)}")
+    if arguments.jobs < 1:
+        parser.error("--jobs debe ser al menos 1")
+    return arguments
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = parse_arguments(argv)
+    paths = expand_inputs(arguments.inputs, arguments.pattern)
+    if not paths:
+        print("No hay archivos que compilar", file=sys.stderr)
+        return 2
+    # Con un único directorio de entrada se conserva su estructura en la salida
+    root = arguments.inputs[0] if len(arguments.inputs) == 1 and os.path.isdir(arguments.inputs[0]) else None
+    jobs = min(arguments.jobs, len(paths))
+    task = (arguments.level, arguments.emit, arguments.output, root)
+
+    started = time.perf_counter()
+    if jobs == 1:
+        results = [compile_file(path, *task) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunk = max(1, len(paths) // (jobs * 8))
+            results = list(pool.map(compile_file, paths, *([value] * len(paths) for value in task),
+                                    chunksize=chunk))
+    summary = summarize(results, time.perf_counter() - started, jobs)
+
+    if arguments.json:
+        json.dump({"summary": summary, "files": results}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(results, summary, arguments.verbose)
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
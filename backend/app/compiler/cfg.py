@@ -0,0 +1,251 @@
+from app.compiler.ir import QuadrupleStore, JUMP, LABEL, RETURN, TOMBSTONE
+from typing import List, Dict, Optional, Set
+
+class BasicBlock:
+    """Bloque básico: rango [start, end) de índices del QuadrupleStore"""
+    def __init__(self, block_id: int, start: int, end: int):
+        self.id = block_id
+        self.start = start
+        self.end = end
+        self.label: Optional[int] = None  # id de la etiqueta que abre el bloque
+        self.successors: List[int] = []
+        self.predecessors: List[int] = []
+
+    def indices(self, store: QuadrupleStore) -> List[int]:
+        """Índices vivos del bloque, en orden"""
+        kinds = store.kinds
+        return [i for i in range(self.start, self.end) if kinds[i] != TOMBSTONE]
+
+    def last(self, store: QuadrupleStore) -> Optional[int]:
+        """Último índice vivo del bloque"""
+        kinds = store.kinds
+        for i in range(self.end - 1, self.start - 1, -1):
+            if kinds[i] != TOMBSTONE:
+                return i
+        return None
+
+    def __repr__(self) -> str:
+        return f"BasicBlock({self.id}, [{self.start}:{self.end}), succ={self.successors})"
+
+class NaturalLoop:
+    """Bucle natural: cabecera, nodos que saltan de vuelta (latches) y cuerpo"""
+    def __init__(self, header: int):
+        self.header = header
+        self.latches: List[int] = []
+        self.body: Set[int] = {header}
+
+    def __repr__(self) -> str:
+        return f"NaturalLoop(header={self.header}, body={sorted(self.body)})"
+
+class ControlFlowGraph:
+    """Grafo de flujo de control de una función del código intermedio"""
+    def __init__(self, store: QuadrupleStore, start: int, end: int, name: Optional[str] = None):
+        self.store = store
+        self.start = start
+        self.end = end
+        self.name = name
+        self.blocks: List[BasicBlock] = []
+        self.label_blocks: Dict[int, int] = {}  # id de etiqueta -> bloque
+        self.block_of_index: Dict[int, int] = {}
+
+        self.build_blocks()
+        self.build_edges()
+        self.order = self.reverse_postorder()
+        self.idom = self.compute_dominators()
+        self.loops = self.find_loops()
+
+    @property
+    def entry(self) -> int:
+        return 0
+
+    def build_blocks(self):
+        """Particiona el rango en bloques básicos en una sola pasada"""
+        store = self.store
+        kinds, result = store.kinds, store.result
+        block_start = None
+        block_open = False
+
+        for i in range(self.start, self.end):
+            kind = kinds[i]
+            if kind == TOMBSTONE:
+                continue
+            # Las etiquetas abren un bloque nuevo (salvo que el bloque actual esté vacío)
+            if kind == LABEL and block_open:
+                self.close_block(block_start, i)
+                block_open = False
+            if not block_open:
+                block_start = i
+                block_open = True
+                if kind == LABEL:
+                    self.label_blocks[result[i]] = len(self.blocks)
+            # Los saltos y returns cierran el bloque
+            if kind == JUMP or kind == RETURN:
+                self.close_block(block_start, i + 1)
+                block_open = False
+
+        if block_open:
+            self.close_block(block_start, self.end)
+
+    def close_block(self, start: int, end: int):
+        block = BasicBlock(len(self.blocks), start, end)
+        if self.store.kinds[start] == LABEL:
+            block.label = self.store.result[start]
+        self.blocks.append(block)
+
+    def build_edges(self):
+        store = self.store
+        for block in self.blocks:
+            last = block.last(store)
+            fallthrough = block.id + 1 if block.id + 1 < len(self.blocks) else None
+            targets = []
+            if last is not None and store.kinds[last] == JUMP:
+                target = self.label_blocks.get(store.result[last])
+                if target is not None:
+                    targets.append(target)
+                if store.operator(last) != "" and fallthrough is not None:
+                    targets.append(fallthrough)  # Salto condicional
+            elif last is not None and store.kinds[last] == RETURN:
+                pass
+            elif fallthrough is not None:
+                targets.append(fallthrough)
+
+            for target in targets:
+                if target not in block.successors:
+                    block.successors.append(target)
+                    self.blocks[target].predecessors.append(block.id)
+
+    def reverse_postorder(self) -> List[int]:
+        """Bloques alcanzables desde la entrada en orden postorden inverso"""
+        if not self.blocks:
+            return []
+        visited = [False] * len(self.blocks)
+        postorder = []
+        stack = [(self.entry, 0)]
+        visited[self.entry] = True
+        while stack:
+            block_id, child = stack[-1]
+            successors = self.blocks[block_id].successors
+            if child < len(successors):
+                stack[-1] = (block_id, child + 1)
+                succ = successors[child]
+                if not visited[succ]:
+                    visited[succ] = True
+                    stack.append((succ, 0))
+            else:
+                stack.pop()
+                postorder.append(block_id)
+        postorder.reverse()
+        return postorder
+
+    def compute_dominators(self) -> List[Optional[int]]:
+        """Dominadores inmediatos (Cooper, Harvey y Kennedy) sobre el orden RPO"""
+        idom: List[Optional[int]] = [None] * len(self.blocks)
+        if not self.order:
+            return idom
+        position = {block_id: i for i, block_id in enumerate(self.order)}
+        idom[self.entry] = self.entry
+
+        def intersect(a: int, b: int) -> int:
+            while a != b:
+                while position[a] > position[b]:
+                    a = idom[a]
+                while position[b] > position[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for block_id in self.order[1:]:
+                new_idom = None
+                for pred in self.blocks[block_id].predecessors:
+                    if idom[pred] is None:
+                        continue
+                    new_idom = pred if new_idom is None else intersect(pred, new_idom)
+                if new_idom is not None and idom[block_id] != new_idom:
+                    idom[block_id] = new_idom
+                    changed = True
+        return idom
+
+    def is_reachable(self, block_id: int) -> bool:
+        return self.idom[block_id] is not None
+
+    def dominates(self, a: int, b: int) -> bool:
+        """True si el bloque a domina al bloque b"""
+        if self.idom[b] is None:
+            return False
+        while True:
+            if a == b:
+                return True
+            parent = self.idom[b]
+            if parent == b:
+                return False
+            b = parent
+
+    def dominator_tree(self) -> Dict[int, List[int]]:
+        """Hijos de cada bloque en el árbol de dominadores"""
+        children: Dict[int, List[int]] = {block.id: [] for block in self.blocks}
+        for block_id in self.order[1:]:
+            children[self.idom[block_id]].append(block_id)
+        return children
+
+    def dominance_frontiers(self) -> Dict[int, Set[int]]:
+        """Frontera de dominancia de cada bloque alcanzable (Cooper, Harvey y Kennedy)"""
+        frontiers: Dict[int, Set[int]] = {block_id: set() for block_id in self.order}
+        for block_id in self.order:
+            preds = [pred for pred in self.blocks[block_id].predecessors if self.is_reachable(pred)]
+            if len(preds) < 2:
+                continue
+            for pred in preds:
+                runner = pred
+                while runner != self.idom[block_id]:
+                    frontiers[runner].add(block_id)
+                    if runner == self.idom[runner]:
+                        break
+                    runner = self.idom[runner]
+        return frontiers
+
+    def find_loops(self) -> List[NaturalLoop]:
+        """Detecta bucles naturales a partir de las aristas de retroceso"""
+        loops: Dict[int, NaturalLoop] = {}
+        for block_id in self.order:
+            for succ in self.blocks[block_id].successors:
+                if not self.dominates(succ, block_id):
+                    continue
+                loop = loops.setdefault(succ, NaturalLoop(succ))
+                loop.latches.append(block_id)
+                worklist = [block_id]
+                while worklist:
+                    node = worklist.pop()
+                    if node in loop.body:
+                        continue
+                    loop.body.add(node)
+                    worklist.extend(self.blocks[node].predecessors)
+        return list(loops.values())
+
+    def single_predecessor(self, block_id: int) -> Optional[int]:
+        """Predecesor único alcanzable del bloque, si existe"""
+        preds = self.blocks[block_id].predecessors
+        if len(preds) == 1 and block_id != self.entry:
+            return preds[0]
+        return None
+
+def function_ranges(store: QuadrupleStore) -> List[tuple]:
+    """Divide el almacén en rangos (inicio, fin, nombre) por etiqueta func_"""
+    kinds, result = store.kinds, store.result
+    ranges = []
+    start, name = 0, None
+    for i in range(len(store)):
+        if kinds[i] == LABEL:
+            label = store.operand_text(result[i])
+            if label.startswith("func_"):
+                if i > start:
+                    ranges.append((start, i, name))
+                start, name = i, label[len("func_"):]
+    if len(store) > start:
+        ranges.append((start, len(store), name))
+    return ranges
+
+def build_cfgs(store: QuadrupleStore) -> List[ControlFlowGraph]:
+    """Construye un CFG por función"""
+    return [ControlFlowGraph(store, start, end, name) for start, end, name in function_ranges(store)]
@@ -0,0 +1,311 @@
+from app.models.schemas import Quadruple
+from app.compiler.ir import NO_LINE
+from app.compiler.vm import (VMProgram, VMFunction, VirtualMachine, ExecutionResult,
+                             OP_BINARY, OP_MOVE, OP_JUMP_IF_FALSE, OP_GOTO, OP_ARGUMENT, OP_CALL, OP_RETURN,
+                             OP_PRINT, OP_ADD, OP_SUB, OP_MUL, OP_LT, OP_LE, OP_GT, OP_GE, OP_EQ, OP_NE,
+                             DEFAULT_MAX_STEPS, DEFAULT_TIME_LIMIT, DEFAULT_MAX_DEPTH, CHECK_INTERVAL)
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+
+# Un bloque es una lista [operaciones, tamaño, terminador]: las operaciones son
+# cierres f -> None que se ejecutan en orden y el terminador devuelve el bloque
+# siguiente. Las llamadas y los retornos son bloques especiales que resuelve el
+# bucle de ejecución: [función, CALL_BLOCK, (destino, bloque de vuelta)] y
+# [posición del valor, RETURN_BLOCK, None].
+CALL_BLOCK = -1
+RETURN_BLOCK = -2
+
+COMPARISON_OPCODES = frozenset((OP_LT, OP_LE, OP_GT, OP_GE, OP_EQ, OP_NE))
+
+# --- Cierres por operación, con los operandos capturados como posiciones del marco ---
+
+def add_slots(a, b, c):
+    def op(f): f[c] = f[a] + f[b]
+    return op
+
+def add_constant(a, k, c):
+    def op(f): f[c] = f[a] + k
+    return op
+
+def sub_slots(a, b, c):
+    def op(f): f[c] = f[a] - f[b]
+    return op
+
+def sub_constant(a, k, c):
+    def op(f): f[c] = f[a] - k
+    return op
+
+def mul_slots(a, b, c):
+    def op(f): f[c] = f[a] * f[b]
+    return op
+
+def mul_constant(a, k, c):
+    def op(f): f[c] = f[a] * k
+    return op
+
+def lt_slots(a, b, c):
+    def op(f): f[c] = f[a] < f[b]
+    return op
+
+def lt_constant(a, k, c):
+    def op(f): f[c] = f[a] < k
+    return op
+
+def le_slots(a, b, c):
+    def op(f): f[c] = f[a] <= f[b]
+    return op
+
+def le_constant(a, k, c):
+    def op(f): f[c] = f[a] <= k
+    return op
+
+def gt_slots(a, b, c):
+    def op(f): f[c] = f[a] > f[b]
+    return op
+
+def gt_constant(a, k, c):
+    def op(f): f[c] = f[a] > k
+    return op
+
+def ge_slots(a, b, c):
+    def op(f): f[c] = f[a] >= f[b]
+    return op
+
+def ge_constant(a, k, c):
+    def op(f): f[c] = f[a] >= k
+    return op
+
+def eq_slots(a, b, c):
+    def op(f): f[c] = f[a] == f[b]
+    return op
+
+def eq_constant(a, k, c):
+    def op(f): f[c] = f[a] == k
+    return op
+
+def ne_slots(a, b, c):
+    def op(f): f[c] = f[a] != f[b]
+    return op
+
+def ne_constant(a, k, c):
+    def op(f): f[c] = f[a] != k
+    return op
+
+def generic_binary(fn, a, b, c):
+    def op(f): f[c] = fn(f[a], f[b])
+    return op
+
+def move_slot(a, c):
+    def op(f): f[c] = f[a]
+    return op
+
+def move_constant(k, c):
+    def op(f): f[c] = k
+    return op
+
+def append_slot(append, a):
+    def op(f): append(f[a])
+    return op
+
+# (código de operación) -> (fábrica con dos posiciones, fábrica con constante a la derecha)
+SPECIALIZED_CLOSURES = {
+    OP_ADD: (add_slots, add_constant), OP_SUB: (sub_slots, sub_constant), OP_MUL: (mul_slots, mul_constant),
+    OP_LT: (lt_slots, lt_constant), OP_LE: (le_slots, le_constant), OP_GT: (gt_slots, gt_constant),
+    OP_GE: (ge_slots, ge_constant), OP_EQ: (eq_slots, eq_constant), OP_NE: (ne_slots, ne_constant)
+}
+
+# --- Terminadores ---
+
+def goto(target):
+    def term(f): return target
+    return term
+
+def branch(a, fallthrough, target):
+    def term(f): return fallthrough if f[a] else target
+    return term
+
+def compare_branch(fn, a, b, c, fallthrough, target):
+    """Comparación fusionada con el salto condicional que la consume"""
+    def term(f):
+        value = f[c] = fn(f[a], f[b])
+        return fallthrough if value else target
+    return term
+
+class ClosureFunction:
+    def __init__(self, function: VMFunction):
+        self.name = function.name
+        self.template = function.template
+        self.parameter_start = function.parameter_start
+        self.parameter_count = function.parameter_count
+        self.entry: list = []
+
+class ClosureProgram:
+    """VMProgram convertido en bloques de cierres encadenados.
+
+    Cada instrucción predecodificada se convierte en un cierre que ya tiene
+    capturadas sus posiciones del marco (y el valor de las constantes), de
+    modo que ejecutar un bloque es una llamada por cuádruplo sin decodificar
+    nada. Una comparación seguida del salto que la lee se fusiona en el
+    terminador del bloque.
+    """
+    def __init__(self, program: VMProgram):
+        self.function_index = program.function_index
+        self.functions = [ClosureFunction(function) for function in program.functions]
+        self.arguments: List[Any] = []  # Argumentos de la próxima llamada (los llenan los cierres)
+        self.output: List[Any] = []
+        self.block_lines: Dict[int, int] = {}  # id(bloque) -> primera línea de origen
+        self.lock = threading.Lock()  # Los cierres comparten argumentos y salida
+        for closure_function, function in zip(self.functions, program.functions):
+            self.compile_function(closure_function, function)
+
+    @classmethod
+    def from_quadruples(cls, quadruples: List[Quadruple]) -> "ClosureProgram":
+        return cls(VMProgram.from_quadruples(quadruples))
+
+    def compile_function(self, target: ClosureFunction, function: VMFunction):
+        code = function.code
+        leaders = {0}
+        for offset, (opcode, a, b, c, fn) in enumerate(code):
+            if opcode == OP_JUMP_IF_FALSE or opcode == OP_GOTO:
+                leaders.add(c)
+                leaders.add(offset + 1)
+            elif opcode == OP_CALL or opcode == OP_RETURN:
+                leaders.add(offset + 1)
+        starts = sorted(leader for leader in leaders if leader < len(code))
+        blocks = {start: [(), 0, None] for start in starts}  # Se rellenan después: hay saltos hacia atrás
+
+        for position, start in enumerate(starts):
+            end = starts[position + 1] if position + 1 < len(starts) else len(code)
+            following = blocks.get(end)
+            block = blocks[start]
+            operations = [self.operation(code[offset], function) for offset in range(start, end)
+                          if code[offset][0] not in (OP_JUMP_IF_FALSE, OP_GOTO, OP_CALL, OP_RETURN)]
+            opcode, a, b, c, fn = code[end - 1]
+            if opcode == OP_JUMP_IF_FALSE:
+                previous = code[end - 2] if end - 2 >= start else None
+                if previous is not None and previous[0] in COMPARISON_OPCODES and previous[3] == a:
+                    operations.pop()
+                    block[2] = compare_branch(previous[4], previous[1], previous[2], previous[3], following, blocks[c])
+                else:
+                    block[2] = branch(a, following, blocks[c])
+            elif opcode == OP_GOTO:
+                block[2] = goto(blocks[c])
+            elif opcode == OP_CALL:
+                site = [self.functions[a], CALL_BLOCK, (c, following)]
+                block[2] = goto(site)
+            elif opcode == OP_RETURN:
+                block[2] = goto([a, RETURN_BLOCK, None])
+            else:
+                block[2] = goto(following)
+            block[0] = tuple(operations)
+            block[1] = end - start  # Instrucciones de la VM que representa el bloque
+            lines = [line for line in function.lines[start:end] if line != NO_LINE]
+            self.block_lines[id(block)] = lines[0] if lines else NO_LINE
+        target.entry = blocks[0]
+
+    def operation(self, instruction: tuple, function: VMFunction) -> Callable:
+        opcode, a, b, c, fn = instruction
+        template, constants_end = function.template, function.parameter_start
+
+        def is_constant(slot: int) -> bool:
+            return slot < constants_end
+
+        if opcode in SPECIALIZED_CLOSURES:
+            with_slots, with_constant = SPECIALIZED_CLOSURES[opcode]
+            if is_constant(b) and not is_constant(a):
+                return with_constant(a, template[b], c)
+            return with_slots(a, b, c)
+        if opcode == OP_BINARY:
+            return generic_binary(fn, a, b, c)
+        if opcode == OP_MOVE:
+            return move_constant(template[a], c) if is_constant(a) else move_slot(a, c)
+        if opcode == OP_ARGUMENT:
+            return append_slot(self.arguments.append, a)
+        if opcode == OP_PRINT:
+            return append_slot(self.output.append, a)
+        raise ValueError(f"Instrucción sin cierre: {instruction}")
+
+class ClosureMachine(VirtualMachine):
+    """Ejecuta un ClosureProgram: un bucle por bloques con la pila de llamadas explícita.
+
+    Los límites son los de VirtualMachine; el contador de instrucciones
+    avanza por bloques y se comprueba al terminar cada uno.
+    """
+    def __init__(self, program: ClosureProgram, max_steps: int = DEFAULT_MAX_STEPS,
+                 time_limit: Optional[float] = DEFAULT_TIME_LIMIT, max_depth: int = DEFAULT_MAX_DEPTH):
+        super().__init__(program, max_steps, time_limit, max_depth)
+
+    def run(self, entry: str = "main") -> ExecutionResult:
+        with self.program.lock:
+            return self.execute(entry)
+
+    def execute(self, entry: str) -> ExecutionResult:
+        program = self.program
+        result = ExecutionResult()
+        if entry not in program.function_index:
+            result.status = "error"
+            result.error = f"No existe la función {entry}"
+            return result
+
+        arguments = program.arguments
+        arguments.clear()
+        program.output.clear()
+        function = program.functions[program.function_index[entry]]
+        f, block, current = function.template[:], function.entry, function.entry
+        stack: List[tuple] = []
+        max_depth = self.max_depth
+        count, calls, depth, deepest = 0, 0, 0, 0
+        self.started = time.perf_counter()
+        next_check = min(CHECK_INTERVAL, self.max_steps)
+
+        try:
+            while True:
+                operations, size, term = block
+                if size >= 0:
+                    current = block
+                    for operation in operations:
+                        operation(f)
+                    count += size
+                    if count >= next_check:
+                        next_check = self.checkpoint(count)
+                    block = term(f)
+                elif size == CALL_BLOCK:
+                    callee = operations
+                    if depth >= max_depth:
+                        raise RecursionError(f"se superó la profundidad máxima de llamadas ({max_depth})")
+                    if len(arguments) != callee.parameter_count:
+                        raise TypeError(f"{callee.name}() espera {callee.parameter_count} argumentos")
+                    destination, resume = term
+                    stack.append((f, destination, resume, function))
+                    f = callee.template[:]
+                    start = callee.parameter_start
+                    f[start:start + len(arguments)] = arguments
+                    arguments.clear()
+                    function, block = callee, callee.entry
+                    calls += 1
+                    depth += 1
+                    if depth > deepest:
+                        deepest = depth
+                else:
+                    value = f[operations]
+                    if not stack:
+                        result.return_value = value
+                        break
+                    f, destination, block, function = stack.pop()
+                    f[destination] = value
+                    depth -= 1
+        except Exception as e:
+            self.record_failure(result, e, function.name, program.block_lines.get(id(current), NO_LINE))
+
+        result.elapsed = time.perf_counter() - self.started
+        result.output = [str(value) for value in program.output]
+        program.output.clear()
+        result.instructions = count
+        result.calls = calls
+        result.max_depth = deepest
+        return result
+
+def run_quadruples(quadruples: List[Quadruple], **limits) -> ExecutionResult:
+    """Compila a cierres y ejecuta una lista de cuádruplos a partir de main"""
+    return ClosureMachine(ClosureProgram.from_quadruples(quadruples), **limits).run()
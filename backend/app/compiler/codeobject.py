@@ -0,0 +1,201 @@
+from app.models.schemas import Quadruple, SymbolTable
+from app.compiler.ir import (QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON, PARAM, CALL, RETURN, WRITE,
+                             NO_OPERAND, NO_LINE)
+from app.compiler.structurer import (StructuredFunction, Condition, Quad, If, Loop, Break, Continue,
+                                     SetVariable, ReturnNone, structure_program)
+from app.compiler.generator import CodeGenerator, global_variables, local_variables
+from app.compiler.vm import constant_value
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, List, Optional
+import ast
+import threading
+
+OBJECT_FILENAME = "<codigo_objeto>"
+
+# Misma semántica que el texto generado: '/' es división entera
+ARITHMETIC_NODES = {
+    '+': ast.Add, '-': ast.Sub, '*': ast.Mult, '/': ast.FloorDiv, '<<': ast.LShift, '>>': ast.RShift
+}
+COMPARISON_NODES = {
+    '>': ast.Gt, '<': ast.Lt, '>=': ast.GtE, '<=': ast.LtE, '==': ast.Eq, '!=': ast.NotEq
+}
+
+class CodeObjectGenerator:
+    """Construye un ast.Module a partir de los cuádruplos y lo compila a un objeto código.
+
+    Recorre el mismo árbol estructurado que CodeGenerator, de modo que el
+    módulo es equivalente al texto generado (variables inicializadas a None,
+    '/' como división entera, llamada a main bajo ``__name__``) pero sin pasar
+    por el tokenizador ni el parser de Python. Cada sentencia conserva la
+    línea del programa fuente para que los errores en ejecución la señalen.
+    """
+    def __init__(self, symbol_table: SymbolTable):
+        self.symbol_table = symbol_table
+        self.store = QuadrupleStore()
+        self.pending_arguments: List[ast.expr] = []
+
+    def generate(self, quadruples: List[Quadruple]) -> ast.Module:
+        store = QuadrupleStore.from_quadruples(quadruples)
+        return self.generate_structured(store, structure_program(store))
+
+    def generate_structured(self, store: QuadrupleStore, functions: List[StructuredFunction]) -> ast.Module:
+        """Módulo a partir de funciones ya estructuradas (p. ej. las de un CodeGenerator)"""
+        self.store = store
+        body: List[ast.stmt] = []
+        for name in global_variables(self.symbol_table):
+            body.append(self.assign(name, ast.Constant(value=None)))
+        for function in functions:
+            body.append(self.function_definition(function))
+        main_call = ast.Expr(value=ast.Call(func=self.load("main"), args=[], keywords=[]))
+        body.append(ast.If(test=ast.Compare(left=self.load("__name__"), ops=[ast.Eq()],
+                                            comparators=[ast.Constant(value="__main__")]),
+                           body=[main_call], orelse=[]))
+        module = ast.Module(body=body, type_ignores=[])
+        return ast.fix_missing_locations(module)
+
+    def compile(self, quadruples: List[Quadruple], filename: str = OBJECT_FILENAME) -> CodeType:
+        return compile(self.generate(quadruples), filename, "exec")
+
+    def compile_generated(self, generator: CodeGenerator, filename: str = OBJECT_FILENAME) -> CodeType:
+        """Objeto código equivalente al texto que acaba de producir el generador (sin volver a estructurar)"""
+        return compile(self.generate_structured(generator.store, generator.functions), filename, "exec")
+
+    def function_definition(self, function: StructuredFunction) -> ast.FunctionDef:
+        parameters = [ast.arg(arg=self.store.operand_text(oid)) for oid in function.parameters]
+        body = [self.assign(name, ast.Constant(value=None))
+                for name in local_variables(self.symbol_table, function.name)]
+        self.pending_arguments = []
+        body.extend(self.statements(function.body))
+        if not body:
+            body.append(ast.Return(value=ast.Constant(value=None)))
+        arguments = ast.arguments(posonlyargs=[], args=parameters, vararg=None, kwonlyargs=[],
+                                  kw_defaults=[], kwarg=None, defaults=[])
+        definition = ast.FunctionDef(name=function.name, args=arguments, body=body, decorator_list=[], returns=None)
+        if "type_params" in ast.FunctionDef._fields:
+            definition.type_params = []
+        return definition
+
+    def statements(self, statements: list) -> List[ast.stmt]:
+        nodes: List[ast.stmt] = []
+        for statement in statements:
+            if isinstance(statement, Quad):
+                node = self.quadruple(statement.index)
+                if node is not None:
+                    nodes.append(node)
+            elif isinstance(statement, If):
+                nodes.append(ast.If(test=self.condition(statement.condition),
+                                    body=self.statements(statement.body) or [ast.Pass()],
+                                    orelse=self.statements(statement.orelse)))
+            elif isinstance(statement, Loop):
+                nodes.append(ast.While(test=ast.Constant(value=True),
+                                       body=self.statements(statement.body) or [ast.Pass()], orelse=[]))
+            elif isinstance(statement, Break):
+                nodes.append(ast.Break())
+            elif isinstance(statement, Continue):
+                nodes.append(ast.Continue())
+            elif isinstance(statement, SetVariable):
+                nodes.append(self.assign(statement.name, ast.Constant(value=statement.value)))
+            elif isinstance(statement, ReturnNone):
+                nodes.append(ast.Return(value=ast.Constant(value=None)))
+        return nodes
+
+    def quadruple(self, index: int) -> Optional[ast.stmt]:
+        """Sentencia de un cuádruplo (None para los PARAM, que se acumulan para la llamada)"""
+        store = self.store
+        kind = store.kinds[index]
+        a, b, c = store.arg1[index], store.arg2[index], store.result[index]
+        if kind == ASSIGNMENT:
+            node = self.assign(store.operand_text(c), self.operand(a))
+        elif kind == ARITHMETIC:
+            operation = ast.BinOp(left=self.operand(a), op=ARITHMETIC_NODES[store.operator(index)](),
+                                  right=self.operand(b))
+            node = self.assign(store.operand_text(c), operation)
+        elif kind == COMPARISON:
+            comparison = ast.Compare(left=self.operand(a), ops=[COMPARISON_NODES[store.operator(index)]()],
+                                     comparators=[self.operand(b)])
+            node = self.assign(store.operand_text(c), comparison)
+        elif kind == PARAM:
+            self.pending_arguments.append(self.operand(a))
+            return None
+        elif kind == CALL:
+            call = ast.Call(func=self.load(store.operand_text(a)), args=self.pending_arguments, keywords=[])
+            self.pending_arguments = []
+            node = self.assign(store.operand_text(c), call) if c != NO_OPERAND else ast.Expr(value=call)
+        elif kind == WRITE:
+            node = ast.Expr(value=ast.Call(func=self.load("print"), args=[self.operand(a)], keywords=[]))
+        elif kind == RETURN:
+            node = ast.Return(value=self.operand(a) if a != NO_OPERAND else ast.Constant(value=None))
+        else:
+            return None
+        line = store.lines[index]
+        if line != NO_LINE and line > 0:
+            node.lineno = node.end_lineno = line
+            node.col_offset = node.end_col_offset = 0
+        return node
+
+    def condition(self, condition: Condition) -> ast.expr:
+        if condition.variable is not None:
+            operator = ast.NotEq() if condition.negate else ast.Eq()
+            return ast.Compare(left=self.load(condition.variable), ops=[operator],
+                               comparators=[ast.Constant(value=condition.value)])
+        operand = self.operand(condition.operand)
+        return ast.UnaryOp(op=ast.Not(), operand=operand) if condition.negate else operand
+
+    def operand(self, oid: int) -> ast.expr:
+        if oid == NO_OPERAND:
+            return ast.Constant(value=None)
+        text = self.store.operand_text(oid)
+        if oid < 0:
+            return ast.Constant(value=constant_value(text))
+        return self.load(text)
+
+    def load(self, name: str) -> ast.Name:
+        return ast.Name(id=name, ctx=ast.Load())
+
+    def assign(self, name: str, value: ast.expr) -> ast.Assign:
+        return ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=value)
+
+class CodeObjectCache:
+    """Objetos código compilados, indexados por el texto Python que les corresponde.
+
+    Quien ejecute el código objeto mostrado al usuario obtiene el objeto ya
+    compilado sin volver a analizar el texto; si no está (o se expulsó),
+    ``code_for`` lo compila desde el texto y lo guarda. Expulsión LRU.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CodeType]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str) -> Optional[CodeType]:
+        with self.lock:
+            code = self.entries.get(source)
+            if code is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(source)
+            self.hits += 1
+            return code
+
+    def put(self, source: str, code: CodeType):
+        with self.lock:
+            self.entries[source] = code
+            self.entries.move_to_end(source)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def code_for(self, source: str) -> CodeType:
+        code = self.get(source)
+        if code is None:
+            code = compile(source, OBJECT_FILENAME, "exec")
+            self.put(source, code)
+        return code
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+# Compartida entre peticiones: /api/compile guarda aquí el objeto código de cada texto generado
+code_cache = CodeObjectCache()
@@ -0,0 +1,130 @@
+from app.models.schemas import DataType
+from typing import Optional, Any
+import math
+import re
+
+INTEGER_LITERAL = re.compile(r'^-?\d+$')
+FLOAT_LITERAL = re.compile(r'^-?\d+\.\d*([eE][-+]?\d+)?$|^-?\d+[eE][-+]?\d+$')
+STRING_LITERAL = re.compile(r'^"([^"\\]|\\.)*"$')
+
+# Límites para no inflar el código con constantes gigantes
+MAX_SHIFT = 64
+MAX_LITERAL_LENGTH = 64
+
+NUMERIC_TYPES = frozenset((DataType.INT, DataType.FLOAT))
+COMPARISON_OPERATORS = frozenset(('>', '<', '>=', '<=', '==', '!='))
+
+class TypedConstant:
+    """Valor del retículo de constantes: tipo del lenguaje y valor de Python"""
+    __slots__ = ("data_type", "value")
+
+    def __init__(self, data_type: DataType, value: Any):
+        self.data_type = data_type
+        self.value = value
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, TypedConstant) and
+                self.data_type == other.data_type and self.value == other.value)
+
+    def __hash__(self) -> int:
+        return hash((self.data_type, self.value))
+
+    def __repr__(self) -> str:
+        return f"TypedConstant({self.data_type.value}, {self.value!r})"
+
+def parse_literal(text: Optional[str]) -> Optional[TypedConstant]:
+    """Literal del código intermedio -> constante tipada (None si no es literal)"""
+    if text is None:
+        return None
+    if INTEGER_LITERAL.match(text):
+        return TypedConstant(DataType.INT, int(text))
+    if FLOAT_LITERAL.match(text):
+        return TypedConstant(DataType.FLOAT, float(text))
+    if text in ("true", "false"):
+        return TypedConstant(DataType.BOOL, text == "true")
+    if STRING_LITERAL.match(text):
+        return TypedConstant(DataType.STRING, text[1:-1])
+    return None
+
+def format_literal(constant: TypedConstant) -> Optional[str]:
+    """Constante tipada -> literal del código intermedio (None si no es representable)"""
+    data_type, value = constant.data_type, constant.value
+    if data_type == DataType.BOOL:
+        return "true" if value else "false"
+    if data_type == DataType.INT:
+        text = str(value)
+    elif data_type == DataType.FLOAT:
+        if not math.isfinite(value):
+            return None
+        text = repr(value)
+    elif data_type == DataType.STRING:
+        if '"' in value.replace('\\"', ''):
+            return None
+        return f'"{value}"'
+    else:
+        return None
+    return text if len(text) <= MAX_LITERAL_LENGTH else None
+
+def truth_value(constant: TypedConstant) -> Optional[bool]:
+    """Valor de verdad de la constante en una condición"""
+    if constant.data_type in (DataType.BOOL, DataType.INT, DataType.FLOAT, DataType.STRING):
+        return bool(constant.value)
+    return None
+
+def fold_binary(operator: str, left: TypedConstant, right: TypedConstant) -> Optional[TypedConstant]:
+    """Evalúa en tiempo de compilación una operación entre constantes tipadas.
+
+    Sigue la semántica del código objeto: '/' es división entera ('//')
+    también entre floats. Devuelve None cuando la operación fallaría en
+    tiempo de ejecución (división entre cero, tipos incompatibles) para que
+    el error se conserve.
+    """
+    left_type, right_type = left.data_type, right.data_type
+    a, b = left.value, right.value
+
+    if operator in COMPARISON_OPERATORS:
+        comparable = ((left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES) or
+                      left_type == right_type)
+        if not comparable:
+            return None
+        if left_type == DataType.BOOL and operator not in ('==', '!='):
+            return None
+        if left_type == DataType.STRING and ('\\' in a or '\\' in b):
+            return None  # Las secuencias de escape cambiarían el orden
+        if operator == '>': value = a > b
+        elif operator == '<': value = a < b
+        elif operator == '>=': value = a >= b
+        elif operator == '<=': value = a <= b
+        elif operator == '==': value = a == b
+        else: value = a != b
+        return TypedConstant(DataType.BOOL, value)
+
+    if left_type == right_type == DataType.STRING:
+        return TypedConstant(DataType.STRING, a + b) if operator == '+' else None
+
+    if operator in ('<<', '>>'):
+        if left_type != DataType.INT or right_type != DataType.INT or not 0 <= b <= MAX_SHIFT:
+            return None
+        return TypedConstant(DataType.INT, a << b if operator == '<<' else a >> b)
+
+    if left_type not in NUMERIC_TYPES or right_type not in NUMERIC_TYPES:
+        return None
+    result_type = DataType.INT if left_type == right_type == DataType.INT else DataType.FLOAT
+    if operator == '+': value = a + b
+    elif operator == '-': value = a - b
+    elif operator == '*': value = a * b
+    elif operator == '/':
+        if b == 0:
+            return None
+        value = a // b
+    else:
+        return None
+    return TypedConstant(result_type, float(value) if result_type == DataType.FLOAT else value)
+
+def fold_literals(operator: str, left: str, right: str) -> Optional[str]:
+    """Pliega dos literales del código intermedio y devuelve el literal resultante"""
+    left_constant, right_constant = parse_literal(left), parse_literal(right)
+    if left_constant is None or right_constant is None:
+        return None
+    folded = fold_binary(operator, left_constant, right_constant)
+    return None if folded is None else format_literal(folded)
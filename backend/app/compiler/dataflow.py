@@ -0,0 +1,339 @@
+from app.compiler.ir import QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON
+from app.compiler.cfg import ControlFlowGraph
+from typing import List, Dict, Tuple, Iterator, Set
+from collections import deque
+
+FORWARD = "forward"
+BACKWARD = "backward"
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Posiciones de los bits encendidos, de menor a mayor"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+def definition_sites(cfg: ControlFlowGraph) -> Dict[int, List[Tuple[int, int]]]:
+    """Variable -> lista de (bloque, índice) donde se define, en el orden del código"""
+    sites: Dict[int, List[Tuple[int, int]]] = {}
+    store = cfg.store
+    for block in cfg.blocks:
+        for i in block.indices(store):
+            defined = store.defined(i)
+            if defined > 0:
+                sites.setdefault(defined, []).append((block.id, i))
+    return sites
+
+class DataflowProblem:
+    """Problema de flujo de datos gen/kill sobre bitsets (enteros de Python).
+
+    Las subclases llenan ``gen`` y ``kill`` por bloque y fijan la dirección, el
+    operador de reunión (unión o intersección) y el valor de frontera.
+    """
+    direction = FORWARD
+    use_union = True
+
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg = cfg
+        self.store = cfg.store
+        self.universe = 0
+        self.gen: List[int] = [0] * len(cfg.blocks)
+        self.kill: List[int] = [0] * len(cfg.blocks)
+        self.block_in: List[int] = []
+        self.block_out: List[int] = []
+
+    def boundary(self) -> int:
+        """Valor en la entrada (forward) o en la salida (backward) de la función"""
+        return 0
+
+    def initial(self) -> int:
+        """Valor inicial del resto de bloques: vacío para unión, universo para intersección"""
+        return 0 if self.use_union else self.universe
+
+    def transfer(self, block_id: int, value: int) -> int:
+        return self.gen[block_id] | (value & ~self.kill[block_id])
+
+    def solve(self) -> "DataflowProblem":
+        """Algoritmo de lista de trabajo en orden RPO (o RPO inverso si es backward)"""
+        cfg = self.cfg
+        blocks = cfg.blocks
+        forward = self.direction == FORWARD
+        order = cfg.order if forward else list(reversed(cfg.order))
+        reachable = set(cfg.order)
+
+        # En forward, "entrada" es block_in y "salida" block_out; en backward al revés
+        inputs = [self.initial()] * len(blocks)
+        outputs = [self.initial()] * len(blocks)
+
+        worklist = deque(order)
+        queued = [False] * len(blocks)
+        for block_id in order:
+            queued[block_id] = True
+
+        while worklist:
+            block_id = worklist.popleft()
+            queued[block_id] = False
+            block = blocks[block_id]
+            sources = block.predecessors if forward else block.successors
+            sources = [source for source in sources if source in reachable]
+
+            if not sources:
+                value = self.boundary()
+            elif self.use_union:
+                value = 0
+                for source in sources:
+                    value |= outputs[source]
+            else:
+                value = self.universe
+                for source in sources:
+                    value &= outputs[source]
+
+            inputs[block_id] = value
+            new_output = self.transfer(block_id, value)
+            if new_output != outputs[block_id] or not sources:
+                outputs[block_id] = new_output
+                for target in (block.successors if forward else block.predecessors):
+                    if target in reachable and not queued[target]:
+                        queued[target] = True
+                        worklist.append(target)
+
+        if forward:
+            self.block_in, self.block_out = inputs, outputs
+        else:
+            self.block_in, self.block_out = outputs, inputs
+        return self
+
+class VariableIndex:
+    """Asigna una posición de bit a cada variable (id de operando) de una función"""
+    def __init__(self, cfg: ControlFlowGraph):
+        self.bits: Dict[int, int] = {}
+        self.variables: List[int] = []
+        store = cfg.store
+        for block in cfg.blocks:
+            for i in block.indices(store):
+                defined = store.defined(i)
+                if defined > 0:
+                    self.add(defined)
+                for oid in store.uses(i):
+                    self.add(oid)
+
+    def add(self, oid: int) -> int:
+        bit = self.bits.get(oid)
+        if bit is None:
+            bit = self.bits[oid] = len(self.variables)
+            self.variables.append(oid)
+        return bit
+
+    def mask(self, oid: int) -> int:
+        bit = self.bits.get(oid)
+        return 0 if bit is None else 1 << bit
+
+    def __len__(self) -> int:
+        return len(self.variables)
+
+class Liveness(DataflowProblem):
+    """Variables vivas: backward, unión. gen = usos expuestos, kill = definiciones"""
+    direction = BACKWARD
+    use_union = True
+
+    def __init__(self, cfg: ControlFlowGraph, variables: VariableIndex = None):
+        super().__init__(cfg)
+        self.variables = variables or VariableIndex(cfg)
+        self.universe = (1 << len(self.variables)) - 1
+        store = self.store
+        for block in cfg.blocks:
+            gen = kill = 0
+            for i in reversed(block.indices(store)):
+                gen, kill = self.step(i, gen, kill)
+            self.gen[block.id] = gen
+            self.kill[block.id] = kill
+
+    def step(self, index: int, gen: int, kill: int) -> Tuple[int, int]:
+        defined = self.variables.mask(self.store.defined(index))
+        gen &= ~defined
+        kill |= defined
+        for oid in self.store.uses(index):
+            gen |= self.variables.mask(oid)
+        return gen, kill
+
+    def live_after(self, block_id: int) -> List[Tuple[int, int]]:
+        """Pares (índice, vivas justo después del cuádruplo) del bloque, en orden inverso"""
+        live = self.block_out[block_id]
+        pairs = []
+        for i in reversed(self.cfg.blocks[block_id].indices(self.store)):
+            pairs.append((i, live))
+            live = self.transfer_instruction(i, live)
+        return pairs
+
+    def transfer_instruction(self, index: int, live: int) -> int:
+        live &= ~self.variables.mask(self.store.defined(index))
+        for oid in self.store.uses(index):
+            live |= self.variables.mask(oid)
+        return live
+
+def interference_graph(liveness: Liveness, mask: int) -> Dict[int, Set[int]]:
+    """Grafo de interferencia entre las variables de ``mask`` (bits de liveness.variables).
+
+    Una variable definida interfiere con todas las vivas justo después de su
+    definición, salvo con el origen de una copia x = y (ambas guardan el mismo
+    valor). Solo se recorren los bloques alcanzables.
+    """
+    store = liveness.store
+    variables = liveness.variables
+    graph: Dict[int, Set[int]] = {variables.variables[bit]: set() for bit in iter_bits(mask)}
+    for block_id in liveness.cfg.order:
+        for i, live in liveness.live_after(block_id):
+            defined = store.defined(i)
+            if defined not in graph:
+                continue
+            copy_source = store.arg1[i] if store.kinds[i] == ASSIGNMENT else 0
+            for bit in iter_bits(live & mask):
+                other = variables.variables[bit]
+                if other != defined and other != copy_source:
+                    graph[defined].add(other)
+                    graph[other].add(defined)
+    return graph
+
+class ReachingDefinitions(DataflowProblem):
+    """Definiciones que alcanzan: forward, unión. Un bit por cuádruplo que define"""
+    direction = FORWARD
+    use_union = True
+
+    def __init__(self, cfg: ControlFlowGraph):
+        super().__init__(cfg)
+        store = self.store
+        self.definitions: List[int] = []  # bit -> índice del cuádruplo
+        self.definition_bits: Dict[int, int] = {}  # índice del cuádruplo -> bit
+        by_variable: Dict[int, int] = {}  # variable -> máscara de sus definiciones
+        for block in cfg.blocks:
+            for i in block.indices(store):
+                defined = store.defined(i)
+                if defined > 0:
+                    bit = len(self.definitions)
+                    self.definitions.append(i)
+                    self.definition_bits[i] = bit
+                    by_variable[defined] = by_variable.get(defined, 0) | (1 << bit)
+        self.by_variable = by_variable
+        self.universe = (1 << len(self.definitions)) - 1
+
+        for block in cfg.blocks:
+            gen = kill = 0
+            for i in block.indices(store):
+                defined = store.defined(i)
+                if defined > 0:
+                    others = by_variable[defined]
+                    own = 1 << self.definition_bits[i]
+                    gen = (gen & ~others) | own
+                    kill |= others
+            self.gen[block.id] = gen
+            self.kill[block.id] = kill & ~gen
+
+class AvailableExpressions(DataflowProblem):
+    """Expresiones disponibles: forward, intersección. Un bit por (operador, arg1, arg2)"""
+    direction = FORWARD
+    use_union = False
+
+    def __init__(self, cfg: ControlFlowGraph):
+        super().__init__(cfg)
+        store = self.store
+        self.expressions: List[Tuple[int, int, int]] = []
+        self.expression_bits: Dict[Tuple[int, int, int], int] = {}
+        operand_masks: Dict[int, int] = {}  # variable -> expresiones que la leen
+        for block in cfg.blocks:
+            for i in block.indices(store):
+                key = self.expression_key(i)
+                if key is None or key in self.expression_bits:
+                    continue
+                bit = len(self.expressions)
+                self.expressions.append(key)
+                self.expression_bits[key] = bit
+                for oid in (key[1], key[2]):
+                    if oid > 0:
+                        operand_masks[oid] = operand_masks.get(oid, 0) | (1 << bit)
+        self.operand_masks = operand_masks
+        self.universe = (1 << len(self.expressions)) - 1
+
+        for block in cfg.blocks:
+            gen = kill = 0
+            for i in block.indices(store):
+                key = self.expression_key(i)
+                if key is not None:
+                    gen |= 1 << self.expression_bits[key]
+                defined = store.defined(i)
+                if defined > 0:
+                    killed = operand_masks.get(defined, 0)
+                    gen &= ~killed
+                    kill |= killed
+            self.gen[block.id] = gen
+            self.kill[block.id] = kill & ~gen
+
+    def expression_key(self, index: int):
+        store = self.store
+        if store.kinds[index] not in (ARITHMETIC, COMPARISON):
+            return None
+        return (store.operators[index], store.arg1[index], store.arg2[index])
+
+class AvailableCopies(DataflowProblem):
+    """Copias disponibles: forward, intersección. Un bit por copia x = y entre variables"""
+    direction = FORWARD
+    use_union = False
+
+    def __init__(self, cfg: ControlFlowGraph):
+        super().__init__(cfg)
+        store = self.store
+        self.copies: List[Tuple[int, int]] = []  # bit -> (destino, origen)
+        self.copy_bits: Dict[Tuple[int, int], int] = {}
+        operand_masks: Dict[int, int] = {}  # variable -> copias que la escriben o la leen
+        destination_masks: Dict[int, int] = {}  # variable -> copias que la escriben
+        for block in cfg.blocks:
+            for i in block.indices(store):
+                key = self.copy_key(i)
+                if key is None or key in self.copy_bits:
+                    continue
+                bit = len(self.copies)
+                self.copies.append(key)
+                self.copy_bits[key] = bit
+                destination_masks[key[0]] = destination_masks.get(key[0], 0) | (1 << bit)
+                for oid in key:
+                    operand_masks[oid] = operand_masks.get(oid, 0) | (1 << bit)
+        self.operand_masks = operand_masks
+        self.destination_masks = destination_masks
+        self.universe = (1 << len(self.copies)) - 1
+
+        for block in cfg.blocks:
+            gen = kill = 0
+            for i in block.indices(store):
+                gen, kill = self.step(i, gen, kill)
+            self.gen[block.id] = gen
+            self.kill[block.id] = kill & ~gen
+
+    def copy_key(self, index: int):
+        store = self.store
+        if store.kinds[index] != ASSIGNMENT:
+            return None
+        source, target = store.arg1[index], store.result[index]
+        if source <= 0 or source == target:
+            return None
+        return (target, source)
+
+    def step(self, index: int, gen: int, kill: int) -> Tuple[int, int]:
+        defined = self.store.defined(index)
+        if defined > 0:
+            killed = self.operand_masks.get(defined, 0)
+            gen &= ~killed
+            kill |= killed
+        bit = self.copy_bits.get(self.copy_key(index))
+        if bit is not None:
+            gen |= 1 << bit
+        return gen, kill
+
+    def transfer_instruction(self, index: int, available: int) -> int:
+        gen, kill = self.step(index, 0, 0)
+        return gen | (available & ~kill)
+
+    def source_of(self, oid: int, available: int) -> int:
+        """Variable de la que oid es copia en el punto dado (0 si no hay)"""
+        bits = available & self.destination_masks.get(oid, 0)
+        if not bits:
+            return 0
+        return self.copies[(bits & -bits).bit_length() - 1][1]
@@ -0,0 +1,283 @@
+from app.models.schemas import IntermediateCode
+from app.compiler import ir_binary
+from app.compiler.ir_binary import write_varint, read_varint
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+try:
+    import fcntl  # Bloqueo entre procesos (solo en sistemas Unix)
+except ImportError:
+    fcntl = None
+
+# Cabecera del archivo y de cada registro: marca, clave (sha256), longitud y crc32 de los datos
+FILE_MAGIC = b"CCACHE01"
+RECORD_MAGIC = b"CCR1"
+RECORD_HEADER = struct.Struct("<4s32sII")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+COMPACT_RATIO = 0.75  # Tras compactar el almacén queda por debajo de esta fracción del máximo
+
+def encode_artifacts(artifacts: Dict[str, Any], intermediate: Dict[str, IntermediateCode]) -> bytes:
+    """Registro: JSON comprimido de los artefactos y una sección binaria por código intermedio"""
+    out = bytearray()
+    document = zlib.compress(json.dumps(artifacts, separators=(",", ":")).encode("utf-8"))
+    write_varint(out, len(document))
+    out += document
+    sections = [(name, code) for name, code in intermediate.items() if code is not None]
+    write_varint(out, len(sections))
+    for name, code in sections:
+        encoded_name = name.encode("utf-8")
+        data = ir_binary.encode(code)
+        write_varint(out, len(encoded_name))
+        out += encoded_name
+        write_varint(out, len(data))
+        out += data
+    return bytes(out)
+
+def decode_artifacts(view: memoryview) -> Dict[str, Any]:
+    length, position = read_varint(view, 0)
+    artifacts = json.loads(zlib.decompress(view[position:position + length]))
+    position += length
+    count, position = read_varint(view, position)
+    for _ in range(count):
+        length, position = read_varint(view, position)
+        name = str(view[position:position + length], "utf-8")
+        position += length
+        length, position = read_varint(view, position)
+        artifacts[name] = ir_binary.decode(view[position:position + length])
+        position += length
+    return artifacts
+
+# Raíz del paquete app (backend/app)
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def compiler_version(root: str = APP_ROOT) -> str:
+    """Huella del código de la aplicación: cualquier cambio en él invalida la caché.
+
+    Cubre todo el paquete app y no solo app/compiler: las respuestas
+    guardadas también dependen de los modelos (app/models/schemas.py) y de
+    cómo las arma la API (app/api/compile.py).
+    """
+    digest = hashlib.sha256()
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if name != "__pycache__")
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+                with open(path, "rb") as source:
+                    digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+COMPILER_VERSION = compiler_version()
+
+class DiskCache:
+    """Caché de artefactos de compilación en disco, compartida entre procesos.
+
+    Los registros se añaden al final de un único archivo (cabecera + datos
+    comprimidos) y se leen con mmap sin copiarlos a memoria. Cada proceso
+    mantiene un índice clave -> (posición, longitud) que actualiza leyendo
+    solo lo que otros procesos añadieron desde la última vez. Las escrituras
+    y la compactación se hacen con un bloqueo exclusivo (flock) sobre un
+    archivo aparte; la compactación escribe los registros más recientes en
+    un archivo nuevo y lo renombra encima del anterior, de modo que quien
+    aún tenga abierto el antiguo sigue leyendo datos válidos hasta que
+    detecta el cambio de inodo y vuelve a abrirlo.
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, version: str = COMPILER_VERSION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.path = os.path.join(directory, "artefactos.bin")
+        self.lock_path = os.path.join(directory, "artefactos.lock")
+        os.makedirs(directory, exist_ok=True)
+        with self.exclusive():
+            if not os.path.exists(self.path):
+                with open(self.path, "wb") as data:
+                    data.write(FILE_MAGIC)
+        self.thread_lock = threading.Lock()
+        self.index: Dict[bytes, Tuple[int, int]] = {}  # clave -> (posición de los datos, longitud)
+        self.file = None
+        self.map: Optional[mmap.mmap] = None
+        self.inode = None
+        self.scanned = len(FILE_MAGIC)
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+    # --- Claves y artefactos ---
+
+    def key_for(self, source: str, optimization_level: str) -> bytes:
+        text = f"{self.version}\0{optimization_level}\0{source}"
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def load(self, source: str, optimization_level: str) -> Optional[Dict[str, Any]]:
+        """Artefactos guardados para este programa y nivel (None si no están).
+
+        El código intermedio se decodifica directamente desde el mmap
+        (formato de ir_binary) y vuelve como IntermediateCode.
+        """
+        return self.read(self.key_for(source, optimization_level), decode_artifacts)
+
+    def store(self, source: str, optimization_level: str, artifacts: Dict[str, Any],
+              intermediate: Optional[Dict[str, IntermediateCode]] = None):
+        """Guarda los artefactos (serializables en JSON) y el código intermedio en binario"""
+        self.put(self.key_for(source, optimization_level), encode_artifacts(artifacts, intermediate or {}))
+
+    # --- Almacén ---
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self.read(key, bytes)
+
+    def read(self, key: bytes, reader: Callable[[memoryview], Any]) -> Any:
+        """Aplica ``reader`` a los datos del registro sin copiarlos (None si no está o está dañado)"""
+        with self.thread_lock:
+            self.refresh()
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            offset, length = entry
+            view = memoryview(self.map)[offset:offset + length]
+            header = RECORD_HEADER.unpack_from(self.map, offset - RECORD_HEADER.size)
+            try:
+                if zlib.crc32(view) != header[3]:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return reader(view)
+            finally:
+                view.release()
+
+    def put(self, key: bytes, payload: bytes):
+        record = RECORD_HEADER.pack(RECORD_MAGIC, key, len(payload), zlib.crc32(payload)) + payload
+        with self.thread_lock, self.exclusive():
+            self.refresh()
+            with open(self.path, "r+b") as data:
+                # Un registro a medias (un proceso que murió escribiendo) se descarta
+                data.truncate(self.scanned)
+                data.seek(self.scanned)
+                data.write(record)
+                data.flush()
+                os.fsync(data.fileno())
+            self.refresh()
+            if self.scanned > self.max_bytes:
+                self.compact()
+
+    def refresh(self):
+        """Abre el archivo (de nuevo si otro proceso lo compactó) e indexa los registros añadidos"""
+        inode = os.stat(self.path).st_ino
+        if inode != self.inode:
+            self.close()
+            self.file = open(self.path, "rb")
+            self.inode = os.fstat(self.file.fileno()).st_ino
+            if self.file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{self.path} no es un almacén de la caché de compilación")
+            self.index = {}
+            self.scanned = len(FILE_MAGIC)
+        size = os.fstat(self.file.fileno()).st_size
+        if self.map is None or len(self.map) < size:
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+        self.scan(size)
+
+    def scan(self, size: int):
+        offset = self.scanned
+        while offset + RECORD_HEADER.size <= size:
+            magic, key, length, _ = RECORD_HEADER.unpack_from(self.map, offset)
+            start = offset + RECORD_HEADER.size
+            if magic != RECORD_MAGIC or start + length > size:
+                break
+            self.index[key] = (start, length)
+            offset = start + length
+        self.scanned = offset
+
+    def compact(self):
+        """Reescribe el almacén con los registros más recientes hasta COMPACT_RATIO del máximo"""
+        budget = int(self.max_bytes * COMPACT_RATIO)
+        kept: List[Tuple[bytes, int, int]] = []
+        used = len(FILE_MAGIC)
+        # Del registro más reciente (el de mayor posición) al más antiguo
+        for key, (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0], reverse=True):
+            size = RECORD_HEADER.size + length
+            if used + size > budget:
+                break
+            kept.append((key, offset, length))
+            used += size
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as data:
+            data.write(FILE_MAGIC)
+            for key, offset, length in reversed(kept):
+                data.write(self.map[offset - RECORD_HEADER.size:offset + length])
+            data.flush()
+            os.fsync(data.fileno())
+        os.replace(temporary, self.path)
+        self.compactions += 1
+        self.refresh()
+
+    def exclusive(self):
+        return FileLock(self.lock_path)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.inode = None
+
+    def clear(self):
+        with self.thread_lock, self.exclusive():
+            # Se sustituye el archivo en lugar de truncarlo: otros procesos pueden tenerlo en mmap
+            temporary = self.path + ".tmp"
+            with open(temporary, "wb") as data:
+                data.write(FILE_MAGIC)
+            os.replace(temporary, self.path)
+            self.refresh()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.path, "entries": len(self.index), "bytes": self.scanned,
+                "max_bytes": self.max_bytes, "version": self.version, "hits": self.hits,
+                "misses": self.misses, "compactions": self.compactions}
+
+class FileLock:
+    """Bloqueo exclusivo entre procesos sobre un archivo (sin fcntl solo protege dentro del proceso)"""
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        self.handle.close()
+        self.handle = None
+
+def default_cache() -> Optional[DiskCache]:
+    """Caché configurada con COMPILER_CACHE_DIR (vacío la desactiva) y COMPILER_CACHE_MB"""
+    directory = os.environ.get("COMPILER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "compilador-cache"))
+    if not directory:
+        return None
+    max_bytes = int(float(os.environ.get("COMPILER_CACHE_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024)
+    try:
+        return DiskCache(directory, max_bytes)
+    except OSError as e:
+        print(f"Caché en disco desactivada: {e}")
+        return None
+
+# Compartida por todos los procesos que usen el mismo directorio
+disk_cache = default_cache()
@@ -1,12 +1,48 @@
 from app.models.schemas import Quadruple, QuadrupleType, SymbolTable
+from app.compiler.ir import QuadrupleStore
+from app.compiler.structurer import (StructuredFunction, Condition, Quad, If, Loop, Break, Continue,
+                                     SetVariable, ReturnNone, structure_program)
 from typing import List, Dict, Tuple
 
+def global_variables(symbol_table: SymbolTable) -> List[str]:
+    """Variables globales declaradas en la tabla de símbolos"""
+    global_vars = []
+    
+    def collect_vars(table):
+        for symbol in table.symbols.values():
+            if symbol.symbol_type == "variable" and symbol.scope == "global":
+                global_vars.append(symbol.name)
+        for child in table.children:
+            collect_vars(child)
+    
+    collect_vars(symbol_table)
+    return global_vars
+
+def local_variables(symbol_table: SymbolTable, function_name: str) -> List[str]:
+    """Variables locales de una función (se inicializan a None al entrar)"""
+    local_vars = []
+    
+    def find_local_vars(table):
+        for symbol in table.symbols.values():
+            if (symbol.symbol_type == "variable" and 
+                symbol.scope == function_name):
+                local_vars.append(symbol.name)
+        for child in table.children:
+            find_local_vars(child)
+    
+    find_local_vars(symbol_table)
+    return local_vars
+
 class CodeGenerator:
     def __init__(self, symbol_table: SymbolTable):
         self.symbol_table = symbol_table
         self.generated_code = []
         self.indent_level = 0
         self.temp_vars = set()
+        self.store = QuadrupleStore()
+        self.functions: List[StructuredFunction] = []  # Árbol estructurado (reutilizable por otros backends)
+        self.strategies: Dict[str, str] = {}  # función -> "estructurado" o "despacho"
+        self.pending_arguments: List[str] = []
         
     def generate(self, quadruples: List[Quadruple]) -> str:
         """Genera código Python a partir de los cuádruplos"""
@@ -39,21 +75,15 @@ class CodeGenerator:
         
         print("=== GENERACIÓN DE CÓDIGO COMPLETADA ===")
         print(f"Líneas de código generadas: {len(self.generated_code)}")
+        dispatched = [name for name, strategy in self.strategies.items() if strategy != "estructurado"]
+        if dispatched:
+            print(f"Funciones con flujo irreducible (bucle de despacho): {', '.join(dispatched)}")
         
         return code_str
     
     def generate_variable_declarations(self):
         """Genera declaraciones de variables globales"""
-        global_vars = []
-        
-        def collect_vars(table):
-            for symbol in table.symbols.values():
-                if symbol.symbol_type == "variable" and symbol.scope == "global":
-                    global_vars.append(symbol.name)
-            for child in table.children:
-                collect_vars(child)
-        
-        collect_vars(self.symbol_table)
+        global_vars = global_variables(self.symbol_table)
         
         if global_vars:
             self.add_line("# Variables globales")
@@ -61,96 +91,106 @@ class CodeGenerator:
                 self.add_line(f"{var} = None")
     
     def generate_functions(self, quadruples: List[Quadruple]):
-        """Genera las funciones a partir de los cuádruplos"""
-        current_function = None
-        function_quads = []
-        
-        for quad in quadruples:
-            
-            # --- INICIO DE LA CORRECCIÓN ---
-            if (quad.quadruple_type == QuadrupleType.LABEL and 
-                quad.result.startswith("func_")): # <-- CORREGIDO (usa result)
-                
-                # Procesar función anterior si existe
-                if current_function:
-                    self.generate_function_code(current_function, function_quads)
-                    self.indent_level -= 1 # Salir del scope de la función anterior
-                    self.add_line("")
-                    function_quads = []
-                
-                current_function = quad.result.replace("func_", "") # <-- CORREGIDO (usa result)
-                self.add_line(f"def {current_function}():")
-                self.indent_level += 1
-                
-                # Inicializar variables locales
-                self.generate_local_variables(current_function)
-            
-            # --- FIN DE LA CORRECCIÓN ---
-            
-            elif current_function:
-                function_quads.append(quad)
-        
-        # Procesar la última función
-        if current_function:
-            self.generate_function_code(current_function, function_quads)
-            self.indent_level -= 1
-            self.add_line("")
+        """Genera las funciones a partir de los cuádruplos, con el flujo reconstruido como if/else/while"""
+        self.store = QuadrupleStore.from_quadruples(quadruples)
+        self.functions = structure_program(self.store)
+        self.strategies = {}
+        for function in self.functions:
+            self.strategies[function.name] = function.strategy
+            self.generate_function(function)
+    
+    def generate_function(self, function: StructuredFunction):
+        """Genera la definición de una función: firma, variables locales y cuerpo"""
+        parameters = [self.store.operand_text(oid) for oid in function.parameters]
+        self.add_line(f"def {function.name}({', '.join(parameters)}):")
+        self.indent_level += 1
+        
+        # Inicializar variables locales
+        self.generate_local_variables(function.name)
+        
+        self.pending_arguments = []  # Argumentos (PARAM) de la próxima llamada
+        if function.body:
+            self.generate_statements(function.body)
+        else:
+            self.add_line("return None")
+        self.indent_level -= 1 # Salir del scope de la función
+        self.add_line("")
     
     def generate_local_variables(self, function_name: str):
         """Genera inicialización de variables locales"""
-        local_vars = []
+        for var in local_variables(self.symbol_table, function_name):
+            self.add_line(f"{var} = None")
+    
+    def generate_statements(self, statements: list):
+        """Genera un bloque de sentencias del árbol estructurado"""
+        if not statements:
+            self.add_line("pass")
+            return
+        for statement in statements:
+            if isinstance(statement, Quad):
+                self.generate_quadruple(self.store.quadruple(statement.index))
+            elif isinstance(statement, If):
+                self.generate_if(statement)
+            elif isinstance(statement, Loop):
+                self.add_line("while True:")
+                self.generate_block(statement.body)
+            elif isinstance(statement, Break):
+                self.add_line("break")
+            elif isinstance(statement, Continue):
+                self.add_line("continue")
+            elif isinstance(statement, SetVariable):
+                self.add_line(f"{statement.name} = {statement.value}")
+            elif isinstance(statement, ReturnNone):
+                self.add_line("return None")
+    
+    def generate_block(self, statements: list):
+        self.indent_level += 1
+        self.generate_statements(statements)
+        self.indent_level -= 1
+    
+    def generate_if(self, statement: If):
+        """Genera if/elif/else (un else que solo contiene otro if se escribe como elif)"""
+        self.add_line(f"if {self.format_condition(statement.condition)}:")
+        self.generate_block(statement.body)
+        orelse = statement.orelse
+        while len(orelse) == 1 and isinstance(orelse[0], If):
+            self.add_line(f"elif {self.format_condition(orelse[0].condition)}:")
+            self.generate_block(orelse[0].body)
+            orelse = orelse[0].orelse
+        if orelse:
+            self.add_line("else:")
+            self.generate_block(orelse)
+    
+    def format_condition(self, condition: Condition) -> str:
+        if condition.variable is not None:
+            operator = "!=" if condition.negate else "=="
+            return f"{condition.variable} {operator} {condition.value}"
+        operand = self.format_operand(self.store.operand_text(condition.operand))
+        return f"not {operand}" if condition.negate else operand
+    
+    def generate_quadruple(self, quad: Quadruple):
+        """Genera código según el tipo de cuádruplo"""
+        if quad.quadruple_type == QuadrupleType.ASSIGNMENT:
+            self.generate_assignment(quad)
         
-        def find_local_vars(table):
-            for symbol in table.symbols.values():
-                if (symbol.symbol_type == "variable" and 
-                    symbol.scope == function_name):
-                    local_vars.append(symbol.name)
-            for child in table.children:
-                find_local_vars(child)
+        elif quad.quadruple_type == QuadrupleType.ARITHMETIC:
+            self.generate_arithmetic(quad)
         
-        find_local_vars(self.symbol_table)
+        elif quad.quadruple_type == QuadrupleType.COMPARISON:
+            self.generate_comparison(quad)
         
-        for var in local_vars:
-            self.add_line(f"{var} = None")
-    
-    def generate_function_code(self, function_name: str, quads: List[Quadruple]):
-        """Genera el código de una función específica"""
-        label_map = self.build_label_map(quads)
-        i = 0
-        
-        while i < len(quads):
-            quad = quads[i]
-            
-            # Mapear etiquetas
-            if quad.result in label_map:
-                self.add_line(f"# {quad.result}")
-            
-            # Generar código según el tipo de cuádruplo
-            if quad.quadruple_type == QuadrupleType.ASSIGNMENT:
-                self.generate_assignment(quad)
-            
-            elif quad.quadruple_type == QuadrupleType.ARITHMETIC:
-                self.generate_arithmetic(quad)
-            
-            elif quad.quadruple_type == QuadrupleType.COMPARISON:
-                self.generate_comparison(quad)
-            
-            elif quad.quadruple_type == QuadrupleType.JUMP:
-                i = self.generate_jump(quad, quads, i, label_map)
-                continue  # Saltar incremento normal
-            
-            elif quad.quadruple_type == QuadrupleType.WRITE:
-                self.generate_write(quad)
-            
-            elif quad.quadruple_type == QuadrupleType.RETURN:
-                self.generate_return(quad)
-                break  # Return termina la función
-            
-            i += 1
-        
-        # Si no hay return explícito, agregar uno implícito
-        if not any(q.quadruple_type == QuadrupleType.RETURN for q in quads):
-            self.add_line("return None")
+        elif quad.quadruple_type == QuadrupleType.PARAM:
+            self.pending_arguments.append(self.format_operand(quad.arg1))
+        
+        elif quad.quadruple_type == QuadrupleType.CALL:
+            self.generate_call(quad, self.pending_arguments)
+            self.pending_arguments = []
+        
+        elif quad.quadruple_type == QuadrupleType.WRITE:
+            self.generate_write(quad)
+        
+        elif quad.quadruple_type == QuadrupleType.RETURN:
+            self.generate_return(quad)
     
     def generate_assignment(self, quad: Quadruple):
         """Genera código para asignación"""
@@ -184,31 +224,10 @@ class CodeGenerator:
         python_op = comp_map.get(quad.operator, quad.operator)
         self.add_line(f"{quad.result} = {op1} {python_op} {op2}")
     
-    def generate_jump(self, quad: Quadruple, quads: List[Quadruple], current_index: int, label_map: Dict) -> int:
-        """Genera código para saltos"""
-        
-        if quad.operator == "if_false":
-            condition = self.format_operand(quad.arg1)
-            target_label = quad.result
-            
-            # (Nota: La lógica para reconstruir if/else es compleja.
-            # Por ahora, solo traducimos la línea y evitamos el cuelgue)
-            
-            self.add_line(f"if not {condition}:")
-            self.indent_level += 1
-            self.add_line(f"pass  # Saltar a {target_label}")
-            self.indent_level -= 1
-            
-            # --- CORRECCIÓN 1 ---
-            # Debe retornar el *siguiente* índice para que el bucle avance
-            return current_index + 1
-        
-        else:  # Salto incondicional
-            self.add_line(f"pass  # Saltar a {quad.result}")
-            
-            # --- CORRECCIÓN 2 (LA CAUSA DEL BUCLE INFINITO) ---
-            # Debe retornar el *siguiente* índice para avanzar el bucle
-            return current_index + 1
+    def generate_call(self, quad: Quadruple, arguments: List[str]):
+        """Genera código para una llamada con los argumentos acumulados por sus PARAM"""
+        call = f"{quad.arg1}({', '.join(arguments)})"
+        self.add_line(f"{quad.result} = {call}" if quad.result else call)
     
     def generate_write(self, quad: Quadruple):
         """Genera código para print"""
@@ -226,6 +245,8 @@ class CodeGenerator:
             return "None"
         elif operand.isdigit():
             return operand
+        elif operand in ("true", "false"):
+            return "True" if operand == "true" else "False"
         elif operand.startswith('"') and operand.endswith('"'):
             return operand
         elif operand.startswith('t'):
@@ -234,14 +255,6 @@ class CodeGenerator:
         else:
             return operand
     
-    def build_label_map(self, quads: List[Quadruple]) -> Dict[str, int]:
-        """Construye un mapa de etiquetas a índices"""
-        label_map = {}
-        for i, quad in enumerate(quads):
-            if quad.quadruple_type == QuadrupleType.LABEL:
-                label_map[quad.result] = i
-        return label_map
-    
     def add_line(self, line: str):
         """Agrega una línea de código con la indentación apropiada"""
         indent = "    " * self.indent_level
@@ -0,0 +1,369 @@
+from app.compiler.ir import QuadrupleStore, ASSIGNMENT, JUMP, LABEL, PARAM, CALL, RETURN, NO_OPERAND
+from app.compiler.cfg import ControlFlowGraph, function_ranges
+from app.compiler.dataflow import Liveness
+from app.compiler.constants import INTEGER_LITERAL
+from app.compiler.temporaries import TEMPORAL_PATTERN
+from typing import Dict, List, Optional, Set, Any
+
+# Heurística de expansión en línea: se expande una llamada si
+# tamaño de la función - beneficio <= INLINE_COST_THRESHOLD, donde el beneficio
+# es lo que cuesta la llamada (PARAM, CALL y RETURN) más un extra por cada
+# argumento constante, multiplicado si la llamada está dentro de un bucle.
+INLINE_COST_THRESHOLD = 8
+CONSTANT_ARGUMENT_BONUS = 2  # Un argumento constante abre plegados tras expandir
+LOOP_BENEFIT_FACTOR = 4  # Una llamada dentro de un bucle se ejecuta muchas veces
+SINGLE_CALL_SITE_LIMIT = 60  # Una función llamada desde un solo punto se expande hasta este tamaño
+MAX_FUNCTION_SIZE = 400  # No se expande nada dentro de funciones mayores
+
+class CallSite:
+    """Llamada del código intermedio: sus PARAM, el CALL y el temporal que recibe el valor"""
+    __slots__ = ("caller", "callee", "index", "params", "arguments", "result")
+
+    def __init__(self, caller: str, callee: str, index: int, params: List[int], arguments: List[int], result: int):
+        self.caller = caller
+        self.callee = callee
+        self.index = index  # Índice del CALL
+        self.params = params  # Índices de los PARAM, en orden
+        self.arguments = arguments  # Ids de los argumentos reales
+        self.result = result  # NO_OPERAND si el valor se descarta
+
+class FunctionInfo:
+    """Firma, cuerpo y llamadas de una función (rango [start, end) del almacén)"""
+    def __init__(self, store: QuadrupleStore, start: int, end: int, name: str):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.formals: List[int] = []
+        kinds = store.kinds
+
+        body_start = store.next_live(start)
+        while body_start < end and store.is_formal_parameter(body_start):
+            self.formals.append(store.result[body_start])
+            body_start = store.next_live(body_start)
+        self.body_start = body_start
+
+        self.body: List[int] = [i for i in range(body_start, end) if not store.is_deleted(i)]
+        self.size = sum(1 for i in self.body if kinds[i] != LABEL)
+        self.calls: List[CallSite] = []
+        self.malformed_calls = 0
+        for i in self.body:
+            if kinds[i] == CALL:
+                site = self.parse_call(store, i)
+                if site is None:
+                    self.malformed_calls += 1
+                else:
+                    self.calls.append(site)
+
+        # La función devuelve un valor en todos sus caminos si cada RETURN lleva
+        # valor y el código no puede caer más allá del último cuádruplo
+        last = self.body[-1] if self.body else None
+        falls_off_end = last is None or not (
+            kinds[last] == RETURN or (kinds[last] == JUMP and store.operator(last) == ""))
+        self.always_returns_value = not falls_off_end and all(
+            store.arg1[i] != NO_OPERAND for i in self.body if kinds[i] == RETURN)
+
+        # Ninguna variable se lee antes de definirse: el cuerpo no depende del
+        # valor que tuvieran sus variables al entrar (copiarlo o repetirlo es seguro)
+        cfg = ControlFlowGraph(store, start, end, name)
+        self.loop_blocks: Set[int] = {block for loop in cfg.loops for block in loop.body}
+        self.block_of_index = {i: block.id for block in cfg.blocks for i in block.indices(store)}
+        self.self_contained = not cfg.blocks or Liveness(cfg).solve().block_in[cfg.entry] == 0
+
+    def parse_call(self, store: QuadrupleStore, index: int) -> Optional[CallSite]:
+        """Reconoce 'PARAM a1 ... PARAM an; CALL f, n' (None si los PARAM no están justo antes)"""
+        count_text = store.operand_text(store.arg2[index])
+        if count_text is None or not INTEGER_LITERAL.match(count_text):
+            return None
+        params: List[int] = []
+        i = index - 1
+        while len(params) < int(count_text) and i >= self.body_start:
+            if not store.is_deleted(i):
+                if store.kinds[i] != PARAM or store.is_formal_parameter(i):
+                    return None
+                params.append(i)
+            i -= 1
+        if len(params) != int(count_text):
+            return None
+        params.reverse()
+        return CallSite(self.name, store.operand_text(store.arg1[index]), index, params,
+                        [store.arg1[i] for i in params], store.result[index])
+
+    def in_loop(self, index: int) -> bool:
+        return self.block_of_index.get(index) in self.loop_blocks
+
+def collect_functions(store: QuadrupleStore) -> Dict[str, FunctionInfo]:
+    """Información de cada función del almacén, por nombre"""
+    return {name: FunctionInfo(store, start, end, name)
+            for start, end, name in function_ranges(store) if name is not None}
+
+class FunctionInliner:
+    """Optimizaciones entre funciones sobre los cuádruplos PARAM/CALL.
+
+    ``eliminate_tail_calls`` convierte la recursión de cola (una función que
+    devuelve directamente el resultado de llamarse a sí misma) en una
+    reasignación de los parámetros y un salto al inicio del cuerpo.
+
+    ``inline_calls`` expande en línea las llamadas a funciones no recursivas
+    según la heurística de tamaño y beneficio. Las funciones se procesan de
+    las llamadas hacia las que llaman, así una función pequeña ya trae
+    expandidas sus propias llamadas. Las variables de la función expandida se
+    renombran (``x_f``, temporales nuevos ``tN``) y sus etiquetas también.
+    """
+    def __init__(self, store: QuadrupleStore, next_temporal: int):
+        self.store = store
+        self.next_temporal = next_temporal
+        self.changes: List[str] = []
+        self.decisions: List[Dict[str, Any]] = []
+        self.tail_calls = 0
+        self.inlined = 0
+
+    # --- Llamadas de cola ---
+
+    def eliminate_tail_calls(self) -> int:
+        store = self.store
+        moves: Dict[int, List[int]] = {}
+        eliminated = 0
+        for name, function in collect_functions(store).items():
+            sites = [site for site in function.calls if site.callee == name]
+            if not sites or not function.self_contained:
+                continue
+            tail_label = None
+            for site in sites:
+                tail = self.tail_position(site, function)
+                if tail is None or len(site.arguments) != len(function.formals):
+                    continue
+                if tail_label is None:
+                    tail_label = self.fresh_name(f"tail_{name}")
+                    label_index = store.append(LABEL, result=tail_label)
+                    moves.setdefault(function.body_start, []).append(label_index)
+
+                # Un argumento que lee un parámetro ya reasignado se copia antes de reasignar ninguno
+                overwritten: Set[int] = set()
+                stale: List[int] = []
+                for formal, argument in zip(function.formals, site.arguments):
+                    if argument in overwritten and argument not in stale:
+                        stale.append(argument)
+                    if argument != formal:
+                        overwritten.add(formal)
+                line = store.lines[site.index]
+                copy_operator = store.operator_id("")
+                replacement: List[int] = []
+                staged: Dict[int, int] = {}
+                for argument in stale:
+                    staged[argument] = store.operand_id(self.new_temporal())
+                    replacement.append(store.append_ids(ASSIGNMENT, copy_operator, argument,
+                                                        NO_OPERAND, staged[argument], line))
+                for formal, argument in zip(function.formals, site.arguments):
+                    if argument != formal:
+                        replacement.append(store.append_ids(ASSIGNMENT, copy_operator, staged.get(argument, argument),
+                                                            NO_OPERAND, formal, line))
+                replacement.append(store.append(JUMP, result=tail_label, line=line))
+
+                for i in site.params + tail:
+                    store.delete(i)
+                moves.setdefault(site.index, []).extend(replacement)
+                store.delete(site.index)
+                eliminated += 1
+                self.changes.append(f"Llamada de cola eliminada en {name}: "
+                                    f"{name}({', '.join(store.operand_text(a) for a in site.arguments)}) "
+                                    f"-> goto {tail_label}")
+        if moves:
+            store.relocate(moves)
+        self.tail_calls += eliminated
+        return eliminated
+
+    def tail_position(self, site: CallSite, function: FunctionInfo) -> Optional[List[int]]:
+        """Cuádruplos entre el CALL y el RETURN de su valor (copias y el RETURN), o None"""
+        store = self.store
+        value = site.result
+        if value == NO_OPERAND:
+            return None
+        following: List[int] = []
+        i = store.next_live(site.index)
+        while i < function.end and store.kinds[i] == ASSIGNMENT and store.arg1[i] == value:
+            following.append(i)
+            value = store.result[i]
+            i = store.next_live(i)
+        if i < function.end and store.kinds[i] == RETURN and store.arg1[i] == value:
+            return following + [i]
+        return None
+
+    # --- Expansión en línea ---
+
+    def inline_calls(self) -> int:
+        store = self.store
+        functions = collect_functions(store)
+        graph = {name: {site.callee for site in function.calls if site.callee in functions}
+                 for name, function in functions.items()}
+        recursive = {name for name in graph if self.reaches(graph, name, name)}
+
+        inlined = 0
+        for caller in self.callees_first(graph):
+            functions = collect_functions(store)  # Índices vigentes tras expandir en la función anterior
+            function = functions[caller]
+            call_counts: Dict[str, int] = {}
+            for other in functions.values():
+                for site in other.calls:
+                    call_counts[site.callee] = call_counts.get(site.callee, 0) + 1
+
+            moves: Dict[int, List[int]] = {}
+            size = function.size
+            renames: Dict[str, Dict[int, int]] = {}  # Nombres compartidos por las copias de una misma función
+            for site in function.calls:
+                callee = functions.get(site.callee)
+                reason, benefit = self.inline_decision(site, function, callee, recursive, call_counts, size)
+                self.decisions.append({
+                    "caller": caller,
+                    "callee": site.callee,
+                    "size": callee.size if callee is not None else None,
+                    "benefit": benefit,
+                    "inlined": reason is None,
+                    "reason": reason or "expandida"
+                })
+                if reason is not None:
+                    continue
+                names = renames.setdefault(site.callee, {})
+                moves[site.index] = self.expand(site, callee, names)
+                for i in site.params:
+                    store.delete(i)
+                store.delete(site.index)
+                size += callee.size
+                inlined += 1
+                self.changes.append(f"Función {site.callee} expandida en {caller} "
+                                    f"({callee.size} cuádruplos, beneficio {benefit})")
+            if moves:
+                store.relocate(moves)
+        self.inlined += inlined
+        return inlined
+
+    def inline_decision(self, site: CallSite, caller: FunctionInfo, callee: Optional[FunctionInfo],
+                        recursive: Set[str], call_counts: Dict[str, int], caller_size: int):
+        """(motivo para no expandir o None, beneficio estimado)"""
+        if callee is None:
+            return "función desconocida", 0
+        benefit = len(site.arguments) + 2 + CONSTANT_ARGUMENT_BONUS * sum(1 for a in site.arguments if a < 0)
+        if caller.in_loop(site.index):
+            benefit *= LOOP_BENEFIT_FACTOR
+        if site.callee in recursive:
+            return "función recursiva", benefit
+        if len(site.arguments) != len(callee.formals):
+            return "número de argumentos distinto", benefit
+        if callee.malformed_calls:
+            return "llamadas internas sin reconocer", benefit
+        if not callee.self_contained:
+            return "lee variables antes de definirlas", benefit
+        if site.result != NO_OPERAND and not callee.always_returns_value:
+            return "no devuelve valor en todos los caminos", benefit
+        if caller_size + callee.size > MAX_FUNCTION_SIZE:
+            return "la función que llama es demasiado grande", benefit
+        single_site = call_counts.get(site.callee, 0) == 1
+        if callee.size - benefit > INLINE_COST_THRESHOLD and not (single_site and callee.size <= SINGLE_CALL_SITE_LIMIT):
+            return "demasiado grande para su beneficio", benefit
+        return None, benefit
+
+    def expand(self, site: CallSite, callee: FunctionInfo, names: Dict[int, int]) -> List[int]:
+        """Agrega una copia renombrada del cuerpo de la función y devuelve sus índices"""
+        store = self.store
+        kinds, arg1, arg2, result, lines = store.kinds, store.arg1, store.arg2, store.result, store.lines
+        copy_operator = store.operator_id("")
+        labels: Dict[int, int] = {}
+        end_label = NO_OPERAND
+        appended: List[int] = []
+
+        def variable(oid: int) -> int:
+            if oid <= 0:
+                return oid
+            if oid not in names:
+                text = store.operand_text(oid)
+                fresh = self.new_temporal() if TEMPORAL_PATTERN.match(text) else self.fresh_name(f"{text}_{callee.name}")
+                names[oid] = store.operand_id(fresh)
+            return names[oid]
+
+        def label(oid: int) -> int:
+            if oid not in labels:
+                labels[oid] = store.operand_id(self.fresh_name(f"{store.operand_text(oid)}_{callee.name}"))
+            return labels[oid]
+
+        line = lines[site.index]
+        for formal, argument in zip(callee.formals, site.arguments):
+            appended.append(store.append_ids(ASSIGNMENT, copy_operator, argument, NO_OPERAND, variable(formal), line))
+
+        for position, i in enumerate(callee.body):
+            kind = kinds[i]
+            if kind == RETURN:
+                if site.result != NO_OPERAND:
+                    appended.append(store.append_ids(ASSIGNMENT, copy_operator, variable(arg1[i]),
+                                                     NO_OPERAND, site.result, lines[i]))
+                if position < len(callee.body) - 1:
+                    if end_label == NO_OPERAND:
+                        end_label = store.operand_id(self.fresh_name(f"ret_{callee.name}"))
+                    appended.append(store.append_ids(JUMP, copy_operator, NO_OPERAND, NO_OPERAND, end_label, lines[i]))
+            elif kind == LABEL:
+                appended.append(store.append_ids(kind, store.operators[i], NO_OPERAND, NO_OPERAND, label(result[i]), lines[i]))
+            elif kind == JUMP:
+                appended.append(store.append_ids(kind, store.operators[i], variable(arg1[i]), NO_OPERAND,
+                                                 label(result[i]), lines[i]))
+            elif kind == CALL:
+                appended.append(store.append_ids(kind, store.operators[i], arg1[i], arg2[i],
+                                                 variable(result[i]), lines[i]))
+            else:
+                appended.append(store.append_ids(kind, store.operators[i], variable(arg1[i]), variable(arg2[i]),
+                                                 variable(result[i]), lines[i]))
+        if end_label != NO_OPERAND:
+            appended.append(store.append_ids(LABEL, copy_operator, NO_OPERAND, NO_OPERAND, end_label, line))
+        return appended
+
+    # --- Utilidades ---
+
+    def callees_first(self, graph: Dict[str, Set[str]]) -> List[str]:
+        """Funciones en postorden del grafo de llamadas (las llamadas antes que quien las llama)"""
+        order: List[str] = []
+        visited: Set[str] = set()
+        for root in graph:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(sorted(graph[root])))]
+            while stack:
+                name, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    order.append(name)
+                elif child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(sorted(graph[child]))))
+        return order
+
+    def reaches(self, graph: Dict[str, Set[str]], source: str, target: str) -> bool:
+        """True si source llama (directa o indirectamente) a target"""
+        seen: Set[str] = set()
+        stack = list(graph[source])
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name not in seen:
+                seen.add(name)
+                stack.extend(graph.get(name, ()))
+        return False
+
+    def new_temporal(self) -> str:
+        name = f"t{self.next_temporal}"
+        self.next_temporal += 1
+        return name
+
+    def fresh_name(self, base: str) -> str:
+        """Nombre que todavía no aparece en el almacén (base, base_2, base_3...)"""
+        name, counter = base, 1
+        while name in self.store.name_ids:
+            counter += 1
+            name = f"{base}_{counter}"
+        return name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tail_calls_eliminated": self.tail_calls,
+            "calls_inlined": self.inlined,
+            "decisions": self.decisions
+        }
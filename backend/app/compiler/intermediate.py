@@ -2,13 +2,14 @@ from app.models.schemas import (
     ASTNode, Quadruple, IntermediateCode, QuadrupleType, 
     SymbolTable, Symbol, SymbolType, DataType
 )
+from app.compiler.ir import QuadrupleStore, KIND_CODES
 from typing import List, Optional, Dict, Tuple
 import uuid
 
 class IntermediateCodeGenerator:
     def __init__(self, symbol_table: SymbolTable):
         self.symbol_table = symbol_table
-        self.quadruples: List[Quadruple] = []
+        self.store = QuadrupleStore()
         self.temporal_counter = 0
         self.label_counter = 0
         self.current_scope = "global"
@@ -29,11 +30,11 @@ class IntermediateCodeGenerator:
         self.visit_node(ast)
         
         print(f"=== GENERACIÓN COMPLETADA ===")
-        print(f"Cuádruplos generados: {len(self.quadruples)}")
+        print(f"Cuádruplos generados: {len(self.store)}")
         print(f"Temporales usados: {self.temporal_counter}")
         
         return IntermediateCode(
-            quadruples=self.quadruples,
+            quadruples=self.store.to_quadruples(),
             temporal_counter=self.temporal_counter,
             label_counter=self.label_counter
         )
@@ -69,9 +70,13 @@ class IntermediateCodeGenerator:
         func_label = f"func_{function_name}"
         self.add_quadruple(QuadrupleType.LABEL, result=func_label)
         
+        # Cabecera: un PARAM por parámetro formal, en orden (define la variable)
+        for parameter in node.children[:-1]:
+            self.add_quadruple(QuadrupleType.PARAM, operator="formal", result=parameter.value)
+        
         # Procesar cuerpo de la función
         if node.children:
-            self.visit_node(node.children[0])  # Block
+            self.visit_node(node.children[-1])  # Block
         
         # Si es la función main, agregar return implícito
         if function_name == "main":
@@ -176,6 +181,38 @@ class IntermediateCodeGenerator:
         """Visita string literal"""
         return f'"{node.value}"'
     
+    def visit_booleanliteral(self, node: ASTNode) -> Optional[str]:
+        """Visita literal booleano (true / false)"""
+        return node.value
+    
+    def visit_callexpression(self, node: ASTNode, keep_result: bool = True) -> Optional[str]:
+        """Visita una llamada: evalúa los argumentos, emite un PARAM por cada uno y el CALL"""
+        # Todos los argumentos se evalúan antes del primer PARAM para que las
+        # llamadas anidadas no intercalen sus propios PARAM
+        arguments = [self.visit_node(argument) for argument in node.children or []]
+        for argument in arguments:
+            self.add_quadruple(QuadrupleType.PARAM, operator="param", arg1=argument)
+        
+        result = self.new_temporal() if keep_result else None
+        self.add_quadruple(
+            QuadrupleType.CALL,
+            operator="call",
+            arg1=node.value,
+            arg2=str(len(arguments)),
+            result=result
+        )
+        print(f"📞 Llamada: {node.value}({', '.join(arguments)}) -> {result}")
+        return result
+    
+    def visit_expressionstatement(self, node: ASTNode) -> Optional[str]:
+        """Visita una expresión usada como sentencia (ej. una llamada cuyo valor se descarta)"""
+        if not node.children:
+            return None
+        expression = node.children[0]
+        if expression.type == "CallExpression":
+            return self.visit_callexpression(expression, keep_result=False)
+        return self.visit_node(expression)
+    
     def visit_ifstatement(self, node: ASTNode) -> Optional[str]:
         """Visita sentencia if y genera saltos condicionales"""
         if not node.children or len(node.children) < 2:
@@ -290,27 +327,24 @@ class IntermediateCodeGenerator:
                      arg1: Optional[str] = None,
                      arg2: Optional[str] = None,
                      result: Optional[str] = None):
-        """Agrega un cuádruplo a la lista"""
-        quadruple = Quadruple(
-            index=len(self.quadruples),
-            operator=operator,
-            arg1=arg1,
-            arg2=arg2,
-            result=result,
-            quadruple_type=quad_type
-        )
-        self.quadruples.append(quadruple)
+        """Agrega un cuádruplo al almacén"""
+        index = self.store.append(KIND_CODES[quad_type], operator, arg1, arg2, result)
         
         # Debug del cuádruplo generado
-        self.print_quadruple(quadruple)
+        self.print_quadruple(index)
     
-    def print_quadruple(self, quad: Quadruple):
+    def print_quadruple(self, index: int):
         """Imprime un cuádruplo de forma legible"""
-        index_str = f"{quad.index:3d}"
-        op_str = f"{quad.operator:10}" if quad.operator else " " * 10
-        arg1_str = f"{quad.arg1:8}" if quad.arg1 else " " * 8
-        arg2_str = f"{quad.arg2:8}" if quad.arg2 else " " * 8
-        result_str = f"{quad.result:8}" if quad.result else " " * 8
+        store = self.store
+        operator = store.operator(index)
+        arg1 = store.operand_text(store.arg1[index])
+        arg2 = store.operand_text(store.arg2[index])
+        result = store.operand_text(store.result[index])
+        index_str = f"{index:3d}"
+        op_str = f"{operator:10}" if operator else " " * 10
+        arg1_str = f"{arg1:8}" if arg1 else " " * 8
+        arg2_str = f"{arg2:8}" if arg2 else " " * 8
+        result_str = f"{result:8}" if result else " " * 8
         
         print(f"🎯 [{index_str}] {op_str} {arg1_str} {arg2_str} {result_str}")
     
@@ -329,7 +363,7 @@ class IntermediateCodeGenerator:
     def get_quadruples_display(self) -> List[Dict]:
         """Retorna los cuádruplos en formato para visualización"""
         display_list = []
-        for quad in self.quadruples:
+        for quad in self.store.to_quadruples():
             display_list.append({
                 "index": quad.index,
                 "operator": quad.operator,
@@ -0,0 +1,345 @@
+from app.models.schemas import Quadruple, QuadrupleType
+from typing import List, Dict, Optional, Iterator, Tuple, Set
+from array import array
+import re
+
+# Códigos enteros de tipo de cuádruplo (el orden es el de QuadrupleType)
+QUADRUPLE_KINDS = tuple(QuadrupleType)
+KIND_CODES = {kind: code for code, kind in enumerate(QUADRUPLE_KINDS)}
+
+ARITHMETIC = KIND_CODES[QuadrupleType.ARITHMETIC]
+ASSIGNMENT = KIND_CODES[QuadrupleType.ASSIGNMENT]
+COMPARISON = KIND_CODES[QuadrupleType.COMPARISON]
+JUMP = KIND_CODES[QuadrupleType.JUMP]
+LABEL = KIND_CODES[QuadrupleType.LABEL]
+PARAM = KIND_CODES[QuadrupleType.PARAM]
+CALL = KIND_CODES[QuadrupleType.CALL]
+RETURN = KIND_CODES[QuadrupleType.RETURN]
+READ = KIND_CODES[QuadrupleType.READ]
+WRITE = KIND_CODES[QuadrupleType.WRITE]
+
+# Tipos que escriben en result y tipos según los argumentos que leen.
+# PARAM lee arg1 en el llamador (argumento real) y define result en la
+# cabecera de la función llamada (parámetro formal).
+DEFINING_KINDS = frozenset((ARITHMETIC, ASSIGNMENT, COMPARISON, CALL, READ, PARAM))
+BINARY_KINDS = frozenset((ARITHMETIC, COMPARISON))
+UNARY_USE_KINDS = frozenset((ASSIGNMENT, JUMP, PARAM, WRITE))
+
+# Marca de cuádruplo eliminado (se descarta en compact())
+TOMBSTONE = 255
+
+# Operando vacío. Los ids positivos son nombres, los negativos constantes del pool
+NO_OPERAND = 0
+
+CONSTANT_PATTERN = re.compile(r'^(-?\d+(\.\d*)?([eE][-+]?\d+)?|"([^"\\]|\\.)*"|true|false)$')
+NO_LINE = -1
+
+_KEEP = object()
+
+class QuadrupleStore:
+    """Almacén de cuádruplos en arreglos paralelos (struct of arrays).
+
+    Cada cuádruplo ocupa una posición en los arreglos ``kinds``, ``operators``,
+    ``arg1``, ``arg2``, ``result`` y ``lines``. Los operandos se internan: los
+    nombres (variables, temporales, etiquetas) tienen ids positivos y las
+    constantes ids negativos que apuntan al pool de constantes. Borrar un
+    cuádruplo solo lo marca con TOMBSTONE; compact() los descarta.
+
+    El almacén mantiene además un índice de etiquetas (etiqueta -> cuádruplo
+    LABEL que la define, etiqueta -> saltos que la referencian), actualizado en
+    cada append/rewrite/delete/compact. Por eso los cambios en cuádruplos LABEL
+    y JUMP deben hacerse con esos métodos y no escribiendo en los arreglos.
+    """
+    def __init__(self):
+        self.kinds = array('B')
+        self.operators = array('H')
+        self.arg1 = array('i')
+        self.arg2 = array('i')
+        self.result = array('i')
+        self.lines = array('i')
+        self.tombstones = 0
+
+        self.operator_table: List[str] = []
+        self.operator_ids: Dict[str, int] = {}
+        self.names: List[Optional[str]] = [None]  # id 0 = sin operando
+        self.name_ids: Dict[str, int] = {}
+        self.constants: List[str] = []
+        self.constant_ids: Dict[str, int] = {}
+
+        self.label_definitions: Dict[int, int] = {}  # etiqueta -> índice del LABEL
+        self.label_references: Dict[int, Set[int]] = {}  # etiqueta -> índices de los JUMP
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def live_count(self) -> int:
+        return len(self.kinds) - self.tombstones
+
+    # --- Internado de operandos ---
+
+    def operand_id(self, text: Optional[str]) -> int:
+        """Interna un operando textual y devuelve su id"""
+        if text is None:
+            return NO_OPERAND
+        oid = self.name_ids.get(text)
+        if oid is not None:
+            return oid
+        oid = self.constant_ids.get(text)
+        if oid is not None:
+            return oid
+        if CONSTANT_PATTERN.match(text):
+            self.constants.append(text)
+            oid = -len(self.constants)
+            self.constant_ids[text] = oid
+        else:
+            self.names.append(text)
+            oid = len(self.names) - 1
+            self.name_ids[text] = oid
+        return oid
+
+    def operand_text(self, oid: int) -> Optional[str]:
+        """Texto de un operando a partir de su id"""
+        if oid > 0:
+            return self.names[oid]
+        if oid < 0:
+            return self.constants[-oid - 1]
+        return None
+
+    def is_constant(self, oid: int) -> bool:
+        return oid < 0
+
+    def operator_id(self, operator: str) -> int:
+        oid = self.operator_ids.get(operator)
+        if oid is None:
+            oid = len(self.operator_table)
+            self.operator_table.append(operator)
+            self.operator_ids[operator] = oid
+        return oid
+
+    def operator(self, index: int) -> str:
+        return self.operator_table[self.operators[index]]
+
+    # --- Definiciones y usos ---
+
+    def defined(self, index: int) -> int:
+        """Id de la variable que define el cuádruplo (NO_OPERAND si no define nada)"""
+        kind = self.kinds[index]
+        if kind in DEFINING_KINDS:
+            return self.result[index]
+        return NO_OPERAND
+
+    def uses(self, index: int) -> Tuple[int, ...]:
+        """Ids de las variables (no constantes) que lee el cuádruplo"""
+        kind = self.kinds[index]
+        if kind in BINARY_KINDS:
+            return tuple(oid for oid in (self.arg1[index], self.arg2[index]) if oid > 0)
+        if kind in UNARY_USE_KINDS:
+            oid = self.arg1[index]
+            return (oid,) if oid > 0 else ()
+        if kind == RETURN:
+            return tuple(oid for oid in (self.arg1[index], self.result[index]) if oid > 0)
+        return ()
+
+    def is_formal_parameter(self, index: int) -> bool:
+        """True si el cuádruplo es un PARAM de cabecera de función (define el parámetro formal)"""
+        return self.kinds[index] == PARAM and self.result[index] != NO_OPERAND
+
+    def use_fields(self, index: int) -> Tuple[str, ...]:
+        """Campos del cuádruplo que se leen como operandos ("arg1", "arg2", "result")"""
+        kind = self.kinds[index]
+        if kind in BINARY_KINDS:
+            return ("arg1", "arg2")
+        if kind in UNARY_USE_KINDS:
+            return ("arg1",)
+        if kind == RETURN:
+            return ("arg1", "result")
+        return ()
+
+    # --- Construcción y reescritura ---
+
+    def append(self,
+               kind: int,
+               operator: str = "",
+               arg1: Optional[str] = None,
+               arg2: Optional[str] = None,
+               result: Optional[str] = None,
+               line: Optional[int] = None) -> int:
+        """Agrega un cuádruplo (operandos textuales) y devuelve su índice"""
+        return self.append_ids(kind, self.operator_id(operator or ""),
+                               self.operand_id(arg1), self.operand_id(arg2),
+                               self.operand_id(result), line)
+
+    def append_ids(self, kind: int, operator_id: int, arg1: int, arg2: int, result: int,
+                   line: Optional[int] = None) -> int:
+        """Agrega un cuádruplo con operandos ya internados"""
+        self.kinds.append(kind)
+        self.operators.append(operator_id)
+        self.arg1.append(arg1)
+        self.arg2.append(arg2)
+        self.result.append(result)
+        self.lines.append(NO_LINE if line is None else line)
+        index = len(self.kinds) - 1
+        self.index_label(index)
+        return index
+
+    def rewrite(self, index: int, kind: int = None, operator: str = None,
+                arg1=_KEEP, arg2=_KEEP, result=_KEEP):
+        """Reescribe en sitio un cuádruplo; los campos omitidos se conservan"""
+        self.unindex_label(index)
+        if kind is not None:
+            self.kinds[index] = kind
+        if operator is not None:
+            self.operators[index] = self.operator_id(operator)
+        if arg1 is not _KEEP:
+            self.arg1[index] = self.operand_id(arg1)
+        if arg2 is not _KEEP:
+            self.arg2[index] = self.operand_id(arg2)
+        if result is not _KEEP:
+            self.result[index] = self.operand_id(result)
+        self.index_label(index)
+
+    def delete(self, index: int):
+        """Elimina un cuádruplo marcándolo con TOMBSTONE"""
+        if self.kinds[index] != TOMBSTONE:
+            self.unindex_label(index)
+            self.kinds[index] = TOMBSTONE
+            self.tombstones += 1
+
+    def is_deleted(self, index: int) -> bool:
+        return self.kinds[index] == TOMBSTONE
+
+    def indices(self) -> Iterator[int]:
+        """Índices de los cuádruplos vivos, en orden"""
+        kinds = self.kinds
+        for index in range(len(kinds)):
+            if kinds[index] != TOMBSTONE:
+                yield index
+
+    def next_live(self, index: int) -> int:
+        """Siguiente índice vivo después de index (o len(self) si no hay)"""
+        kinds = self.kinds
+        index += 1
+        while index < len(kinds) and kinds[index] == TOMBSTONE:
+            index += 1
+        return index
+
+    def compact(self) -> List[int]:
+        """Descarta los TOMBSTONE. Devuelve el mapa índice viejo -> nuevo (-1 si se eliminó)"""
+        if not self.tombstones:
+            return list(range(len(self.kinds)))
+        return self.relocate({})
+
+    def relocate(self, moves: Dict[int, List[int]]) -> List[int]:
+        """Mueve cuádruplos: moves[destino] = índices a colocar justo antes de destino.
+
+        Reconstruye los arreglos en una sola pasada (descartando TOMBSTONE) y
+        devuelve el mapa índice viejo -> nuevo, como compact().
+        """
+        moved = {index for indices in moves.values() for index in indices}
+        order: List[int] = []
+        for index in range(len(self.kinds)):
+            for source in moves.get(index, ()):
+                order.append(source)
+            if index not in moved and self.kinds[index] != TOMBSTONE:
+                order.append(index)
+
+        remap = [-1] * len(self.kinds)
+        kinds, operators = array('B'), array('H')
+        arg1, arg2, result, lines = array('i'), array('i'), array('i'), array('i')
+        for index in order:
+            remap[index] = len(kinds)
+            kinds.append(self.kinds[index])
+            operators.append(self.operators[index])
+            arg1.append(self.arg1[index])
+            arg2.append(self.arg2[index])
+            result.append(self.result[index])
+            lines.append(self.lines[index])
+
+        self.kinds, self.operators = kinds, operators
+        self.arg1, self.arg2, self.result, self.lines = arg1, arg2, result, lines
+        self.tombstones = 0
+        self.label_definitions = {label: remap[i] for label, i in self.label_definitions.items()}
+        self.label_references = {label: {remap[i] for i in refs}
+                                  for label, refs in self.label_references.items()}
+        return remap
+
+    # --- Índice de etiquetas ---
+
+    def index_label(self, index: int):
+        kind = self.kinds[index]
+        if kind == LABEL:
+            self.label_definitions[self.result[index]] = index
+        elif kind == JUMP:
+            self.label_references.setdefault(self.result[index], set()).add(index)
+
+    def unindex_label(self, index: int):
+        kind = self.kinds[index]
+        label = self.result[index]
+        if kind == LABEL:
+            if self.label_definitions.get(label) == index:
+                del self.label_definitions[label]
+        elif kind == JUMP:
+            refs = self.label_references.get(label)
+            if refs is not None:
+                refs.discard(index)
+                if not refs:
+                    del self.label_references[label]
+
+    def label_index(self, label: int) -> Optional[int]:
+        """Índice del cuádruplo LABEL que define la etiqueta"""
+        return self.label_definitions.get(label)
+
+    def is_label_referenced(self, label: int) -> bool:
+        """True si algún salto vivo apunta a la etiqueta"""
+        return label in self.label_references
+
+    def jumps_to(self, label: int) -> Set[int]:
+        """Índices de los saltos que apuntan a la etiqueta"""
+        return self.label_references.get(label, set())
+
+    def copy(self) -> "QuadrupleStore":
+        """Copia barata: duplica los arreglos sin compartir nada mutable con el original"""
+        clone = QuadrupleStore()
+        clone.kinds = array('B', self.kinds)
+        clone.operators = array('H', self.operators)
+        clone.arg1 = array('i', self.arg1)
+        clone.arg2 = array('i', self.arg2)
+        clone.result = array('i', self.result)
+        clone.lines = array('i', self.lines)
+        clone.tombstones = self.tombstones
+        clone.operator_table = list(self.operator_table)
+        clone.operator_ids = dict(self.operator_ids)
+        clone.names = list(self.names)
+        clone.name_ids = dict(self.name_ids)
+        clone.constants = list(self.constants)
+        clone.constant_ids = dict(self.constant_ids)
+        clone.label_definitions = dict(self.label_definitions)
+        clone.label_references = {label: set(refs) for label, refs in self.label_references.items()}
+        return clone
+
+    # --- Conversión a/desde modelos Quadruple (solo para la API) ---
+
+    @classmethod
+    def from_quadruples(cls, quadruples: List[Quadruple]) -> "QuadrupleStore":
+        store = cls()
+        for quad in quadruples:
+            store.append(KIND_CODES[quad.quadruple_type], quad.operator,
+                         quad.arg1, quad.arg2, quad.result, quad.line)
+        return store
+
+    def quadruple(self, index: int, position: Optional[int] = None) -> Quadruple:
+        line = self.lines[index]
+        return Quadruple(
+            index=index if position is None else position,
+            operator=self.operator(index),
+            arg1=self.operand_text(self.arg1[index]),
+            arg2=self.operand_text(self.arg2[index]),
+            result=self.operand_text(self.result[index]),
+            quadruple_type=QUADRUPLE_KINDS[self.kinds[index]],
+            line=None if line == NO_LINE else line
+        )
+
+    def to_quadruples(self) -> List[Quadruple]:
+        """Convierte los cuádruplos vivos a modelos Quadruple, reindexados desde 0"""
+        return [self.quadruple(index, position) for position, index in enumerate(self.indices())]
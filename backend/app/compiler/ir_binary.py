@@ -0,0 +1,201 @@
+from app.models.schemas import IntermediateCode
+from app.compiler.ir import QuadrupleStore, QUADRUPLE_KINDS, TOMBSTONE, NO_OPERAND, NO_LINE
+from typing import List, Tuple, Union
+from array import array
+
+# Formato binario del código intermedio (todo entero es un varint LEB128;
+# los que pueden ser negativos van en zigzag):
+#
+#   "QIR" versión                         4 bytes
+#   temporal_counter label_counter       varints
+#   operadores, nombres, constantes      tres tablas: cantidad y, por cada
+#                                        cadena, longitud en bytes + UTF-8
+#   cantidad de cuádruplos               varint
+#   por cuádruplo: código, operador, [arg1] [arg2] [result] [línea]
+#
+# El byte de código lleva el tipo de cuádruplo en los 4 bits bajos y en los
+# altos qué campos opcionales siguen (los que faltan valen NO_OPERAND o
+# NO_LINE). Los operandos son los ids del QuadrupleStore: positivos para
+# nombres (índice en la tabla, desde 1) y negativos para constantes.
+MAGIC = b"QIR"
+FORMAT_VERSION = 1
+
+HAS_ARG1 = 0x10
+HAS_ARG2 = 0x20
+HAS_RESULT = 0x40
+HAS_LINE = 0x80
+KIND_MASK = 0x0F
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class IRFormatError(ValueError):
+    """Datos que no son código intermedio binario válido (o de otra versión del formato)"""
+
+# --- Varints ---
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def write_signed(out: bytearray, value: int):
+    write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+def read_varint(view: memoryview, position: int) -> Tuple[int, int]:
+    value, shift = 0, 0
+    while True:
+        try:
+            byte = view[position]
+        except IndexError:
+            raise IRFormatError("Código intermedio binario truncado")
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def read_signed(view: memoryview, position: int) -> Tuple[int, int]:
+    value, position = read_varint(view, position)
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), position
+
+def write_strings(out: bytearray, strings: List[str]):
+    write_varint(out, len(strings))
+    for text in strings:
+        encoded = text.encode("utf-8")
+        write_varint(out, len(encoded))
+        out += encoded
+
+def read_strings(view: memoryview, position: int) -> Tuple[List[str], int]:
+    count, position = read_varint(view, position)
+    strings = []
+    for _ in range(count):
+        length, position = read_varint(view, position)
+        if position + length > len(view):
+            raise IRFormatError("Código intermedio binario truncado")
+        strings.append(str(view[position:position + length], "utf-8"))
+        position += length
+    return strings, position
+
+# --- Codificación ---
+
+def encode_store(store: QuadrupleStore, temporal_counter: int = 0, label_counter: int = 0) -> bytes:
+    """Serializa los cuádruplos vivos del almacén (los TOMBSTONE se omiten)"""
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    write_varint(out, temporal_counter)
+    write_varint(out, label_counter)
+    write_strings(out, store.operator_table)
+    write_strings(out, store.names[1:])
+    write_strings(out, store.constants)
+
+    kinds, operators = store.kinds, store.operators
+    arg1, arg2, result, lines = store.arg1, store.arg2, store.result, store.lines
+    write_varint(out, store.live_count)
+    for index in range(len(kinds)):
+        kind = kinds[index]
+        if kind == TOMBSTONE:
+            continue
+        a, b, c, line = arg1[index], arg2[index], result[index], lines[index]
+        code = kind
+        if a != NO_OPERAND:
+            code |= HAS_ARG1
+        if b != NO_OPERAND:
+            code |= HAS_ARG2
+        if c != NO_OPERAND:
+            code |= HAS_RESULT
+        if line != NO_LINE:
+            code |= HAS_LINE
+        out.append(code)
+        write_varint(out, operators[index])
+        if a != NO_OPERAND:
+            write_signed(out, a)
+        if b != NO_OPERAND:
+            write_signed(out, b)
+        if c != NO_OPERAND:
+            write_signed(out, c)
+        if line != NO_LINE:
+            write_varint(out, line)
+    return bytes(out)
+
+def encode(code: IntermediateCode) -> bytes:
+    store = QuadrupleStore.from_quadruples(code.quadruples)
+    return encode_store(store, code.temporal_counter, code.label_counter)
+
+# --- Decodificación ---
+
+def decode_store(data: Buffer) -> Tuple[QuadrupleStore, int, int]:
+    """Reconstruye el almacén leyendo directamente del buffer (sin copiarlo).
+
+    Devuelve (almacén, temporal_counter, label_counter).
+    """
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    if len(view) < len(MAGIC) + 1 or bytes(view[:len(MAGIC)]) != MAGIC:
+        raise IRFormatError("No es código intermedio binario")
+    version = view[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise IRFormatError(f"Versión del formato no soportada: {version} (se esperaba {FORMAT_VERSION})")
+    position = len(MAGIC) + 1
+    temporal_counter, position = read_varint(view, position)
+    label_counter, position = read_varint(view, position)
+
+    store = QuadrupleStore()
+    operators, position = read_strings(view, position)
+    names, position = read_strings(view, position)
+    constants, position = read_strings(view, position)
+    store.operator_table = operators
+    store.operator_ids = {text: oid for oid, text in enumerate(operators)}
+    store.names = [None] + names
+    store.name_ids = {text: oid for oid, text in enumerate(store.names) if oid}
+    store.constants = constants
+    store.constant_ids = {text: -number - 1 for number, text in enumerate(constants)}
+
+    count, position = read_varint(view, position)
+    kind_count = len(QUADRUPLE_KINDS)
+    kinds, operator_ids = array('B'), array('H')
+    arg1, arg2, result, lines = array('i'), array('i'), array('i'), array('i')
+    try:
+        for _ in range(count):
+            code = view[position]
+            kind = code & KIND_MASK
+            if kind >= kind_count:
+                raise IRFormatError(f"Tipo de cuádruplo desconocido: {kind}")
+            # Casi todos los varints ocupan un byte: se leen sin llamar a read_varint
+            operator = view[position + 1]
+            position += 2
+            if operator >= 0x80:
+                operator, position = read_varint(view, position - 1)
+            fields = [NO_OPERAND, NO_OPERAND, NO_OPERAND]
+            for slot, flag in enumerate((HAS_ARG1, HAS_ARG2, HAS_RESULT)):
+                if code & flag:
+                    value = view[position]
+                    position += 1
+                    if value >= 0x80:
+                        value, position = read_varint(view, position - 1)
+                    fields[slot] = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+            line = NO_LINE
+            if code & HAS_LINE:
+                line, position = read_varint(view, position)
+            kinds.append(kind)
+            operator_ids.append(operator)
+            arg1.append(fields[0])
+            arg2.append(fields[1])
+            result.append(fields[2])
+            lines.append(line)
+    except IndexError:
+        raise IRFormatError("Código intermedio binario truncado")
+    if count and (max(operator_ids) >= len(operators) or
+                  max(max(arg1), max(arg2), max(result)) > len(names) or
+                  min(min(arg1), min(arg2), min(result)) < -len(constants)):
+        raise IRFormatError("Operando fuera de las tablas del código intermedio")
+
+    store.kinds, store.operators = kinds, operator_ids
+    store.arg1, store.arg2, store.result, store.lines = arg1, arg2, result, lines
+    for index in range(count):
+        store.index_label(index)
+    return store, temporal_counter, label_counter
+
+def decode(data: Buffer) -> IntermediateCode:
+    store, temporal_counter, label_counter = decode_store(data)
+    return IntermediateCode(quadruples=store.to_quadruples(), temporal_counter=temporal_counter,
+                            label_counter=label_counter)
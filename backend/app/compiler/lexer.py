@@ -1,7 +1,12 @@
 from app.models.schemas import Token
-from typing import List, Tuple
+from typing import BinaryIO, Iterator, List, Tuple, Union
+import mmap
+import os
 import re
 
+# Texto del programa: una cadena o un buffer de bytes UTF-8 (p. ej. un mmap)
+Source = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
 class Lexer:
     def __init__(self):
         # Definición de tokens para nuestro lenguaje similar a C
@@ -42,61 +47,98 @@ class Lexer:
         # Compilar regex
         self.token_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in self.token_specs)
         self.pattern = re.compile(self.token_regex)
+        # Misma expresión sobre bytes UTF-8; un carácter no ASCII suelto es un único MISMATCH
+        # (los espacios no ASCII se descartan en stream, como hace WHITESPACE en str)
+        binary_specs = self.token_specs[:-1] + [('MISMATCH', r'[\xc0-\xff][\x80-\xbf]*|.')]
+        self.binary_pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in binary_specs)
+                                         .encode())
+        self.errors: List[str] = []
     
     def tokenize(self, code: str) -> Tuple[List[Token], List[str]]:
-        tokens = []
-        errors = []
+        tokens = list(self.stream(code))
+        return tokens, self.errors
+    
+    def stream(self, source: Source) -> Iterator[Token]:
+        """Genera los tokens uno a uno, sin construir la lista completa.
+        
+        ``source`` puede ser un str o un buffer de bytes UTF-8 (bytes,
+        bytearray, memoryview o un mmap): sobre un buffer se usa la versión
+        en bytes de la expresión regular, de modo que el texto nunca se
+        decodifica entero. Un memoryview se copia antes a bytes (no tiene
+        rfind); para no copiar, pásese el mmap o los bytes. Los errores léxicos se acumulan en ``self.errors``
+        a medida que se consume el generador.
+        """
+        self.errors = []
+        errors = self.errors
+        if isinstance(source, memoryview):
+            source = source.tobytes()
+        binary = not isinstance(source, str)
+        pattern = self.binary_pattern if binary else self.pattern
+        newline = b'\n' if binary else '\n'
         line_num = 1
         line_start = 0
+        # En bytes la columna se cuenta en caracteres solo si la línea tiene texto no ASCII
+        wide_line = False
         
-        for mo in self.pattern.finditer(code):
+        for mo in pattern.finditer(source):
             kind = mo.lastgroup
             value = mo.group()
-            column = mo.start() - line_start + 1
+            if binary:
+                column = (len(str(source[line_start:mo.start()], 'utf-8', 'replace')) if wide_line
+                          else mo.start() - line_start) + 1
+                if not wide_line and not value.isascii():
+                    wide_line = True
+                value = value.decode('utf-8', 'replace')
+            else:
+                column = mo.start() - line_start + 1
             
             if kind == 'NUMBER':
                 # Determinar si es entero o float
                 token_type = 'FLOAT' if '.' in value else 'INTEGER'
-                tokens.append(Token(type=token_type, value=value, line=line_num, column=column))
+                yield Token(type=token_type, value=value, line=line_num, column=column)
                 
             elif kind == 'STRING':
-                tokens.append(Token(type='STRING', value=value[1:-1], line=line_num, column=column))
+                yield Token(type='STRING', value=value[1:-1], line=line_num, column=column)
                 
             elif kind == 'CHAR':
-                tokens.append(Token(type='CHAR', value=value[1:-1], line=line_num, column=column))
+                yield Token(type='CHAR', value=value[1:-1], line=line_num, column=column)
                 
             elif kind == 'IDENTIFIER':
-                if value in self.keywords:
-                    tokens.append(Token(type='KEYWORD', value=value, line=line_num, column=column))
+                if value in ('true', 'false'):
+                    yield Token(type='BOOLEAN', value=value, line=line_num, column=column)
+                elif value in self.keywords:
+                    yield Token(type='KEYWORD', value=value, line=line_num, column=column)
                 else:
-                    tokens.append(Token(type='IDENTIFIER', value=value, line=line_num, column=column))
+                    yield Token(type='IDENTIFIER', value=value, line=line_num, column=column)
                     
             elif kind == 'OPERATOR':
-                tokens.append(Token(type='OPERATOR', value=value, line=line_num, column=column))
+                yield Token(type='OPERATOR', value=value, line=line_num, column=column)
                 
             elif kind == 'DELIMITER':
-                tokens.append(Token(type='DELIMITER', value=value, line=line_num, column=column))
+                yield Token(type='DELIMITER', value=value, line=line_num, column=column)
                 
-            elif kind == 'WHITESPACE':
-                # Contar saltos de línea para actualizar número de línea
+            elif kind == 'WHITESPACE' or kind == 'COMMENT':
+                # Los comentarios se ignoran; en ambos casos se cuentan los saltos de línea
                 line_breaks = value.count('\n')
                 if line_breaks > 0:
                     line_num += line_breaks
-                    line_start = mo.end() - (len(value) - value.rfind('\n') - 1)
-                continue
-                
-            elif kind == 'COMMENT':
-                # Los comentarios se ignoran en el análisis léxico
-                line_breaks = value.count('\n')
-                if line_breaks > 0:
-                    line_num += line_breaks
-                    line_start = mo.end() - (len(value) - value.rfind('\n') - 1)
-                continue
+                    line_start = source.rfind(newline, mo.start(), mo.end()) + 1
+                    if binary:
+                        wide_line = not source[line_start:mo.end()].isascii()
                 
             elif kind == 'MISMATCH':
+                if binary and value.isspace():
+                    continue  # Espacio no ASCII: en str lo cubre WHITESPACE
                 errors.append(f"Carácter inesperado '{value}' en línea {line_num}, columna {column}")
-                
-        return tokens, errors
+    
+    def stream_file(self, source_file: BinaryIO) -> Iterator[Token]:
+        """Tokens de un archivo UTF-8 abierto en binario, leído a través de un mmap
+        (el archivo no se carga en memoria; el mmap se cierra al agotar el generador)"""
+        if os.fstat(source_file.fileno()).st_size == 0:
+            yield from self.stream(b'')
+            return
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            yield from self.stream(source)
     
     def pretty_print_tokens(self, tokens: List[Token]):
         """Método auxiliar para imprimir tokens de forma legible"""
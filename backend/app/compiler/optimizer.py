@@ -1,264 +1,906 @@
 from app.models.schemas import Quadruple, QuadrupleType
-from typing import List, Dict, Set
+from app.compiler.ir import QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON, JUMP, LABEL, TOMBSTONE
+from app.compiler.cfg import ControlFlowGraph, build_cfgs
+from app.compiler.dataflow import Liveness, AvailableCopies, definition_sites
+from app.compiler.sccp import ConditionalConstants
+from app.compiler.pass_manager import PassManager, OptimizationReport
+from app.compiler.typeinfo import TypeOracle
+from app.compiler.temporaries import TemporaryAllocator
+from app.compiler.ssa import ssa_round_trip
+from app.compiler.inliner import FunctionInliner
+from app.compiler.constants import INTEGER_LITERAL, parse_literal, fold_literals
+from app.models.schemas import SymbolTable
+from typing import List, Dict, Optional, Any
+import time
 import re
 
+# Definiciones sin efectos secundarios: se pueden borrar si su resultado está muerto
+# (salvo las que pueden fallar en ejecución, ver TypeOracle.may_trap)
+PURE_DEFINITIONS = (ASSIGNMENT, ARITHMETIC, COMPARISON)
+
+# Pasadas de cada nivel de optimización (en orden), número máximo de iteraciones,
+# optimizaciones entre funciones (llamadas de cola, expansión en línea), si antes
+# se hace una vuelta por SSA y si al final se reutilizan los temporales
+OPTIMIZATION_LEVELS = {
+    "O0": {"passes": [], "max_iterations": 0, "tail_calls": False, "inline": False,
+           "allocate_temporaries": False, "ssa": False},
+    "O1": {
+        "passes": [
+            "constant_folding",
+            "sparse_conditional_constant_propagation",
+            "copy_propagation",
+            "dead_code_elimination",
+            "redundant_assignment_elimination",
+            "jump_optimization",
+        ],
+        "max_iterations": 1,
+        "tail_calls": True,
+        "inline": False,
+        "allocate_temporaries": False,
+        "ssa": False,
+    },
+    "O2": {
+        "passes": [
+            "constant_folding",
+            "sparse_conditional_constant_propagation",
+            "copy_propagation",
+            "common_subexpression_elimination",
+            "loop_invariant_code_motion",
+            "induction_variable_strength_reduction",
+            "algebraic_simplification",
+            "dead_code_elimination",
+            "redundant_assignment_elimination",
+            "jump_optimization",
+        ],
+        "max_iterations": 10,
+        "tail_calls": True,
+        "inline": True,
+        "allocate_temporaries": True,
+        "ssa": False,
+    },
+    "O3": {
+        "passes": [
+            "constant_folding",
+            "sparse_conditional_constant_propagation",
+            "copy_propagation",
+            "common_subexpression_elimination",
+            "loop_invariant_code_motion",
+            "induction_variable_strength_reduction",
+            "algebraic_simplification",
+            "dead_code_elimination",
+            "redundant_assignment_elimination",
+            "jump_optimization",
+        ],
+        "max_iterations": 10,
+        "tail_calls": True,
+        "inline": True,
+        "allocate_temporaries": True,
+        "ssa": True,
+    },
+}
+
+# Operadores conmutativos y comparaciones que se normalizan invirtiendo operandos
+COMMUTATIVE_OPERATORS = frozenset(('+', '*', '==', '!='))
+SWAPPED_COMPARISONS = {'>': '<', '>=': '<='}
+
+# Reglas de simplificación algebraica y reducción de fuerza.
+# (nombre, operador, posición de la constante, valor de la constante,
+#  el otro operando debe ser "int" o "numeric", reescritura)
+# La posición "same" indica que ambos operandos son la misma variable.
+# Las reglas que cambian el tipo o el valor del resultado si el operando no
+# es entero (x + 0 con un bool, x - x o x << k con un float) exigen "int":
+# un tipo inferido de todas las definiciones, no el declarado.
+POWER_OF_TWO = "2^k"
+ALGEBRAIC_RULES = [
+    ("x + 0 -> x", '+', "right", 0, "int", "copy"),
+    ("0 + x -> x", '+', "left", 0, "int", "copy"),
+    ("x - 0 -> x", '-', "right", 0, "int", "copy"),
+    ("x - x -> 0", '-', "same", None, "int", "zero"),
+    ("x * 1 -> x", '*', "right", 1, "int", "copy"),
+    ("1 * x -> x", '*', "left", 1, "int", "copy"),
+    ("x * 0 -> 0", '*', "right", 0, "int", "zero"),
+    ("0 * x -> 0", '*', "left", 0, "int", "zero"),
+    ("x / 1 -> x", '/', "right", 1, "int", "copy"),
+    ("x * 2 -> x + x", '*', "right", 2, "numeric", "double"),
+    ("2 * x -> x + x", '*', "left", 2, "numeric", "double"),
+    ("x * 2^k -> x << k", '*', "right", POWER_OF_TWO, "int", "shift_left"),
+    ("2^k * x -> x << k", '*', "left", POWER_OF_TWO, "int", "shift_left"),
+    ("x / 2^k -> x >> k", '/', "right", POWER_OF_TWO, "int", "shift_right"),
+]
+
+def power_of_two_exponent(value: int) -> Optional[int]:
+    """k si value == 2**k (k >= 1), si no None"""
+    if value >= 2 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
 class CodeOptimizer:
-    def __init__(self):
-        self.optimizations_applied = []
+    def __init__(self,
+                 level: str = "O2",
+                 max_iterations: Optional[int] = None,
+                 time_budget: Optional[float] = 1.0,
+                 pass_budget: Optional[float] = None,
+                 max_report_entries: int = 200,
+                 symbol_table: Optional[SymbolTable] = None):
+        if level not in OPTIMIZATION_LEVELS:
+            raise ValueError(f"Nivel de optimización desconocido: {level} (use {', '.join(OPTIMIZATION_LEVELS)})")
+        self.level = level
+        config = OPTIMIZATION_LEVELS[level]
+        self.pass_names: List[str] = list(config["passes"])
+        self.max_iterations = config["max_iterations"] if max_iterations is None else max_iterations
+        self.eliminate_tail_calls = config["tail_calls"]
+        self.inline_functions = config["inline"]
+        self.allocate_temporaries = config["allocate_temporaries"]
+        self.use_ssa = config["ssa"]
+        self.time_budget = time_budget
+        self.pass_budget = pass_budget
+        self.report = OptimizationReport(max_entries=max_report_entries)
+        self.symbol_table = symbol_table
+        self.cfgs: Optional[List[ControlFlowGraph]] = None
+        self.temporaries: Optional[TemporaryAllocator] = None
+        self.ssa_summary: Optional[Dict[str, Any]] = None
+        self.inliner: Optional[FunctionInliner] = None
+    
+    @property
+    def optimizations_applied(self) -> List[str]:
+        """Descripciones de las optimizaciones registradas (hasta el tope del reporte)"""
+        return self.report.details
     
     def optimize(self, quadruples: List[Quadruple]) -> List[Quadruple]:
         """Aplica optimizaciones al código intermedio"""
         if not quadruples:
             return []
         
-        print("=== INICIANDO OPTIMIZACIÓN ===")
-        print(f"Cuádruplos antes de optimizar: {len(quadruples)}")
+        store = self.optimize_store(QuadrupleStore.from_quadruples(quadruples))
+        return store.to_quadruples()
+    
+    def optimize_store(self, store: QuadrupleStore) -> QuadrupleStore:
+        """Aplica optimizaciones en sitio sobre un QuadrupleStore"""
+        print(f"=== INICIANDO OPTIMIZACIÓN ({self.level}) ===")
+        print(f"Cuádruplos antes de optimizar: {store.live_count}")
         
-        # Aplicar optimizaciones en secuencia
-        optimized_quads = quadruples.copy()
+        if self.eliminate_tail_calls or self.inline_functions:
+            self.interprocedural_optimization(store)
         
-        # 1. Plegado de constantes
-        optimized_quads = self.constant_folding(optimized_quads)
+        if self.use_ssa:
+            self.static_single_assignment(store)
         
-        # 2. Propagación de constantes
-        optimized_quads = self.constant_propagation(optimized_quads)
+        manager = PassManager(
+            [(name, getattr(self, name)) for name in self.pass_names],
+            self.report,
+            max_iterations=self.max_iterations,
+            time_budget=self.time_budget,
+            pass_budget=self.pass_budget
+        )
+        manager.run(store)
         
-        # 3. Eliminación de código muerto
-        optimized_quads = self.dead_code_elimination(optimized_quads)
+        # Descartar los cuádruplos eliminados (los índices cambian: el CFG ya no es válido)
+        store.compact()
+        self.invalidate_cfgs()
         
-        # 4. Eliminación de asignaciones redundantes
-        optimized_quads = self.redundant_assignment_elimination(optimized_quads)
+        # Reutilizar temporales cuyos rangos de vida no se solapan
+        if self.allocate_temporaries:
+            self.temporaries = TemporaryAllocator(self.symbol_table).allocate(store, self.get_cfgs(store))
+            print(f"♻️ Temporales: {self.temporaries.temporaries_before} -> {self.temporaries.temporaries_after} "
+                  f"(máximo vivos a la vez: {self.temporaries.peak_live})")
         
-        # 5. Optimización de saltos
-        optimized_quads = self.jump_optimization(optimized_quads)
+        print(f"=== OPTIMIZACIÓN COMPLETADA ===")
+        print(f"Cuádruplos después de optimizar: {store.live_count}")
+        print(f"Iteraciones: {self.report.iterations} ({self.report.stop_reason})")
+        print(f"Optimizaciones aplicadas: {self.report.total_entries}")
+        for stats in self.report.passes.values():
+            print(f"  - {stats.name}: {stats.changes} cambios en {stats.runs} ejecuciones ({stats.time * 1000:.2f} ms)")
+        
+        return store
+    
+    def interprocedural_optimization(self, store: QuadrupleStore) -> int:
+        """Optimizaciones entre funciones, antes de las pasadas que trabajan función por función"""
+        self.inliner = FunctionInliner(store, self.next_temporal_number(store))
+        changes = 0
+        if self.eliminate_tail_calls:
+            changes += self.whole_program_step("tail_call_elimination", self.inliner.eliminate_tail_calls)
+            print(f"🔂 Llamadas de cola eliminadas: {self.inliner.tail_calls}")
+        if self.inline_functions:
+            changes += self.whole_program_step("function_inlining", self.inliner.inline_calls)
+            print(f"📥 Llamadas expandidas en línea: {self.inliner.inlined}")
+        store.compact()
+        self.invalidate_cfgs()
+        return changes
+    
+    def whole_program_step(self, name: str, step) -> int:
+        """Ejecuta un paso del FunctionInliner y registra sus cambios y tiempo en el reporte"""
+        stats = self.report.stats(name)
+        self.report.current_pass = name
+        started = time.perf_counter()
+        recorded = len(self.inliner.changes)
         
-        # Reindexar los cuádruplos
-        for i, quad in enumerate(optimized_quads):
-            quad.index = i
+        changes = step()
+        for detail in self.inliner.changes[recorded:]:
+            self.report.add(detail)
         
-        print(f"=== OPTIMIZACIÓN COMPLETADA ===")
-        print(f"Cuádruplos después de optimizar: {len(optimized_quads)}")
-        print(f"Optimizaciones aplicadas: {len(self.optimizations_applied)}")
-        for opt in self.optimizations_applied:
-            print(f"  - {opt}")
+        stats.runs += 1
+        stats.changes += changes
+        stats.time += time.perf_counter() - started
+        self.report.current_pass = None
+        return changes
+    
+    def static_single_assignment(self, store: QuadrupleStore) -> int:
+        """Vuelta por SSA: propagación global de copias/constantes y código muerto sobre SSA"""
+        stats = self.report.stats("static_single_assignment")
+        self.report.current_pass = "static_single_assignment"
+        started = time.perf_counter()
+        
+        self.ssa_summary = ssa_round_trip(store)
+        self.invalidate_cfgs()
+        for detail in self.ssa_summary["changes"]:
+            self.report.add(detail)
+        for error in self.ssa_summary["errors"]:
+            self.report.add(f"SSA inválido en {error}")
         
-        return optimized_quads
+        changes = len(self.ssa_summary["changes"])
+        stats.runs += 1
+        stats.changes += changes
+        stats.time += time.perf_counter() - started
+        self.report.current_pass = None
+        print(f"🧬 SSA: {self.ssa_summary['phis']} phis, {changes} cambios, "
+              f"{len(self.ssa_summary['errors'])} errores de validación")
+        return changes
+    
+    def get_cfgs(self, store: QuadrupleStore) -> List[ControlFlowGraph]:
+        """CFG por función, construido una vez y compartido por todas las pasadas"""
+        if self.cfgs is None:
+            self.cfgs = build_cfgs(store)
+        return self.cfgs
+    
+    def invalidate_cfgs(self):
+        """Descarta los CFG tras un cambio en etiquetas o saltos"""
+        self.cfgs = None
     
-    def constant_folding(self, quadruples: List[Quadruple]) -> List[Quadruple]:
+    def constant_folding(self, store: QuadrupleStore) -> int:
         """Optimización: Plegado de constantes"""
-        optimized = []
         changes = 0
+        kinds, arg1, arg2 = store.kinds, store.arg1, store.arg2
         
-        for quad in quadruples:
-            if (quad.quadruple_type == QuadrupleType.ARITHMETIC and
-                self.is_constant(quad.arg1) and self.is_constant(quad.arg2)):
+        for i in range(len(store)):
+            if (kinds[i] in (ARITHMETIC, COMPARISON) and
+                self.is_constant_id(store, arg1[i]) and self.is_constant_id(store, arg2[i])):
                 
                 # Calcular el resultado en tiempo de compilación
-                result = self.evaluate_constant_expression(
-                    quad.arg1, quad.arg2, quad.operator
-                )
+                left = store.operand_text(arg1[i])
+                right = store.operand_text(arg2[i])
+                operator = store.operator(i)
+                result = self.fold_constants(store, operator, arg1[i], arg2[i])
                 
                 if result is not None:
                     # Reemplazar por asignación directa
-                    new_quad = Quadruple(
-                        index=quad.index,
-                        operator="=",
-                        arg1=str(result),
-                        arg2=None,
-                        result=quad.result,
-                        quadruple_type=QuadrupleType.ASSIGNMENT,
-                        line=quad.line
-                    )
-                    optimized.append(new_quad)
-                    self.optimizations_applied.append(f"Plegado de constantes: {quad.arg1} {quad.operator} {quad.arg2} -> {result}")
+                    store.rewrite(i, kind=ASSIGNMENT, operator="=", arg1=str(result), arg2=None)
+                    self.report.add(f"Plegado de constantes: {left} {operator} {right} -> {result}")
                     changes += 1
-                    continue
-            
-            optimized.append(quad)
         
         print(f"🔧 Plegado de constantes: {changes} cambios")
-        return optimized
+        return changes
     
-    def constant_propagation(self, quadruples: List[Quadruple]) -> List[Quadruple]:
-        """Optimización: Propagación de constantes"""
-        constant_map = {}  # variable -> valor constante
-        optimized = []
+    def sparse_conditional_constant_propagation(self, store: QuadrupleStore) -> int:
+        """Optimización: Propagación condicional de constantes sobre el CFG.
+
+        Sustituye cada operando constante (arg1, arg2 y el valor de return),
+        pliega las expresiones con valor conocido, resuelve los saltos
+        condicionales cuya condición es constante y elimina los bloques que
+        ninguna arista ejecutable alcanza.
+        """
         changes = 0
+        structural = False
+        kinds, result = store.kinds, store.result
+        fields = {"arg1": store.arg1, "arg2": store.arg2, "result": store.result}
         
-        for quad in quadruples:
-            new_quad = quad
+        for cfg in self.get_cfgs(store):
+            analysis = ConditionalConstants(
+                cfg,
+                lambda operator, left, right: self.fold_constants(store, operator, left, right)
+            ).solve()
             
-            # Si es una asignación de constante, registrar
-            if (quad.quadruple_type == QuadrupleType.ASSIGNMENT and 
-                self.is_constant(quad.arg1)):
-                constant_map[quad.result] = quad.arg1
-                self.optimizations_applied.append(f"Propagación: {quad.result} = {quad.arg1}")
-                changes += 1
+            for block in cfg.blocks:
+                state = analysis.block_in[block.id]
+                if state is None:
+                    indices = block.indices(store)
+                    if not indices:
+                        continue
+                    for i in indices:
+                        store.delete(i)
+                    first = store.operand_text(result[indices[0]]) if kinds[indices[0]] == LABEL else f"#{indices[0]}"
+                    self.report.add(f"Bloque inalcanzable eliminado: {first} ({len(indices)} cuádruplos)")
+                    changes += 1
+                    structural = True
+                    continue
+                
+                state = dict(state)
+                for i in block.indices(store):
+                    kind = kinds[i]
+                    # Reemplazar usos de variables con sus valores constantes (todas las posiciones)
+                    for field in store.use_fields(i):
+                        oid = fields[field][i]
+                        if oid > 0 and oid in state:
+                            constant = store.operand_text(state[oid])
+                            self.report.add(f"Reemplazo: {store.operand_text(oid)} -> {constant}")
+                            store.rewrite(i, **{field: constant})
+                            changes += 1
+                    
+                    if kind == JUMP and store.operator(i) != "":
+                        outcome = analysis.branch_outcome(i, state)
+                        target = store.operand_text(result[i])
+                        if outcome is True:
+                            store.rewrite(i, operator="", arg1=None)
+                            self.report.add(f"Salto condicional siempre tomado: goto {target}")
+                        elif outcome is False:
+                            store.delete(i)
+                            self.report.add(f"Salto condicional nunca tomado eliminado: {target}")
+                        if outcome is not None:
+                            changes += 1
+                            structural = True
+                    elif kind == ARITHMETIC or kind == COMPARISON:
+                        constant = analysis.evaluate(i, state)
+                        if constant is not None:
+                            self.report.add(
+                                f"Plegado de constantes: {store.operand_text(store.arg1[i])} {store.operator(i)} "
+                                f"{store.operand_text(store.arg2[i])} -> {store.operand_text(constant)}")
+                            store.rewrite(i, kind=ASSIGNMENT, operator="=",
+                                          arg1=store.operand_text(constant), arg2=None)
+                            changes += 1
+                    
+                    analysis.transfer(i, state)
+        
+        if structural:
+            self.invalidate_cfgs()
+        print(f"📤 Propagación condicional de constantes: {changes} cambios")
+        return changes
+    
+    def copy_propagation(self, store: QuadrupleStore) -> int:
+        """Optimización: Propagación de copias (x = y) con copias disponibles en todo camino"""
+        changes = 0
+        fields = {"arg1": store.arg1, "arg2": store.arg2, "result": store.result}
+        
+        for cfg in self.get_cfgs(store):
+            copies = AvailableCopies(cfg).solve()
+            if not copies.copies:
+                continue
+            for block_id in cfg.order:
+                available = copies.block_in[block_id]
+                for i in cfg.blocks[block_id].indices(store):
+                    for field in store.use_fields(i):
+                        oid = fields[field][i]
+                        source = copies.source_of(oid, available) if oid > 0 else 0
+                        if source:
+                            self.report.add(
+                                f"Propagación de copia: {store.operand_text(oid)} -> {store.operand_text(source)}")
+                            store.rewrite(i, **{field: store.operand_text(source)})
+                            changes += 1
+                    available = copies.transfer_instruction(i, available)
+        
+        print(f"📋 Propagación de copias: {changes} cambios")
+        return changes
+    
+    def dead_code_elimination(self, store: QuadrupleStore) -> int:
+        """Optimización: Eliminación de código muerto (almacenamientos muertos y etiquetas sin uso)"""
+        changes = 0
+        kinds, result = store.kinds, store.result
+        oracle = TypeOracle(store, self.get_cfgs(store))
+        
+        # Eliminar definiciones cuyo resultado no está vivo después (variables y temporales)
+        for cfg in self.get_cfgs(store):
+            liveness = Liveness(cfg).solve()
+            for block_id in cfg.order:
+                live = liveness.block_out[block_id]
+                for i in reversed(cfg.blocks[block_id].indices(store)):
+                    if (kinds[i] in PURE_DEFINITIONS and not live & liveness.variables.mask(result[i])
+                            and not oracle.may_trap(i)):
+                        store.delete(i)
+                        self.report.add(f"Código muerto eliminado: {store.operand_text(result[i])}")
+                        changes += 1
+                        continue
+                    live = liveness.transfer_instruction(i, live)
+        
+        # Eliminar etiquetas no referenciadas
+        labels_removed = 0
+        for i in range(len(store)):
+            if kinds[i] == LABEL:
+                label = store.operand_text(result[i])
+                
+                # No eliminar etiquetas de función (ej. "func_main")
+                if (not label.startswith("func_") and
+                    not store.is_label_referenced(result[i])):
+                    store.delete(i)
+                    self.report.add(f"Etiqueta no usada eliminada: {label}")
+                    labels_removed += 1
+        
+        if labels_removed:
+            self.invalidate_cfgs()
+        changes += labels_removed
+        print(f"🧹 Eliminación de código muerto: {changes} cambios")
+        return changes
+    
+    def redundant_assignment_elimination(self, store: QuadrupleStore) -> int:
+        """Optimización: Eliminación de asignaciones redundantes dentro de bloques básicos extendidos"""
+        changes = 0
+        kinds, arg1, result = store.kinds, store.arg1, store.result
+        
+        for cfg in self.get_cfgs(store):
+            block_out: Dict[int, Dict[int, int]] = {}
+            for block_id in cfg.order:
+                pred = cfg.single_predecessor(block_id)
+                last_assignment = dict(block_out[pred]) if pred in block_out else {}  # variable -> último valor asignado
+                
+                for i in cfg.blocks[block_id].indices(store):
+                    kind = kinds[i]
+                    if kind == ASSIGNMENT:
+                        # Si es la misma asignación repetida, eliminar
+                        if last_assignment.get(result[i]) == arg1[i]:
+                            store.delete(i)
+                            self.report.add(
+                                f"Asignación redundante eliminada: {store.operand_text(result[i])} = {store.operand_text(arg1[i])}")
+                            changes += 1
+                            continue
+                    
+                    if store.defined(i) > 0:
+                        # La variable redefinida (también por CALL o PARAM) invalida lo que se sabía de ella y de sus copias
+                        target = result[i]
+                        for var in [var for var, value in last_assignment.items() if value == target]:
+                            del last_assignment[var]
+                        if kind == ASSIGNMENT and arg1[i] != target:
+                            last_assignment[target] = arg1[i]
+                        else:
+                            last_assignment.pop(target, None)
+                
+                block_out[block_id] = last_assignment
+        
+        print(f"🚫 Eliminación de asignaciones redundantes: {changes} cambios")
+        return changes
+    
+    def common_subexpression_elimination(self, store: QuadrupleStore) -> int:
+        """Optimización: Eliminación de subexpresiones comunes por numeración de valores.
+
+        Dentro de un bloque se reutiliza cualquier expresión cuyos operandos y
+        resultado no hayan sido redefinidos. Entre bloques (recorriendo el árbol
+        de dominadores) solo se reutilizan resultados con una única definición
+        cuyos operandos son constantes o variables de definición única que
+        dominan el cálculo: así el valor no puede cambiar entre ambos puntos.
+        """
+        changes = 0
+        kinds, arg1, arg2, result = store.kinds, store.arg1, store.arg2, store.result
+        
+        for cfg in self.get_cfgs(store):
+            sites = definition_sites(cfg)
+            tree = cfg.dominator_tree()
             
-            # Reemplazar usos de variables con sus valores constantes
-            elif quad.arg1 in constant_map and self.is_constant(constant_map[quad.arg1]):
-                new_quad = Quadruple(
-                    index=quad.index,
-                    operator=quad.operator,
-                    arg1=constant_map[quad.arg1],
-                    arg2=quad.arg2,
-                    result=quad.result,
-                    quadruple_type=quad.quadruple_type,
-                    line=quad.line
-                )
-                self.optimizations_applied.append(f"Reemplazo: {quad.arg1} -> {constant_map[quad.arg1]}")
-                changes += 1
+            def is_stable(oid: int, block_id: int, index: int) -> bool:
+                """Operando cuyo valor es el mismo en todo punto dominado por (block_id, index)"""
+                if oid <= 0:
+                    return True
+                defs = sites.get(oid)
+                if defs is None:
+                    return False
+                if len(defs) != 1:
+                    return False
+                def_block, def_index = defs[0]
+                if def_block == block_id:
+                    return def_index < index
+                return cfg.dominates(def_block, block_id)
             
-            # Si la variable es reasignada, remover de constantes
-            if (quad.quadruple_type == QuadrupleType.ASSIGNMENT and 
-                quad.result in constant_map and 
-                not self.is_constant(quad.arg1)):
-                del constant_map[quad.result]
+            scoped: Dict[tuple, int] = {}  # expresión -> temporal que la contiene (bloques dominadores)
+            stack = [(cfg.entry, False)] if cfg.order else []
+            undo_log: List[List[tuple]] = []
             
-            optimized.append(new_quad)
+            while stack:
+                block_id, leaving = stack.pop()
+                if leaving:
+                    for key, previous in reversed(undo_log.pop()):
+                        if previous is None:
+                            scoped.pop(key, None)
+                        else:
+                            scoped[key] = previous
+                    continue
+                
+                undo: List[tuple] = []
+                local: Dict[tuple, int] = {}  # expresión -> variable (solo este bloque)
+                readers: Dict[int, List[tuple]] = {}  # variable -> expresiones locales que la usan
+                
+                for i in cfg.blocks[block_id].indices(store):
+                    kind = kinds[i]
+                    key = None
+                    if kind == ARITHMETIC or kind == COMPARISON:
+                        key = self.expression_key(store, i)
+                        holder = local.get(key)
+                        if holder is None:
+                            holder = scoped.get(key)
+                        if holder is not None and holder != result[i]:
+                            self.report.add(
+                                f"Subexpresión común: {store.operand_text(result[i])} = "
+                                f"{store.operand_text(arg1[i])} {store.operator(i)} {store.operand_text(arg2[i])} "
+                                f"-> {store.operand_text(holder)}")
+                            store.rewrite(i, kind=ASSIGNMENT, operator="", arg1=store.operand_text(holder), arg2=None)
+                            kind = ASSIGNMENT
+                            key = None
+                            changes += 1
+                    
+                    defined = store.defined(i)
+                    if defined > 0:
+                        # La redefinición invalida las expresiones locales que leen o contienen la variable
+                        for stale in readers.pop(defined, []):
+                            if stale in local:
+                                del local[stale]
+                        for stale in [k for k, v in local.items() if v == defined]:
+                            del local[stale]
+                    
+                    if key is not None and defined not in (key[1], key[2]):
+                        local[key] = defined
+                        for oid in (key[1], key[2]):
+                            if oid > 0:
+                                readers.setdefault(oid, []).append(key)
+                        if (key not in scoped and is_stable(defined, block_id, i + 1) and
+                            is_stable(key[1], block_id, i) and is_stable(key[2], block_id, i)):
+                            undo.append((key, scoped.get(key)))
+                            scoped[key] = defined
+                
+                undo_log.append(undo)
+                stack.append((block_id, True))
+                for child in reversed(tree[block_id]):
+                    stack.append((child, False))
         
-        print(f"📤 Propagación de constantes: {changes} cambios")
-        return optimized
+        print(f"♻️ Subexpresiones comunes: {changes} cambios")
+        return changes
     
-    def dead_code_elimination(self, quadruples: List[Quadruple]) -> List[Quadruple]:
-        """Optimización: Eliminación de código muerto"""
-        used_vars = self.find_used_variables(quadruples)
-        optimized = []
-        changes = 0
+    def expression_key(self, store: QuadrupleStore, index: int) -> tuple:
+        """Clave canónica de una expresión: conmutativas ordenadas y '>'/'>=' como '<'/'<='"""
+        operator = store.operator(index)
+        left, right = store.arg1[index], store.arg2[index]
+        if operator in COMMUTATIVE_OPERATORS:
+            if right < left:
+                left, right = right, left
+        elif operator in SWAPPED_COMPARISONS:
+            operator = SWAPPED_COMPARISONS[operator]
+            left, right = right, left
+        return (operator, left, right)
+    
+    def loop_invariant_code_motion(self, store: QuadrupleStore) -> int:
+        """Optimización: Mover cálculos invariantes de los bucles a su preencabezado.
+
+        El preencabezado es el código justo antes de la etiqueta de cabecera
+        (while_start_N), que solo alcanza el bucle por caída. Se mueve un
+        cálculo si sus operandos son constantes, no se definen en el bucle o
+        vienen de otro cálculo invariante ya elegido, y si su resultado tiene
+        una sola definición y no está vivo ni al entrar al bucle ni al salir.
+        El cálculo pasa a ejecutarse aunque el bucle no dé ninguna vuelta o
+        su bloque no se alcance, así que solo se mueve si los tipos de sus
+        operandos prueban que no puede fallar (TypeOracle.may_trap).
+        """
+        moves: Dict[int, List[int]] = {}  # índice de la etiqueta de cabecera -> cuádruplos a mover
+        chosen = set()  # Un cuádruplo se mueve a lo sumo una vez por ejecución
+        kinds, arg1, arg2, result = store.kinds, store.arg1, store.arg2, store.result
+        oracle = TypeOracle(store, self.get_cfgs(store))
         
-        for quad in quadruples:
-            # Eliminar asignaciones a variables no usadas (que no son temporales)
-            if (quad.quadruple_type == QuadrupleType.ASSIGNMENT and
-                quad.result.startswith('t') and quad.result not in used_vars):
-                self.optimizations_applied.append(f"Código muerto eliminado: {quad.result}")
-                changes += 1
+        for cfg in self.get_cfgs(store):
+            if not cfg.loops:
                 continue
+            sites = definition_sites(cfg)
+            liveness = Liveness(cfg).solve()
             
-            # Eliminar etiquetas no referenciadas
-            if (quad.quadruple_type == QuadrupleType.LABEL and
+            # Bucles internos primero: lo que salga de ellos puede salir del externo en otra iteración
+            for loop in sorted(cfg.loops, key=lambda loop: len(loop.body)):
+                if not self.loop_has_preheader(cfg, loop, store):
+                    continue
+                header = cfg.blocks[loop.header]
                 
-                # --- INICIO DE LA CORRECCIÓN ---
-                # No eliminar etiquetas de función (ej. "func_main")
-                not quad.result.startswith("func_") and
-                # --- FIN DE LA CORRECCIÓN ---
+                loop_defs: Dict[int, int] = {}  # variable -> definiciones dentro del bucle
+                for block_id in loop.body:
+                    for i in cfg.blocks[block_id].indices(store):
+                        defined = store.defined(i)
+                        if defined > 0:
+                            loop_defs[defined] = loop_defs.get(defined, 0) + 1
                 
-                not self.is_label_referenced(quad.result, quadruples)):
+                exit_live = 0
+                for block_id in loop.body:
+                    for succ in cfg.blocks[block_id].successors:
+                        if succ not in loop.body:
+                            exit_live |= liveness.block_in[succ]
+                blocked = liveness.block_in[loop.header] | exit_live
                 
-                self.optimizations_applied.append(f"Etiqueta no usada eliminada: {quad.result}")
-                changes += 1
+                invariant_vars = set()
+                hoisted: List[int] = []
+                loop_indices = sorted(i for block_id in loop.body for i in cfg.blocks[block_id].indices(store))
+                for i in loop_indices:
+                    if kinds[i] not in (ARITHMETIC, COMPARISON) or i in chosen:
+                        continue
+                    target = result[i]
+                    if (len(sites.get(target, ())) != 1 or
+                        blocked & liveness.variables.mask(target)):
+                        continue
+                    if oracle.may_trap(i):
+                        continue
+                    if all(oid <= 0 or oid not in loop_defs or oid in invariant_vars
+                           for oid in (arg1[i], arg2[i])):
+                        invariant_vars.add(target)
+                        hoisted.append(i)
+                
+                if hoisted:
+                    moves.setdefault(header.start, []).extend(hoisted)
+                    chosen.update(hoisted)
+                    for i in hoisted:
+                        self.report.add(
+                            f"Invariante de bucle movido antes de {store.operand_text(header.label)}: "
+                            f"{store.operand_text(result[i])} = {store.operand_text(arg1[i])} "
+                            f"{store.operator(i)} {store.operand_text(arg2[i])}")
+        
+        changes = len(chosen)
+        if changes:
+            store.relocate(moves)
+            self.invalidate_cfgs()
+        print(f"🔁 Código invariante de bucles: {changes} cambios")
+        return changes
+    
+    def loop_has_preheader(self, cfg: ControlFlowGraph, loop, store: QuadrupleStore) -> bool:
+        """True si al bucle solo se entra cayendo desde el bloque anterior a su cabecera"""
+        header = cfg.blocks[loop.header]
+        if header.label is None:
+            return False
+        outside_preds = [pred for pred in header.predecessors if pred not in loop.body]
+        if outside_preds != [header.id - 1]:
+            return False
+        pred_last = cfg.blocks[header.id - 1].last(store)
+        return pred_last is None or store.kinds[pred_last] != JUMP
+    
+    def algebraic_simplification(self, store: QuadrupleStore) -> int:
+        """Optimización: Simplificación algebraica y reducción de fuerza guiada por ALGEBRAIC_RULES"""
+        changes = 0
+        oracle = TypeOracle(store)
+        kinds, arg1, arg2, result = store.kinds, store.arg1, store.arg2, store.result
+        
+        for i in range(len(store)):
+            if kinds[i] != ARITHMETIC:
                 continue
+            operator = store.operator(i)
+            function = oracle.function_of_index[i]
+            left, right = arg1[i], arg2[i]
             
-            optimized.append(quad)
+            for name, rule_operator, position, value, required, rewrite in ALGEBRAIC_RULES:
+                if operator != rule_operator:
+                    continue
+                if position == "same":
+                    if left != right or left <= 0:
+                        continue
+                    other, constant = left, None
+                else:
+                    constant, other = (right, left) if position == "right" else (left, right)
+                    constant = self.integer_constant(store, constant)
+                    if constant is None:
+                        continue
+                    if value == POWER_OF_TWO:
+                        if power_of_two_exponent(constant) is None:
+                            continue
+                    elif constant != value:
+                        continue
+                
+                if required == "int" and not oracle.is_integer(other, function):
+                    continue
+                if required == "numeric" and not oracle.is_numeric(other, function):
+                    continue
+                
+                before = (f"{store.operand_text(result[i])} = {store.operand_text(left)} "
+                          f"{operator} {store.operand_text(right)}")
+                other_text = store.operand_text(other)
+                if rewrite == "copy":
+                    store.rewrite(i, kind=ASSIGNMENT, operator="", arg1=other_text, arg2=None)
+                elif rewrite == "zero":
+                    store.rewrite(i, kind=ASSIGNMENT, operator="", arg1="0", arg2=None)
+                elif rewrite == "double":
+                    store.rewrite(i, operator='+', arg1=other_text, arg2=other_text)
+                elif rewrite == "shift_left":
+                    store.rewrite(i, operator='<<', arg1=other_text, arg2=str(power_of_two_exponent(constant)))
+                elif rewrite == "shift_right":
+                    store.rewrite(i, operator='>>', arg1=other_text, arg2=str(power_of_two_exponent(constant)))
+                self.report.add(f"Regla '{name}': {before}")
+                changes += 1
+                break
         
-        print(f"🧹 Eliminación de código muerto: {changes} cambios")
-        return optimized
+        print(f"🧮 Simplificación algebraica: {changes} cambios")
+        return changes
     
-    def redundant_assignment_elimination(self, quadruples: List[Quadruple]) -> List[Quadruple]:
-        """Optimización: Eliminación de asignaciones redundantes"""
-        optimized = []
+    def induction_variable_strength_reduction(self, store: QuadrupleStore) -> int:
+        """Optimización: Reducción de fuerza de variables de inducción.
+
+        Para una variable de inducción básica i (única definición en el bucle,
+        de la forma i = i ± c) y un cálculo t = i * k (o i << k) con k constante,
+        se crea un temporal s = i * k en el preencabezado, se actualiza
+        s = s ± c*k justo después de cada incremento de i y t pasa a ser t = s.
+        """
+        oracle = TypeOracle(store)
+        kinds, arg1, arg2, result = store.kinds, store.arg1, store.arg2, store.result
+        moves: Dict[int, List[int]] = {}
+        reduced = set()
         changes = 0
-        last_assignment = {}  # variable -> último valor asignado
-        
-        for quad in quadruples:
-            if quad.quadruple_type == QuadrupleType.ASSIGNMENT:
-                # Si es la misma asignación repetida, eliminar
-                if (quad.result in last_assignment and 
-                    last_assignment[quad.result] == quad.arg1):
-                    self.optimizations_applied.append(f"Asignación redundante eliminada: {quad.result} = {quad.arg1}")
-                    changes += 1
+        next_temporal = self.next_temporal_number(store)
+        
+        for cfg in self.get_cfgs(store):
+            if not cfg.loops:
+                continue
+            sites = definition_sites(cfg)
+            for loop in sorted(cfg.loops, key=lambda loop: len(loop.body)):
+                if not self.loop_has_preheader(cfg, loop, store):
                     continue
+                loop_indices = sorted(i for block_id in loop.body for i in cfg.blocks[block_id].indices(store))
+                in_loop = set(loop_indices)
                 
-                last_assignment[quad.result] = quad.arg1
-            
-            # Resetear seguimiento en saltos y etiquetas
-            elif quad.quadruple_type in [QuadrupleType.JUMP, QuadrupleType.LABEL]:
-                last_assignment.clear()
-            
-            optimized.append(quad)
+                induction_steps: Dict[int, tuple] = {}  # i -> (índice de su definición, paso)
+                loop_defs: Dict[int, List[int]] = {}
+                for i in loop_indices:
+                    defined = store.defined(i)
+                    if defined > 0:
+                        loop_defs.setdefault(defined, []).append(i)
+                for variable, defs in loop_defs.items():
+                    if len(defs) == 1 and oracle.is_integer(variable, cfg.name):
+                        step = self.induction_step(store, defs[0], variable, sites, in_loop)
+                        if step is not None:
+                            induction_steps[variable] = (defs[0], step)
+                
+                created: Dict[tuple, int] = {}  # (i, k) -> temporal reducido
+                for i in loop_indices:
+                    if kinds[i] != ARITHMETIC or i in reduced:
+                        continue
+                    operator = store.operator(i)
+                    if operator not in ('*', '<<'):
+                        continue
+                    variable, factor = arg1[i], self.integer_constant(store, arg2[i])
+                    if factor is None and operator == '*':
+                        variable, factor = arg2[i], self.integer_constant(store, arg1[i])
+                    if factor is None or variable not in induction_steps:
+                        continue
+                    if operator == '<<':
+                        factor = 1 << factor
+                    
+                    def_index, step = induction_steps[variable]
+                    key = (variable, factor)
+                    if key not in created:
+                        reduced_name = f"t{next_temporal}"
+                        next_temporal += 1
+                        variable_text = store.operand_text(variable)
+                        init = store.append(ARITHMETIC, '*', variable_text, str(factor), reduced_name)
+                        update = store.append(ARITHMETIC, '+', reduced_name, str(step * factor), reduced_name)
+                        moves.setdefault(cfg.blocks[loop.header].start, []).append(init)
+                        moves.setdefault(store.next_live(def_index), []).append(update)
+                        created[key] = store.result[init]
+                        self.report.add(
+                            f"Reducción de fuerza: {reduced_name} = {variable_text} * {factor} "
+                            f"antes de {store.operand_text(cfg.blocks[loop.header].label)}, "
+                            f"{reduced_name} += {step * factor} por iteración")
+                    
+                    self.report.add(
+                        f"Reducción de fuerza: {store.operand_text(result[i])} = {store.operand_text(arg1[i])} "
+                        f"{operator} {store.operand_text(arg2[i])} -> {store.operand_text(created[key])}")
+                    store.rewrite(i, kind=ASSIGNMENT, operator="", arg1=store.operand_text(created[key]), arg2=None)
+                    reduced.add(i)
+                    changes += 1
         
-        print(f"🚫 Eliminación de asignaciones redundantes: {changes} cambios")
-        return optimized
+        if moves:
+            store.relocate(moves)
+            self.invalidate_cfgs()
+        print(f"📉 Reducción de fuerza de variables de inducción: {changes} cambios")
+        return changes
+    
+    def induction_step(self, store: QuadrupleStore, def_index: int, variable: int,
+                       sites: Dict[int, List[tuple]], in_loop: set) -> Optional[int]:
+        """Paso constante c si la definición es i = i + c / i - c (directa o vía temporal)"""
+        kind = store.kinds[def_index]
+        if kind == ASSIGNMENT:
+            source = store.arg1[def_index]
+            source_defs = sites.get(source, [])
+            if source <= 0 or len(source_defs) != 1 or source_defs[0][1] not in in_loop:
+                return None
+            def_index = source_defs[0][1]
+            if store.kinds[def_index] != ARITHMETIC:
+                return None
+        elif kind != ARITHMETIC:
+            return None
+        
+        operator = store.operator(def_index)
+        left, right = store.arg1[def_index], store.arg2[def_index]
+        if operator == '+':
+            if left == variable:
+                return self.integer_constant(store, right)
+            if right == variable:
+                return self.integer_constant(store, left)
+        elif operator == '-' and left == variable:
+            step = self.integer_constant(store, right)
+            return None if step is None else -step
+        return None
+    
+    def integer_constant(self, store: QuadrupleStore, oid: int) -> Optional[int]:
+        """Valor de un literal entero (None si el operando no lo es)"""
+        if oid >= 0:
+            return None
+        text = store.operand_text(oid)
+        return int(text) if INTEGER_LITERAL.match(text) else None
     
-    def jump_optimization(self, quadruples: List[Quadruple]) -> List[Quadruple]:
+    def next_temporal_number(self, store: QuadrupleStore) -> int:
+        """Primer número libre para un temporal nuevo (tN)"""
+        highest = -1
+        for name in store.names[1:]:
+            if name[0] == 't' and name[1:].isdigit():
+                highest = max(highest, int(name[1:]))
+        return highest + 1
+    
+    def jump_optimization(self, store: QuadrupleStore) -> int:
         """Optimización: Simplificación de saltos"""
-        optimized = []
         changes = 0
-        i = 0
+        kinds, result = store.kinds, store.result
         
-        while i < len(quadruples):
-            current = quadruples[i]
+        for i in range(len(store)):
+            if kinds[i] != JUMP:
+                continue
+            
+            # Salto a un salto incondicional: apuntar directamente al destino final
+            target = self.final_jump_target(store, result[i])
+            if target != result[i]:
+                self.report.add(
+                    f"Salto encadenado: {store.operand_text(result[i])} -> {store.operand_text(target)}")
+                store.rewrite(i, result=store.operand_text(target))
+                changes += 1
             
-            # Saltos consecutivos
-            if (i + 1 < len(quadruples) and
-                current.quadruple_type == QuadrupleType.JUMP and
-                quadruples[i + 1].quadruple_type == QuadrupleType.LABEL and
-                current.result == quadruples[i + 1].result):
+            # Salto hacia la etiqueta inmediatamente siguiente
+            following = store.next_live(i)
+            if (following < len(store) and
+                kinds[following] == LABEL and
+                result[i] == result[following]):
                 
                 # Eliminar salto redundante
-                self.optimizations_applied.append(f"Salto redundante eliminado a {current.result}")
+                store.delete(i)
+                self.report.add(f"Salto redundante eliminado a {store.operand_text(result[i])}")
                 changes += 1
-                i += 1  # Saltar el cuádruplo actual
-                continue
-            
-            optimized.append(current)
-            i += 1
         
+        if changes:
+            self.invalidate_cfgs()
         print(f"⤴️ Optimización de saltos: {changes} cambios")
-        return optimized
+        return changes
+    
+    def final_jump_target(self, store: QuadrupleStore, label: int) -> int:
+        """Sigue cadenas 'etiqueta: goto otra' usando el índice de etiquetas"""
+        seen = {label}
+        while True:
+            index = store.label_index(label)
+            if index is None:
+                return label
+            following = store.next_live(index)
+            if (following >= len(store) or store.kinds[following] != JUMP or
+                store.operator(following) != ""):
+                return label
+            next_label = store.result[following]
+            if next_label in seen:
+                return label  # Ciclo de saltos: no seguir
+            seen.add(next_label)
+            label = next_label
     
     def is_constant(self, value: str) -> bool:
-        """Verifica si un valor es constante (número)"""
-        if value is None:
-            return False
-        return value.isdigit() or (value.startswith('"') and value.endswith('"'))
+        """Verifica si un valor es un literal (int, float, bool o string)"""
+        return parse_literal(value) is not None
     
-    def evaluate_constant_expression(self, arg1: str, arg2: str, operator: str) -> int:
-        """Evalúa una expresión constante en tiempo de compilación"""
-        try:
-            val1 = int(arg1)
-            val2 = int(arg2)
-            
-            if operator == '+': return val1 + val2
-            elif operator == '-': return val1 - val2
-            elif operator == '*': return val1 * val2
-            elif operator == '/': return val1 // val2 if val2 != 0 else None
-            elif operator == '>': return 1 if val1 > val2 else 0
-            elif operator == '<': return 1 if val1 < val2 else 0
-            elif operator == '>=': return 1 if val1 >= val2 else 0
-            elif operator == '<=': return 1 if val1 <= val2 else 0
-            elif operator == '==': return 1 if val1 == val2 else 0
-            elif operator == '!=': return 1 if val1 != val2 else 0
-        except:
-            return None
-        
-        return None
+    def is_constant_id(self, store: QuadrupleStore, oid: int) -> bool:
+        """Verifica si un operando internado es constante"""
+        return oid < 0 and self.is_constant(store.operand_text(oid))
     
-    def find_used_variables(self, quadruples: List[Quadruple]) -> Set[str]:
-        """Encuentra todas las variables usadas en los cuádruplos"""
-        used = set()
-        
-        for quad in quadruples:
-            if quad.arg1 and quad.arg1.startswith('t'):
-                used.add(quad.arg1)
-            if quad.arg2 and quad.arg2.startswith('t'):
-                used.add(quad.arg2)
-            if quad.result and quad.result.startswith('t'):
-                used.add(quad.result)
-        
-        return used
+    def fold_constants(self, store: QuadrupleStore, operator: str, left: int, right: int) -> Optional[str]:
+        """Texto del resultado de operar dos constantes internadas (None si no se puede)"""
+        if not (self.is_constant_id(store, left) and self.is_constant_id(store, right)):
+            return None
+        return self.evaluate_constant_expression(store.operand_text(left), store.operand_text(right), operator)
     
-    def is_label_referenced(self, label: str, quadruples: List[Quadruple]) -> bool:
-        """Verifica si una etiqueta es referenciada por algún salto"""
-        for quad in quadruples:
-            if (quad.quadruple_type == QuadrupleType.JUMP and 
-                quad.result == label):
-                return True
-        return False
+    def evaluate_constant_expression(self, arg1: str, arg2: str, operator: str) -> Optional[str]:
+        """Evalúa una expresión constante en tiempo de compilación con el retículo tipado"""
+        return fold_literals(operator, arg1, arg2)
     
-    def get_optimization_report(self) -> Dict[str, any]:
+    def get_optimization_report(self) -> Dict[str, Any]:
         """Genera un reporte de las optimizaciones aplicadas"""
-        return {
-            "total_optimizations": len(self.optimizations_applied),
-            "optimizations": self.optimizations_applied,
-            "reduction_percentage": 0  # Se calculará después
-        }
\ No newline at end of file
+        report = self.report.to_dict()
+        if self.temporaries is not None:
+            report["temporaries"] = self.temporaries.to_dict()
+        if self.inliner is not None:
+            report["interprocedural"] = self.inliner.to_dict()
+        if self.ssa_summary is not None:
+            report["ssa"] = {key: value for key, value in self.ssa_summary.items() if key != "changes"}
+        return report
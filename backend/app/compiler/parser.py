@@ -1,10 +1,16 @@
-from app.models.schemas import ASTNode, Token
-from typing import List, Optional, Tuple
+from app.models.schemas import ASTNode, Token, DataType
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
 from app.compiler.lexer import Lexer
+from collections import deque
+
+TYPE_KEYWORDS = ("int", "float", "bool", "string")
 
 class Parser:
     def __init__(self):
-        self.tokens = []
+        # Los tokens se consumen de un iterador (una lista o el generador de
+        # Lexer.stream); solo se guardan los que peek() ya adelantó
+        self.tokens: Iterator[Token] = iter(())
+        self.lookahead: Deque[Token] = deque()
         self.current_token = None
         self.token_index = 0
         self.errors = []
@@ -28,16 +34,16 @@ class Parser:
             
         return node
     
-    def parse(self, tokens: List[Token]) -> Tuple[Optional[ASTNode], List[str]]:
-        self.tokens = tokens
+    def parse(self, tokens: Iterable[Token]) -> Tuple[Optional[ASTNode], List[str]]:
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
         self.token_index = 0
         self.errors = []
         
-        if not tokens:
+        self.current_token = next(self.tokens, None)
+        if self.current_token is None:
             return None, ["No hay tokens para analizar"]
         
-        self.current_token = self.tokens[0]
-        
         try:
             ast = self.parse_program()
             
@@ -49,12 +55,18 @@ class Parser:
             self.errors.append(f"Error de parsing: {str(e)}")
             return None, self.errors
     
+    def peek(self, offset: int = 1) -> Optional[Token]:
+        """Token a ``offset`` posiciones del actual, sin consumirlo"""
+        while len(self.lookahead) < offset:
+            token = next(self.tokens, None)
+            if token is None:
+                return None
+            self.lookahead.append(token)
+        return self.lookahead[offset - 1]
+    
     def advance(self):
         self.token_index += 1
-        if self.token_index < len(self.tokens):
-            self.current_token = self.tokens[self.token_index]
-        else:
-            self.current_token = None
+        self.current_token = self.lookahead.popleft() if self.lookahead else next(self.tokens, None)
     
     def expect(self, token_type: str, value: str = None) -> bool:
         if not self.current_token:
@@ -92,9 +104,16 @@ class Parser:
         return node
     
     def parse_function(self) -> Optional[ASTNode]:
+        """FunctionDeclaration → 'function' Type? IDENTIFIER '(' Parameters? ')' Block"""
         if not self.consume("KEYWORD", "function"):
             return None
         
+        # Tipo de retorno opcional (sin tipo la función es void)
+        return_type = None
+        if self.current_token and self.current_token.type == "KEYWORD" and self.current_token.value in TYPE_KEYWORDS:
+            return_type = DataType(self.current_token.value)
+            self.advance()
+        
         if not self.expect("IDENTIFIER"):
             return None
         
@@ -104,6 +123,18 @@ class Parser:
         if not self.consume("DELIMITER", "("):
             return None
         
+        parameters = []
+        if self.current_token and self.current_token.value != ")":
+            while True:
+                parameter = self.parse_parameter()
+                if not parameter:
+                    return None
+                parameters.append(parameter)
+                if self.current_token and self.current_token.value == ",":
+                    self.advance()  # consume ','
+                    continue
+                break
+        
         if not self.consume("DELIMITER", ")"):
             return None
         
@@ -111,7 +142,27 @@ class Parser:
         if not block_node:
             return None
         
-        return self.create_ast_node("FunctionDeclaration", function_name, [block_node])
+        # Los parámetros van antes del bloque: el cuerpo siempre es el último hijo
+        node = self.create_ast_node("FunctionDeclaration", function_name, parameters + [block_node])
+        node.data_type = return_type
+        return node
+    
+    def parse_parameter(self) -> Optional[ASTNode]:
+        """Parameter → Type IDENTIFIER"""
+        if not self.current_token or self.current_token.value not in TYPE_KEYWORDS:
+            found = self.current_token.value if self.current_token else "fin de archivo"
+            line = self.current_token.line if self.current_token else "?"
+            self.errors.append(f"Se esperaba el tipo de un parámetro pero se encontró '{found}' en línea {line}")
+            return None
+        parameter_type = DataType(self.current_token.value)
+        self.advance()
+        
+        if not self.expect("IDENTIFIER"):
+            return None
+        node = self.create_ast_node("Parameter", self.current_token.value)
+        node.data_type = parameter_type
+        self.advance()
+        return node
     
     def parse_block(self) -> Optional[ASTNode]:
         if not self.consume("DELIMITER", "{"):
@@ -141,7 +192,7 @@ class Parser:
             return None
         
         if self.current_token.type == "KEYWORD":
-            if self.current_token.value in ["int", "float", "bool", "string"]:
+            if self.current_token.value in TYPE_KEYWORDS:
                 return self.parse_declaration()
             elif self.current_token.value == "if":
                 return self.parse_if_statement()
@@ -179,29 +230,30 @@ class Parser:
         return self.create_ast_node("VariableDeclaration", type_token.value, children)
     
     def parse_assignment_or_expression(self) -> Optional[ASTNode]:
-        if self.current_token and self.current_token.type == "IDENTIFIER":
+        # Un token de anticipación basta para distinguir la asignación: no hay retroceso
+        following = self.peek()
+        if (self.current_token and self.current_token.type == "IDENTIFIER"
+                and following and following.value == "="):
             identifier = self.current_token.value
-            save_index = self.token_index
-            
             self.advance()
+            self.advance()
+            expression = self.parse_expression()
             
-            if self.current_token and self.current_token.value == "=":
+            if expression and self.current_token and self.current_token.value == ";":
                 self.advance()
-                expression = self.parse_expression()
-                
-                if expression and self.current_token and self.current_token.value == ";":
-                    self.advance()
-                    return self.create_ast_node(
-                        "Assignment",
-                        "=",
-                        [
-                            self.create_ast_node("Identifier", identifier),
-                            expression
-                        ]
-                    )
+                return self.create_ast_node(
+                    "Assignment",
+                    "=",
+                    [
+                        self.create_ast_node("Identifier", identifier),
+                        expression
+                    ]
+                )
             
-            self.token_index = save_index
-            self.current_token = self.tokens[save_index]
+            if expression:
+                line = self.current_token.line if self.current_token else following.line
+                self.errors.append(f"Se esperaba ';' después de la asignación en línea {line}")
+            return None
         
         expression = self.parse_expression()
         if expression and self.current_token and self.current_token.value == ";":
@@ -362,11 +414,15 @@ class Parser:
         return left
     
     def parse_primary_expression(self) -> Optional[ASTNode]:
-        """PrimaryExpression → IDENTIFIER | NUMBER | STRING | '(' Expression ')' | BOOLEAN"""
+        """PrimaryExpression → CallExpression | IDENTIFIER | NUMBER | STRING | '(' Expression ')' | BOOLEAN"""
         if not self.current_token:
             return None
         
         if self.current_token.type == "IDENTIFIER":
+            following = self.peek()
+            if following and following.value == "(":
+                return self.parse_call_expression()
+            
             # CORRECCIÓN: Sin keyword arguments
             node = self.create_ast_node("Identifier", self.current_token.value, None)
             self.advance()
@@ -403,6 +459,29 @@ class Parser:
             self.errors.append(f"Expresión primaria esperada pero se encontró {self.current_token.type} '{self.current_token.value}' en línea {self.current_token.line}")
             return None
 
+    def parse_call_expression(self) -> Optional[ASTNode]:
+        """CallExpression → IDENTIFIER '(' (Expression (',' Expression)*)? ')'"""
+        node = self.create_ast_node("CallExpression", self.current_token.value)
+        node.children = []
+        self.advance()  # consume el nombre
+        if not self.consume("DELIMITER", "("):
+            return None
+        
+        if self.current_token and self.current_token.value != ")":
+            while True:
+                argument = self.parse_expression()
+                if not argument:
+                    return None
+                node.children.append(argument)
+                if self.current_token and self.current_token.value == ",":
+                    self.advance()  # consume ','
+                    continue
+                break
+        
+        if not self.consume("DELIMITER", ")"):
+            return None
+        return node
+
     def pretty_print_ast(self, node: ASTNode, level=0):
         """Método auxiliar para imprimir el AST de forma legible"""
         indent = "  " * level
@@ -0,0 +1,137 @@
+from app.compiler.ir import QuadrupleStore
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import time
+
+class PassStats:
+    """Estadísticas acumuladas de una pasada de optimización"""
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.changes = 0
+        self.time = 0.0
+        self.disabled = False  # Agotó su presupuesto de tiempo
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "changes": self.changes,
+            "time_ms": round(self.time * 1000, 3),
+            "budget_exhausted": self.disabled
+        }
+
+class OptimizationReport:
+    """Reporte estructurado de optimización con un tope de entradas detalladas"""
+    def __init__(self, max_entries: int = 200):
+        self.max_entries = max_entries
+        self.entries: List[Dict[str, Any]] = []
+        self.total_entries = 0
+        self.passes: Dict[str, PassStats] = {}
+        self.current_pass: Optional[str] = None
+        self.iteration = 0
+        self.iterations = 0
+        self.converged = False
+        self.stop_reason: Optional[str] = None
+        self.quadruples_before = 0
+        self.quadruples_after = 0
+
+    def add(self, detail: str):
+        """Registra una optimización aplicada; por encima del tope solo se cuenta"""
+        self.total_entries += 1
+        if len(self.entries) < self.max_entries:
+            self.entries.append({
+                "pass": self.current_pass,
+                "iteration": self.iteration,
+                "detail": detail
+            })
+
+    def stats(self, name: str) -> PassStats:
+        if name not in self.passes:
+            self.passes[name] = PassStats(name)
+        return self.passes[name]
+
+    @property
+    def details(self) -> List[str]:
+        return [entry["detail"] for entry in self.entries]
+
+    def to_dict(self) -> Dict[str, Any]:
+        before = self.quadruples_before
+        reduction = (before - self.quadruples_after) / before * 100 if before else 0
+        return {
+            "total_optimizations": self.total_entries,
+            "optimizations": self.entries,
+            "truncated": self.total_entries - len(self.entries),
+            "iterations": self.iterations,
+            "converged": self.converged,
+            "stop_reason": self.stop_reason,
+            "passes": [stats.to_dict() for stats in self.passes.values()],
+            "quadruples_before": before,
+            "quadruples_after": self.quadruples_after,
+            "reduction_percentage": round(reduction, 2)
+        }
+
+class PassManager:
+    """Ejecuta una secuencia de pasadas hasta un punto fijo, con límites de iteraciones y tiempo.
+
+    Cada pasada es una función ``store -> número de cambios``. Una iteración
+    ejecuta todas las pasadas habilitadas en orden; se repite mientras alguna
+    haga cambios, sin superar ``max_iterations`` ni ``time_budget`` (segundos).
+    Una pasada cuyo tiempo acumulado supera ``pass_budget`` se deshabilita.
+    """
+    def __init__(self,
+                 passes: List[Tuple[str, Callable[[QuadrupleStore], int]]],
+                 report: OptimizationReport,
+                 max_iterations: int = 1,
+                 time_budget: Optional[float] = None,
+                 pass_budget: Optional[float] = None):
+        self.passes = passes
+        self.report = report
+        self.max_iterations = max_iterations
+        self.time_budget = time_budget
+        self.pass_budget = pass_budget
+
+    def run(self, store: QuadrupleStore) -> OptimizationReport:
+        report = self.report
+        report.quadruples_before = store.live_count
+        started = time.perf_counter()
+
+        if not self.passes:
+            report.converged = True
+            report.stop_reason = "sin pasadas"
+
+        while self.passes and report.iterations < self.max_iterations:
+            report.iterations += 1
+            report.iteration = report.iterations
+            iteration_changes = 0
+
+            for name, run_pass in self.passes:
+                stats = report.stats(name)
+                if stats.disabled:
+                    continue
+                if self.time_budget is not None and time.perf_counter() - started > self.time_budget:
+                    report.stop_reason = "presupuesto de tiempo agotado"
+                    break
+
+                report.current_pass = name
+                pass_started = time.perf_counter()
+                changes = run_pass(store)
+                stats.time += time.perf_counter() - pass_started
+                stats.runs += 1
+                stats.changes += changes
+                iteration_changes += changes
+
+                if self.pass_budget is not None and stats.time > self.pass_budget:
+                    stats.disabled = True
+
+            report.current_pass = None
+            if report.stop_reason:
+                break
+            if iteration_changes == 0:
+                report.converged = True
+                report.stop_reason = "punto fijo"
+                break
+
+        if report.stop_reason is None:
+            report.stop_reason = "límite de iteraciones"
+        report.quadruples_after = store.live_count
+        return report
@@ -0,0 +1,311 @@
+from app.models.schemas import Quadruple
+from app.compiler.codeobject import OBJECT_FILENAME
+from app.compiler.vm import VMProgram, VirtualMachine, DEFAULT_MAX_STEPS
+from app.compiler.ir import QuadrupleStore, NO_LINE
+from app.compiler.ir_binary import encode_store, decode_store
+from types import CodeType
+from typing import Any, Dict, List, Optional
+import marshal
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+
+try:
+    import resource  # Solo en sistemas Unix
+except ImportError:
+    resource = None
+
+# Límites por defecto de una ejecución en el sandbox
+DEFAULT_CPU_TIME = 2.0  # segundos de CPU del trabajador
+DEFAULT_WALL_TIME = 5.0  # segundos de reloj; pasado este tiempo el trabajador se mata
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024  # bytes de memoria adicional por trabajador
+DEFAULT_MAX_OUTPUT = 64 * 1024  # caracteres de salida de print
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_RUNS = 50  # Ejecuciones antes de reciclar un trabajador
+
+BACKEND_PYTHON = "python"  # Objeto código (marshal) ejecutado con exec
+BACKEND_VM = "vm"  # Código intermedio binario (ir_binary) ejecutado por la máquina virtual
+BACKENDS = (BACKEND_PYTHON, BACKEND_VM)
+
+class CPUTimeExceeded(BaseException):
+    """Deriva de BaseException para que no la capturen los manejadores de errores del programa (p. ej. los de la VM)"""
+    pass
+
+class OutputLimitExceeded(BaseException):
+    """Como CPUTimeExceeded: la VM la deja pasar en lugar de anotarla como error del programa"""
+    pass
+
+class RunLimits:
+    """Límites de una ejecución: CPU, reloj, memoria, salida y pasos (estos solo en la VM)"""
+    def __init__(self, cpu_time: float = DEFAULT_CPU_TIME, wall_time: float = DEFAULT_WALL_TIME,
+                 memory: int = DEFAULT_MEMORY_LIMIT, max_output: int = DEFAULT_MAX_OUTPUT,
+                 max_steps: int = DEFAULT_MAX_STEPS):
+        self.cpu_time = cpu_time
+        self.wall_time = wall_time
+        self.memory = memory
+        self.max_output = max_output
+        self.max_steps = max_steps
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"cpu_time": self.cpu_time, "wall_time": self.wall_time, "memory": self.memory,
+                "max_output": self.max_output, "max_steps": self.max_steps}
+
+# --- Lado del trabajador ---
+
+class OutputCapture:
+    """Sustituye a print: acumula la salida y corta al superar el límite de caracteres"""
+    def __init__(self, max_output: int):
+        self.max_output = max_output
+        self.parts: List[str] = []
+        self.size = 0
+        self.truncated = False
+
+    def print(self, *values, sep: str = " ", end: str = "\n", **kwargs):
+        text = sep.join(str(value) for value in values) + end
+        self.write(text)
+
+    def write(self, text: str):
+        remaining = self.max_output - self.size
+        if len(text) > remaining:
+            self.parts.append(text[:remaining])
+            self.size = self.max_output
+            self.truncated = True
+            raise OutputLimitExceeded()
+        self.parts.append(text)
+        self.size += len(text)
+
+    def lines(self) -> List[str]:
+        return "".join(self.parts).splitlines()
+
+def on_cpu_timer(signum, frame):
+    raise CPUTimeExceeded()
+
+def limit_memory(memory: int):
+    """Limita el espacio de direcciones a lo que ya usa el trabajador más ``memory`` bytes"""
+    if resource is None or not hasattr(resource, "RLIMIT_AS"):
+        return
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError):
+        current = 0
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + memory
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def error_line(error: BaseException) -> int:
+    """Línea del programa fuente donde se produjo el error (la del último marco del objeto código)"""
+    line = NO_LINE
+    for frame in traceback.extract_tb(error.__traceback__):
+        if frame.filename == OBJECT_FILENAME:
+            line = frame.lineno
+    return line
+
+def execute_python(job: Dict[str, Any], capture: OutputCapture, result: Dict[str, Any]):
+    code: CodeType = marshal.loads(job["code"])
+    # Solo print está disponible: el código generado no usa otros nombres integrados
+    namespace = {"__name__": "__main__", "__builtins__": {"print": capture.print}}
+    exec(code, namespace)
+
+def execute_vm(job: Dict[str, Any], capture: OutputCapture, result: Dict[str, Any]):
+    store, _, _ = decode_store(memoryview(job["ir"]))
+    # La salida pasa por la captura a medida que se imprime, con su límite
+    machine = VirtualMachine(VMProgram.decode(store), max_steps=job["max_steps"], time_limit=None,
+                             output=capture.print)
+    execution = machine.run()
+    result["status"] = execution.status
+    result["error"] = execution.error
+    result["return_value"] = None if execution.return_value is None else str(execution.return_value)
+    result["instructions"] = execution.instructions
+
+EXECUTORS = {BACKEND_PYTHON: execute_python, BACKEND_VM: execute_vm}
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un trabajo en el proceso actual con el límite de CPU y la salida capturada"""
+    capture = OutputCapture(job["max_output"])
+    result: Dict[str, Any] = {"status": "ok", "error": None, "return_value": None}
+    timer = hasattr(signal, "setitimer")
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        if timer:
+            signal.setitimer(signal.ITIMER_PROF, job["cpu_time"])
+        EXECUTORS[job["backend"]](job, capture, result)
+    except CPUTimeExceeded:
+        result["status"] = "cpu_limit"
+        result["error"] = f"Se superó el límite de tiempo de CPU ({job['cpu_time']} s)"
+    except OutputLimitExceeded:
+        result["status"] = "output_limit"
+        result["error"] = f"Se superó el límite de salida ({job['max_output']} caracteres)"
+    except MemoryError:
+        result["status"] = "memory_limit"
+        result["error"] = "Se superó el límite de memoria"
+    except RecursionError:
+        result["status"] = "error"
+        result["error"] = "Se superó la profundidad máxima de recursión"
+    except Exception as e:
+        line = error_line(e)
+        where = f" (línea {line})" if line != NO_LINE else ""
+        message = "división entre cero" if isinstance(e, ZeroDivisionError) else str(e)
+        result["status"] = "error"
+        result["error"] = f"Error en tiempo de ejecución{where}: {message}"
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+    result["output"] = capture.lines()
+    result["truncated"] = capture.truncated
+    result["elapsed"] = time.perf_counter() - started
+    result["cpu_time"] = time.process_time() - cpu_started
+    return result
+
+def worker_main(connection, memory: int):
+    """Bucle del trabajador: recibe trabajos hasta que le llega None o se cierra la tubería"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # El Ctrl+C lo gestiona el proceso principal
+    if hasattr(signal, "SIGPROF"):
+        signal.signal(signal.SIGPROF, on_cpu_timer)
+    limit_memory(memory)
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        connection.send(run_job(job))
+
+# --- Lado del servidor ---
+
+class Worker:
+    def __init__(self, context, memory: int):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, memory), daemon=True)
+        self.process.start()
+        child.close()
+        self.runs = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(0.5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+class WorkerPool:
+    """Procesos trabajadores creados de antemano que ejecutan los programas compilados.
+
+    Con el método ``fork`` los trabajadores heredan los módulos ya importados,
+    así que una ejecución no paga el arranque del intérprete. Cada trabajador
+    atiende un trabajo a la vez; el límite de CPU se aplica con un temporizador
+    ITIMER_PROF dentro del trabajador, la memoria con RLIMIT_AS y el tiempo de
+    reloj desde aquí (si el trabajador no responde se mata y se sustituye).
+    Tras ``max_runs`` ejecuciones el trabajador se recicla para que el estado
+    acumulado (memoria fragmentada, cachés) no pase de una ejecución a otra.
+    """
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_runs: int = DEFAULT_MAX_RUNS,
+                 limits: Optional[RunLimits] = None):
+        self.size = size
+        self.max_runs = max_runs
+        self.limits = limits or RunLimits()
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self.idle: "queue.Queue[Worker]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = False
+        self.runs = 0
+        self.recycled = 0
+        self.killed = 0
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            for _ in range(self.size):
+                self.idle.put(self.spawn())
+            self.started = True
+
+    def spawn(self) -> Worker:
+        return Worker(self.context, self.limits.memory)
+
+    def shutdown(self):
+        with self.lock:
+            while True:
+                try:
+                    self.idle.get_nowait().stop()
+                except queue.Empty:
+                    break
+            self.started = False
+
+    def run_python(self, code: CodeType, limits: Optional[RunLimits] = None) -> Dict[str, Any]:
+        return self.run({"backend": BACKEND_PYTHON, "code": marshal.dumps(code)}, limits)
+
+    def run_quadruples(self, quadruples: List[Quadruple], limits: Optional[RunLimits] = None) -> Dict[str, Any]:
+        return self.run_ir(encode_store(QuadrupleStore.from_quadruples(quadruples)), limits)
+
+    def run_ir(self, data: bytes, limits: Optional[RunLimits] = None) -> Dict[str, Any]:
+        """Ejecuta en la VM código intermedio ya serializado con ir_binary"""
+        return self.run({"backend": BACKEND_VM, "ir": data}, limits)
+
+    def run(self, job: Dict[str, Any], limits: Optional[RunLimits] = None) -> Dict[str, Any]:
+        """Envía el trabajo a un trabajador libre (espera a que haya uno) y devuelve su resultado"""
+        self.start()
+        limits = limits or self.limits
+        job = dict(job, cpu_time=limits.cpu_time, max_output=limits.max_output, max_steps=limits.max_steps)
+        worker = self.idle.get()
+        healthy = False
+        try:
+            worker.connection.send(job)
+            if worker.connection.poll(limits.wall_time):
+                result = worker.connection.recv()
+                healthy = True
+            else:
+                result = self.failure("time_limit", f"Se superó el límite de tiempo ({limits.wall_time} s)")
+        except (EOFError, OSError) as e:
+            # El trabajador murió durante la ejecución (p. ej. por el límite de memoria del sistema)
+            result = self.failure("error", f"El proceso de ejecución terminó inesperadamente: {e}")
+        worker.runs += 1
+        result["worker"] = worker.pid
+        with self.lock:
+            self.runs += 1
+        self.release(worker, healthy)
+        return result
+
+    def release(self, worker: Worker, healthy: bool):
+        if not healthy:
+            worker.kill()
+            with self.lock:
+                self.killed += 1
+            worker = self.spawn()
+        elif worker.runs >= self.max_runs:
+            worker.stop()
+            with self.lock:
+                self.recycled += 1
+            worker = self.spawn()
+        self.idle.put(worker)
+
+    def failure(self, status: str, error: str) -> Dict[str, Any]:
+        return {"status": status, "error": error, "return_value": None, "output": [],
+                "truncated": False, "elapsed": None, "cpu_time": None}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"size": self.size, "max_runs": self.max_runs, "start_method": self.context.get_start_method(),
+                "runs": self.runs, "recycled": self.recycled, "killed": self.killed,
+                "limits": self.limits.to_dict()}
+
+# Compartido entre peticiones: se arranca en la primera ejecución (o al iniciar la aplicación)
+worker_pool = WorkerPool(size=int(os.environ.get("RUN_WORKERS", DEFAULT_POOL_SIZE)))
@@ -0,0 +1,127 @@
+from app.compiler.ir import ARITHMETIC, ASSIGNMENT, COMPARISON, JUMP
+from app.compiler.cfg import ControlFlowGraph
+from app.compiler.constants import parse_literal, truth_value
+from typing import Callable, Dict, List, Optional
+from collections import deque
+
+# Estado de un bloque: variable -> id de la constante que contiene.
+# Una variable ausente no es constante; un bloque sin estado (None) aún no es ejecutable.
+ConstantState = Dict[int, int]
+
+class ConditionalConstants:
+    """Propagación condicional de constantes sobre el CFG (Wegman y Zadeck).
+
+    Solo se visitan los bloques alcanzables por aristas ejecutables: un salto
+    condicional cuya condición es constante marca únicamente la arista que se
+    toma. Los estados se reúnen por intersección en las uniones, de modo que
+    una variable es constante en un punto solo si vale lo mismo en todos los
+    caminos ejecutables que llegan a él.
+
+    ``fold(operador, id_izquierdo, id_derecho)`` devuelve el texto del
+    resultado constante o None si no se puede evaluar.
+    """
+    def __init__(self, cfg: ControlFlowGraph, fold: Callable[[str, int, int], Optional[str]]):
+        self.cfg = cfg
+        self.store = cfg.store
+        self.fold = fold
+        self.block_in: List[Optional[ConstantState]] = [None] * len(cfg.blocks)
+        self.block_out: List[Optional[ConstantState]] = [None] * len(cfg.blocks)
+        self.executable_edges = set()
+
+    @property
+    def executable_blocks(self) -> List[int]:
+        return [block.id for block in self.cfg.blocks if self.block_in[block.id] is not None]
+
+    def solve(self) -> "ConditionalConstants":
+        cfg = self.cfg
+        if not cfg.blocks:
+            return self
+        worklist = deque([cfg.entry])
+        self.block_in[cfg.entry] = {}
+
+        while worklist:
+            block_id = worklist.popleft()
+            state = dict(self.block_in[block_id])
+            for i in cfg.blocks[block_id].indices(self.store):
+                self.transfer(i, state)
+            self.block_out[block_id] = state
+
+            for target in self.taken_successors(block_id, state):
+                self.executable_edges.add((block_id, target))
+                merged = self.merge(target)
+                if merged != self.block_in[target]:
+                    self.block_in[target] = merged
+                    if target not in worklist:
+                        worklist.append(target)
+        return self
+
+    def merge(self, block_id: int) -> ConstantState:
+        """Intersección de los estados de salida de los predecesores ejecutables"""
+        merged: Optional[ConstantState] = None
+        for pred in self.cfg.blocks[block_id].predecessors:
+            if (pred, block_id) not in self.executable_edges:
+                continue
+            out = self.block_out[pred]
+            if merged is None:
+                merged = out
+            else:
+                merged = {var: value for var, value in merged.items() if out.get(var) == value}
+        return merged if merged is not None else {}
+
+    def value(self, oid: int, state: ConstantState) -> Optional[int]:
+        """Id de la constante que contiene el operando, si se conoce"""
+        if oid < 0:
+            return oid
+        return state.get(oid)
+
+    def evaluate(self, index: int, state: ConstantState) -> Optional[int]:
+        """Id de la constante que produce el cuádruplo (None si no es constante)"""
+        store = self.store
+        kind = store.kinds[index]
+        if kind == ASSIGNMENT:
+            return self.value(store.arg1[index], state)
+        if kind == ARITHMETIC or kind == COMPARISON:
+            left = self.value(store.arg1[index], state)
+            right = self.value(store.arg2[index], state)
+            if left is None or right is None:
+                return None
+            text = self.fold(store.operator(index), left, right)
+            return None if text is None else store.operand_id(text)
+        return None
+
+    def transfer(self, index: int, state: ConstantState):
+        defined = self.store.defined(index)
+        if defined <= 0:
+            return
+        constant = self.evaluate(index, state)
+        if constant is None:
+            state.pop(defined, None)
+        else:
+            state[defined] = constant
+
+    def branch_outcome(self, index: int, state: ConstantState) -> Optional[bool]:
+        """True/False si el salto condicional se toma siempre/nunca, None si no se sabe"""
+        store = self.store
+        condition = self.value(store.arg1[index], state)
+        if condition is None:
+            return None
+        literal = parse_literal(store.operand_text(condition))
+        truth = None if literal is None else truth_value(literal)
+        if truth is None:
+            return None
+        return not truth  # if_false salta cuando la condición es falsa
+
+    def taken_successors(self, block_id: int, state: ConstantState) -> List[int]:
+        cfg, store = self.cfg, self.store
+        block = cfg.blocks[block_id]
+        last = block.last(store)
+        if last is None or store.kinds[last] != JUMP or store.operator(last) == "":
+            return list(block.successors)
+
+        outcome = self.branch_outcome(last, state)
+        if outcome is None:
+            return list(block.successors)
+        target = cfg.label_blocks.get(store.result[last])
+        fallthrough = block_id + 1 if block_id + 1 < len(cfg.blocks) else None
+        chosen = target if outcome else fallthrough
+        return [chosen] if chosen is not None else []
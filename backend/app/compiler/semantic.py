@@ -1,14 +1,141 @@
 from app.models.schemas import ASTNode, SymbolTable, Symbol, SemanticResult, SymbolType, DataType
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Any
+from collections import OrderedDict
+import hashlib
+
+def hash_function_ast(node: ASTNode) -> str:
+    """Calcula un hash estable del AST de una función.
+
+    Incluye tipo, valor, tipo de dato (parámetros y retorno) y línea de cada
+    nodo (las líneas aparecen en los diagnósticos y en los nombres de scope),
+    pero no la columna.
+    """
+    digest = hashlib.sha1()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is None:
+            digest.update(b"\x00")
+            continue
+        children = current.children or []
+        digest.update(f"{current.type}\x1f{current.value}\x1f{current.data_type}\x1f{current.line}\x1f"
+                      f"{len(children)}\x1e".encode("utf-8"))
+        stack.extend(reversed(children))
+    return digest.hexdigest()
+
+class FunctionAnalysis:
+    """Resultado semántico de una función, listo para reutilizarse"""
+    def __init__(self,
+                 table: SymbolTable,
+                 errors: List[str],
+                 warnings: List[str],
+                 unused_warnings: List[str],
+                 uninitialized_warnings: List[str],
+                 dependencies: Dict[str, Any],
+                 global_effects: Dict[str, Tuple[bool, bool]],
+                 memory_size: int):
+        self.table = table  # Direcciones de memoria relativas al inicio de la función
+        self.errors = errors
+        self.warnings = warnings
+        self.unused_warnings = unused_warnings
+        self.uninitialized_warnings = uninitialized_warnings
+        self.dependencies = dependencies  # símbolo global -> firma observada
+        self.global_effects = global_effects  # símbolo global -> (usado, inicializado)
+        self.memory_size = memory_size
+
+class SemanticCache:
+    """Caché LRU de análisis semántico por función, indexada por hash del AST"""
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, FunctionAnalysis]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[FunctionAnalysis]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: FunctionAnalysis):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+class ScopeTracker:
+    """Seguimiento por scope con bitsets: un bit por símbolo, en orden de declaración"""
+    def __init__(self, table: SymbolTable):
+        self.table = table
+        self.positions: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.variables = 0
+        self.used = 0
+        self.initialized = 0
+        self.unused_warnings: List[str] = []
+        self.uninitialized_warnings: List[str] = []
+
+    def declare(self, symbol: Symbol):
+        bit = 1 << len(self.names)
+        self.positions[symbol.name] = len(self.names)
+        self.names.append(symbol.name)
+        if symbol.symbol_type == SymbolType.VARIABLE:
+            self.variables |= bit
+        if symbol.used:
+            self.used |= bit
+        if symbol.initialized:
+            self.initialized |= bit
+
+    def mark(self, name: str, used: bool = False, initialized: bool = False):
+        bit = 1 << self.positions[name]
+        if used:
+            self.used |= bit
+        if initialized:
+            self.initialized |= bit
+
+    def close(self):
+        """Emite los diagnósticos del scope; ya no puede haber más referencias a sus símbolos"""
+        self.unused_warnings = self.warnings_for(self.variables & ~self.used,
+                                                 "declarada pero no usada")
+        self.uninitialized_warnings = self.warnings_for(self.variables & self.used & ~self.initialized,
+                                                        "usada pero no inicializada")
+
+    def warnings_for(self, bits: int, message: str) -> List[str]:
+        found = []
+        while bits:
+            lowest = bits & -bits
+            name = self.names[lowest.bit_length() - 1]
+            found.append(f"Variable '{name}' {message} en scope '{self.table.symbols[name].scope}'")
+            bits ^= lowest
+        return found
 
 class SemanticAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[SemanticCache] = None):
         self.current_scope = "global"
         self.symbol_table = SymbolTable(scope_name="global", level=0)
         self.errors = []
         self.warnings = []
         self.scope_stack = [self.symbol_table]
         self.memory_counter = 0
+        self.cache = cache
+        self.reused_functions: List[str] = []
+        
+        # Un tracker por scope abierto, en paralelo a scope_stack
+        self.tracker_stack = [ScopeTracker(self.symbol_table)]
+        # Trackers de todos los scopes en preorden (orden de entrada)
+        self.scope_trackers: List[ScopeTracker] = []
+        # Diagnósticos de cierre de scope por función, en orden de declaración
+        self.function_diagnostics: List[Tuple[List[str], List[str]]] = []
+        # Dependencias globales de la función que se está analizando
+        self.global_dependencies: Optional[Dict[str, Any]] = None
     
     def analyze(self, ast: ASTNode) -> SemanticResult:
         """Analiza el AST semánticamente"""
@@ -20,8 +147,19 @@ class SemanticAnalyzer:
         
         print("=== INICIANDO ANÁLISIS SEMÁNTICO ===")
         self.visit_node(ast)
-        self.check_unused_variables()
-        self.check_initialized_variables()
+        
+        # El scope global se cierra al terminar el programa
+        global_tracker = self.tracker_stack[0]
+        global_tracker.close()
+        self.warnings.extend(global_tracker.unused_warnings)
+        for unused_warnings, _ in self.function_diagnostics:
+            self.warnings.extend(unused_warnings)
+        self.warnings.extend(global_tracker.uninitialized_warnings)
+        for _, uninitialized_warnings in self.function_diagnostics:
+            self.warnings.extend(uninitialized_warnings)
+        
+        if self.reused_functions:
+            print(f"♻️ Funciones reutilizadas de caché: {', '.join(self.reused_functions)}")
         
         print(f"=== ANÁLISIS COMPLETADO ===")
         print(f"Errores: {len(self.errors)}")
@@ -44,6 +182,9 @@ class SemanticAnalyzer:
         )
         parent_table.children.append(new_table)
         self.scope_stack.append(new_table)
+        tracker = ScopeTracker(new_table)
+        self.tracker_stack.append(tracker)
+        self.scope_trackers.append(tracker)
         self.current_scope = scope_name
         print(f"🔽 Entrando al scope: {scope_name}")
     
@@ -51,6 +192,7 @@ class SemanticAnalyzer:
         """Sale del scope actual"""
         if len(self.scope_stack) > 1:
             old_scope = self.scope_stack.pop()
+            self.tracker_stack.pop().close()
             self.current_scope = self.scope_stack[-1].scope_name
             print(f"🔼 Saliendo del scope: {old_scope.scope_name}")
     
@@ -76,38 +218,138 @@ class SemanticAnalyzer:
     def visit_program(self, node: ASTNode):
         """Visita el nodo Program"""
         if node.children:
-            for child in node.children:
+            # Primero se declaran todas las funciones: una función puede llamar
+            # a otra definida más abajo (o a sí misma)
+            declared = [child for child in node.children if self.declare_function(child)]
+            for child in declared:
                 self.visit_node(child)
     
-    def visit_functiondeclaration(self, node: ASTNode):
-        """Visita una declaración de función"""
+    def declare_function(self, node: ASTNode) -> bool:
+        """Agrega la firma de una función a la tabla global (False si ya estaba declarada)"""
+        if node.type != "FunctionDeclaration":
+            return True
         function_name = node.value
         
         # Verificar si la función ya existe en scope global
         if function_name in self.symbol_table.symbols:
             self.errors.append(f"Función '{function_name}' ya declarada (línea {node.line})")
-            return
+            return False
         
         # Agregar función a la tabla global
         function_entry = Symbol(
             name=function_name,
             symbol_type=SymbolType.FUNCTION,
-            data_type=DataType.VOID,
+            data_type=node.data_type or DataType.VOID,
             scope="global",
             line=node.line or 0,
-            memory_address=self.allocate_memory()
+            memory_address=self.allocate_memory(),
+            parameters=[parameter.data_type for parameter in node.children[:-1]]
         )
         self.symbol_table.symbols[function_name] = function_entry
+        self.tracker_stack[0].declare(function_entry)
+        return True
+    
+    def visit_functiondeclaration(self, node: ASTNode):
+        """Visita una declaración de función (ya declarada por visit_program)"""
+        function_name = node.value
+        
+        cache_key = hash_function_ast(node) if self.cache is not None else None
+        if cache_key is not None:
+            entry = self.cache.get(cache_key)
+            if entry is not None and self.dependencies_match(entry):
+                self.reuse_function_analysis(entry)
+                return
+        
+        base_address = self.memory_counter
+        errors_start = len(self.errors)
+        warnings_start = len(self.warnings)
+        trackers_start = len(self.scope_trackers)
+        self.global_dependencies = {}
         
         # Entrar al scope de la función
         self.enter_scope(function_name)
+        function_table = self.get_current_table()
+        
+        # Los parámetros son símbolos del scope de la función, inicializados por la llamada
+        for parameter in node.children[:-1]:
+            self.declare_parameter(parameter)
         
         # Visitar el cuerpo de la función
         if node.children:
-            self.visit_node(node.children[0])  # Block
+            self.visit_node(node.children[-1])  # Block
         
         # Salir del scope de la función
         self.exit_scope()
+        
+        function_trackers = self.scope_trackers[trackers_start:]
+        unused_warnings = [w for tracker in function_trackers for w in tracker.unused_warnings]
+        uninitialized_warnings = [w for tracker in function_trackers for w in tracker.uninitialized_warnings]
+        self.function_diagnostics.append((unused_warnings, uninitialized_warnings))
+        
+        dependencies = self.global_dependencies
+        self.global_dependencies = None
+        
+        if cache_key is not None:
+            global_effects = {}
+            for name in dependencies:
+                symbol = self.symbol_table.symbols.get(name)
+                if symbol is not None:
+                    global_effects[name] = (symbol.used, symbol.initialized)
+            self.cache.put(cache_key, FunctionAnalysis(
+                table=self.clone_table(function_table, None, -base_address),
+                errors=self.errors[errors_start:],
+                warnings=self.warnings[warnings_start:],
+                unused_warnings=unused_warnings,
+                uninitialized_warnings=uninitialized_warnings,
+                dependencies=dependencies,
+                global_effects=global_effects,
+                memory_size=self.memory_counter - base_address
+            ))
+    
+    def dependencies_match(self, entry: FunctionAnalysis) -> bool:
+        """Verifica que los símbolos globales usados por la función no hayan cambiado"""
+        for name, signature in entry.dependencies.items():
+            if self.global_signature(name) != signature:
+                return False
+        return True
+    
+    def global_signature(self, name: str) -> Optional[Tuple]:
+        """Firma de un símbolo global relevante para el análisis de otras funciones"""
+        symbol = self.symbol_table.symbols.get(name)
+        if symbol is None:
+            return None
+        return (symbol.symbol_type, symbol.data_type, tuple(symbol.parameters), symbol.initialized)
+    
+    def reuse_function_analysis(self, entry: FunctionAnalysis):
+        """Integra el resultado en caché de una función sin volver a visitarla"""
+        function_table = self.clone_table(entry.table, self.symbol_table, self.memory_counter)
+        self.symbol_table.children.append(function_table)
+        self.memory_counter += entry.memory_size
+        
+        for name, (used, initialized) in entry.global_effects.items():
+            self.mark_symbol(self.symbol_table.symbols[name], self.tracker_stack[0], used, initialized)
+        
+        self.errors.extend(entry.errors)
+        self.warnings.extend(entry.warnings)
+        self.function_diagnostics.append((entry.unused_warnings, entry.uninitialized_warnings))
+        self.reused_functions.append(function_table.scope_name)
+    
+    def clone_table(self, table: SymbolTable, parent: Optional[SymbolTable], address_offset: int) -> SymbolTable:
+        """Copia un subárbol de tablas desplazando las direcciones de memoria"""
+        clone = SymbolTable(
+            scope_name=table.scope_name,
+            level=table.level,
+            parent=parent,
+            symbols={
+                name: symbol.model_copy(update={
+                    "memory_address": None if symbol.memory_address is None
+                    else symbol.memory_address + address_offset
+                })
+                for name, symbol in table.symbols.items()
+            }
+        )
+        clone.children = [self.clone_table(child, clone, address_offset) for child in table.children]
+        return clone
     
     def visit_block(self, node: ASTNode):
         """Visita un bloque de código"""
@@ -115,6 +357,24 @@ class SemanticAnalyzer:
             for child in node.children:
                 self.visit_node(child)
     
+    def declare_parameter(self, node: ASTNode):
+        """Declara un parámetro formal en el scope de la función"""
+        current_table = self.get_current_table()
+        if node.value in current_table.symbols:
+            self.errors.append(f"Parámetro '{node.value}' repetido en la función '{self.current_scope}' (línea {node.line})")
+            return
+        current_table.symbols[node.value] = symbol = Symbol(
+            name=node.value,
+            symbol_type=SymbolType.PARAMETER,
+            data_type=node.data_type,
+            scope=self.current_scope,
+            line=node.line or 0,
+            initialized=True,
+            memory_address=self.allocate_memory()
+        )
+        self.tracker_stack[-1].declare(symbol)
+        print(f"📥 Parámetro declarado: {node.value} ({node.data_type}) en scope {self.current_scope}")
+    
     def visit_variabledeclaration(self, node: ASTNode):
         """Visita una declaración de variable"""
         if not node.children:
@@ -134,7 +394,7 @@ class SemanticAnalyzer:
         is_initialized = len(node.children) > 1 and node.children[1].type != "Empty"
         
         # Agregar variable a la tabla de símbolos actual
-        current_table.symbols[variable_name] = Symbol(
+        current_table.symbols[variable_name] = symbol = Symbol(
             name=variable_name,
             symbol_type=SymbolType.VARIABLE,
             data_type=variable_type,
@@ -143,6 +403,7 @@ class SemanticAnalyzer:
             initialized=is_initialized,
             memory_address=self.allocate_memory()
         )
+        self.tracker_stack[-1].declare(symbol)
         
         print(f"📝 Variable declarada: {variable_name} ({variable_type}) en scope {self.current_scope}")
         
@@ -158,13 +419,12 @@ class SemanticAnalyzer:
         variable_name = node.children[0].value
         
         # Verificar si la variable existe
-        symbol = self.lookup_symbol(variable_name)
+        symbol, tracker = self.resolve_symbol(variable_name)
         if not symbol:
             self.errors.append(f"Variable '{variable_name}' no declarada (línea {node.line})")
         else:
             # Marcar variable como inicializada y usada
-            symbol.initialized = True
-            symbol.used = True
+            self.mark_symbol(symbol, tracker, used=True, initialized=True)
             print(f"🔄 Variable asignada: {variable_name}")
         
         # Visitar la expresión del lado derecho
@@ -176,12 +436,12 @@ class SemanticAnalyzer:
         variable_name = node.value
         
         # Verificar si la variable existe
-        symbol = self.lookup_symbol(variable_name)
+        symbol, tracker = self.resolve_symbol(variable_name)
         if not symbol:
             self.errors.append(f"Variable '{variable_name}' no declarada (línea {node.line})")
         else:
             # Marcar variable como usada
-            symbol.used = True
+            self.mark_symbol(symbol, tracker, used=True)
             
             # Verificar si está inicializada
             if not symbol.initialized:
@@ -239,6 +499,27 @@ class SemanticAnalyzer:
             for child in node.children:
                 self.visit_node(child)
     
+    def visit_callexpression(self, node: ASTNode):
+        """Visita una llamada: la función debe existir y recibir tantos argumentos como parámetros"""
+        function_name = node.value
+        arguments = node.children or []
+        
+        symbol, tracker = self.resolve_symbol(function_name)
+        if not symbol:
+            self.errors.append(f"Función '{function_name}' no declarada (línea {node.line})")
+        elif symbol.symbol_type != SymbolType.FUNCTION:
+            self.errors.append(f"'{function_name}' no es una función (línea {node.line})")
+        else:
+            self.mark_symbol(symbol, tracker, used=True)
+            if len(arguments) != len(symbol.parameters):
+                self.errors.append(
+                    f"La función '{function_name}' espera {len(symbol.parameters)} argumentos "
+                    f"pero recibe {len(arguments)} (línea {node.line})")
+            print(f"📞 Llamada: {function_name}({len(arguments)} argumentos)")
+        
+        for argument in arguments:
+            self.visit_node(argument)
+    
     def visit_literal(self, node: ASTNode):
         """Visita un literal"""
         pass  # Los literales no requieren análisis semántico
@@ -249,38 +530,34 @@ class SemanticAnalyzer:
     
     def lookup_symbol(self, name: str) -> Optional[Symbol]:
         """Busca un símbolo en la tabla actual y padres"""
-        for table in reversed(self.scope_stack):
+        return self.resolve_symbol(name)[0]
+    
+    def resolve_symbol(self, name: str) -> Tuple[Optional[Symbol], Optional[ScopeTracker]]:
+        """Busca un símbolo y devuelve también el tracker del scope que lo declara"""
+        for depth in range(len(self.scope_stack) - 1, -1, -1):
+            table = self.scope_stack[depth]
             if name in table.symbols:
-                return table.symbols[name]
-        return None
+                if depth == 0:
+                    self.record_global_dependency(name)
+                return table.symbols[name], self.tracker_stack[depth]
+        self.record_global_dependency(name)
+        return None, None
+    
+    def mark_symbol(self, symbol: Symbol, tracker: ScopeTracker, used: bool = False, initialized: bool = False):
+        """Marca un símbolo como usado y/o inicializado, en la tabla y en los bitsets"""
+        if used:
+            symbol.used = True
+        if initialized:
+            symbol.initialized = True
+        tracker.mark(symbol.name, used, initialized)
+    
+    def record_global_dependency(self, name: str):
+        """Registra que la función actual depende de un símbolo global (o de su ausencia)"""
+        if self.global_dependencies is not None and name not in self.global_dependencies:
+            self.global_dependencies[name] = self.global_signature(name)
     
     def allocate_memory(self) -> int:
         """Asigna una dirección de memoria única"""
         address = self.memory_counter
         self.memory_counter += 1
         return address
-    
-    def check_unused_variables(self):
-        """Verifica variables declaradas pero no usadas"""
-        def check_table(table: SymbolTable):
-            for symbol_name, symbol in table.symbols.items():
-                if symbol.symbol_type == SymbolType.VARIABLE and not symbol.used:
-                    self.warnings.append(f"Variable '{symbol_name}' declarada pero no usada en scope '{symbol.scope}'")
-            
-            for child_table in table.children:
-                check_table(child_table)
-        
-        check_table(self.symbol_table)
-    
-    def check_initialized_variables(self):
-        """Verifica variables no inicializadas"""
-        def check_table(table: SymbolTable):
-            for symbol_name, symbol in table.symbols.items():
-                if (symbol.symbol_type == SymbolType.VARIABLE and 
-                    symbol.used and not symbol.initialized):
-                    self.warnings.append(f"Variable '{symbol_name}' usada pero no inicializada en scope '{symbol.scope}'")
-            
-            for child_table in table.children:
-                check_table(child_table)
-        
-        check_table(self.symbol_table)
\ No newline at end of file
@@ -0,0 +1,428 @@
+from app.compiler.ir import (QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON, JUMP, LABEL,
+                             RETURN)
+from app.compiler.cfg import ControlFlowGraph, build_cfgs
+from app.compiler.dataflow import Liveness, interference_graph, definition_sites
+from app.compiler.typeinfo import TypeOracle
+from typing import Dict, List, Optional, Set, Tuple
+
+# Definiciones sin efectos secundarios (se pueden borrar si nadie usa el resultado)
+SSA_PURE_DEFINITIONS = (ASSIGNMENT, ARITHMETIC, COMPARISON)
+
+class Phi:
+    """Función phi: target = phi(argumento por cada bloque predecesor)"""
+    def __init__(self, variable: int, block: int):
+        self.variable = variable  # Variable original
+        self.block = block
+        self.target = variable
+        self.arguments: Dict[int, int] = {}  # bloque predecesor -> operando
+
+    def __repr__(self) -> str:
+        return f"Phi({self.target} <- {self.arguments})"
+
+class SSAFunction:
+    """Una función del QuadrupleStore en forma SSA.
+
+    Los cuádruplos se renombran en sitio: cada definición recibe una versión
+    nueva ``nombre.N`` (el punto no es válido en identificadores, así que no
+    choca con nombres del usuario). Las funciones phi se guardan aparte, por
+    bloque, porque no forman parte del código intermedio. Los usos sin
+    definición previa conservan el nombre original (valor de entrada).
+    """
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg = cfg
+        self.store = cfg.store
+        self.phis: Dict[int, List[Phi]] = {}
+        self.original: Dict[int, int] = {}  # nombre SSA -> variable original
+        self.version_counter: Dict[int, int] = {}
+        self.fields = {"arg1": self.store.arg1, "arg2": self.store.arg2, "result": self.store.result}
+
+    # --- Construcción ---
+
+    def build(self) -> "SSAFunction":
+        if self.cfg.order:
+            self.place_phis()
+            self.rename()
+        return self
+
+    def place_phis(self):
+        """Phi con fronteras de dominancia iteradas, solo donde la variable está viva (SSA podada)"""
+        cfg = self.cfg
+        liveness = Liveness(cfg).solve()
+        frontiers = cfg.dominance_frontiers()
+        for variable, sites in definition_sites(cfg).items():
+            def_blocks = {block_id for block_id, _ in sites if cfg.is_reachable(block_id)}
+            mask = liveness.variables.mask(variable)
+            has_phi: Set[int] = set()
+            worklist = list(def_blocks)
+            while worklist:
+                block_id = worklist.pop()
+                for frontier in frontiers.get(block_id, ()):
+                    if frontier in has_phi or not liveness.block_in[frontier] & mask:
+                        continue
+                    has_phi.add(frontier)
+                    self.phis.setdefault(frontier, []).append(Phi(variable, frontier))
+                    if frontier not in def_blocks:
+                        worklist.append(frontier)
+
+    def new_version(self, variable: int) -> int:
+        version = self.version_counter.get(variable, 0) + 1
+        self.version_counter[variable] = version
+        oid = self.store.operand_id(f"{self.store.operand_text(variable)}.{version}")
+        self.original[oid] = variable
+        return oid
+
+    def rename(self):
+        """Renombrado recorriendo el árbol de dominadores con una pila por variable"""
+        cfg, store = self.cfg, self.store
+        variables = set(definition_sites(cfg))
+        tree = cfg.dominator_tree()
+        stacks: Dict[int, List[int]] = {}
+
+        def current(variable: int) -> int:
+            stack = stacks.get(variable)
+            return stack[-1] if stack else variable
+
+        work: List[Tuple[int, Optional[List[int]]]] = [(cfg.entry, None)]
+        while work:
+            block_id, pushed = work.pop()
+            if pushed is not None:
+                for variable in pushed:
+                    stacks[variable].pop()
+                continue
+
+            pushed = []
+            for phi in self.phis.get(block_id, ()):
+                phi.target = self.new_version(phi.variable)
+                stacks.setdefault(phi.variable, []).append(phi.target)
+                pushed.append(phi.variable)
+
+            for i in cfg.blocks[block_id].indices(store):
+                for field in store.use_fields(i):
+                    array = self.fields[field]
+                    if array[i] in variables:
+                        array[i] = current(array[i])
+                defined = store.defined(i)
+                if defined in variables:
+                    store.result[i] = self.new_version(defined)
+                    stacks.setdefault(defined, []).append(store.result[i])
+                    pushed.append(defined)
+
+            for successor in cfg.blocks[block_id].successors:
+                for phi in self.phis.get(successor, ()):
+                    phi.arguments[block_id] = current(phi.variable)
+
+            work.append((block_id, pushed))
+            for child in reversed(tree[block_id]):
+                work.append((child, None))
+
+    # --- Validación ---
+
+    def definitions(self) -> Tuple[Dict[int, Tuple[int, int]], List[str]]:
+        """Nombre SSA -> (bloque, índice; -1 para phi) y errores por definiciones repetidas"""
+        cfg, store = self.cfg, self.store
+        definitions: Dict[int, Tuple[int, int]] = {}
+        errors: List[str] = []
+        for block_id in cfg.order:
+            places = [(phi.target, -1) for phi in self.phis.get(block_id, ())]
+            places += [(store.defined(i), i) for i in cfg.blocks[block_id].indices(store)]
+            for oid, index in places:
+                if oid not in self.original:
+                    continue
+                if oid in definitions:
+                    errors.append(f"{store.operand_text(oid)} se define más de una vez")
+                definitions[oid] = (block_id, index)
+        return definitions, errors
+
+    def validate(self) -> List[str]:
+        """Comprueba las propiedades de la forma SSA; devuelve los errores encontrados"""
+        cfg, store = self.cfg, self.store
+        definitions, errors = self.definitions()
+
+        def check_use(oid: int, block_id: int, index: int, where: str):
+            if oid not in self.original:
+                return
+            if oid not in definitions:
+                errors.append(f"{store.operand_text(oid)} se usa en {where} sin definición")
+                return
+            def_block, def_index = definitions[oid]
+            if def_block == block_id:
+                if def_index >= index:
+                    errors.append(f"{store.operand_text(oid)} se usa en {where} antes de definirse")
+            elif not cfg.dominates(def_block, block_id):
+                errors.append(f"la definición de {store.operand_text(oid)} no domina su uso en {where}")
+
+        for block_id in cfg.order:
+            block = cfg.blocks[block_id]
+            reachable_preds = {pred for pred in block.predecessors if cfg.is_reachable(pred)}
+            for phi in self.phis.get(block_id, ()):
+                if set(phi.arguments) != reachable_preds:
+                    errors.append(f"phi de {store.operand_text(phi.target)} no tiene un argumento por predecesor")
+                for pred, argument in phi.arguments.items():
+                    # El argumento debe estar disponible al final del predecesor
+                    check_use(argument, pred, cfg.blocks[pred].end, f"phi de {store.operand_text(phi.target)}")
+            for i in block.indices(store):
+                for field in store.use_fields(i):
+                    check_use(self.fields[field][i], block_id, i, f"el cuádruplo {i}")
+        return errors
+
+    # --- Optimizaciones sobre SSA ---
+
+    def propagate(self) -> List[str]:
+        """Propagación global de copias y constantes y eliminación de phis triviales.
+
+        En SSA cada nombre tiene una única definición que domina sus usos, así
+        que ``v = x`` permite reemplazar v por x en toda la función sin
+        análisis de flujo de datos. Devuelve la descripción de cada cambio.
+        """
+        cfg, store = self.cfg, self.store
+        values: Dict[int, int] = {}  # nombre SSA -> operando que lo reemplaza
+
+        def resolve(oid: int) -> int:
+            seen = set()
+            while oid in values and oid not in seen:
+                seen.add(oid)
+                oid = values[oid]
+            return oid
+
+        changed = True
+        while changed:
+            changed = False
+            for block_id in cfg.order:
+                for phi in self.phis.get(block_id, ()):
+                    if phi.target in values:
+                        continue
+                    sources = {resolve(argument) for argument in phi.arguments.values()}
+                    sources.discard(phi.target)
+                    if len(sources) == 1:
+                        values[phi.target] = sources.pop()
+                        changed = True
+                for i in cfg.blocks[block_id].indices(store):
+                    target = store.result[i]
+                    if (store.kinds[i] == ASSIGNMENT and target in self.original and
+                            target not in values and store.arg1[i] != 0):
+                        values[target] = resolve(store.arg1[i])
+                        changed = True
+
+        changes: List[str] = []
+        for block_id in cfg.order:
+            for phi in self.phis.get(block_id, ()):
+                for pred, argument in phi.arguments.items():
+                    phi.arguments[pred] = resolve(argument)
+            for i in cfg.blocks[block_id].indices(store):
+                for field in store.use_fields(i):
+                    array = self.fields[field]
+                    replacement = resolve(array[i])
+                    if replacement != array[i]:
+                        changes.append(f"SSA: {store.operand_text(array[i])} -> {store.operand_text(replacement)}")
+                        array[i] = replacement
+        for block_id in list(self.phis):
+            self.phis[block_id] = [phi for phi in self.phis[block_id] if phi.target not in values]
+        return changes
+
+    def eliminate_dead_code(self) -> List[str]:
+        """Borra definiciones puras y phis cuyo nombre SSA no tiene usos (salvo las que pueden fallar)"""
+        cfg, store = self.cfg, self.store
+        oracle = TypeOracle(store, [cfg])
+        uses: Dict[int, int] = {}
+        for block_id in cfg.order:
+            for phi in self.phis.get(block_id, ()):
+                for argument in phi.arguments.values():
+                    uses[argument] = uses.get(argument, 0) + 1
+            for i in cfg.blocks[block_id].indices(store):
+                for oid in store.uses(i):
+                    uses[oid] = uses.get(oid, 0) + 1
+
+        changes: List[str] = []
+        changed = True
+        while changed:
+            changed = False
+            for block_id in cfg.order:
+                for phi in list(self.phis.get(block_id, ())):
+                    if uses.get(phi.target, 0) == 0:
+                        self.phis[block_id].remove(phi)
+                        for argument in phi.arguments.values():
+                            uses[argument] -= 1
+                        changes.append(f"SSA: phi muerta eliminada: {store.operand_text(phi.target)}")
+                        changed = True
+                for i in cfg.blocks[block_id].indices(store):
+                    target = store.result[i]
+                    if (store.kinds[i] in SSA_PURE_DEFINITIONS and target in self.original and
+                            uses.get(target, 0) == 0 and not oracle.may_trap(i)):
+                        for oid in store.uses(i):
+                            uses[oid] -= 1
+                        store.delete(i)
+                        changes.append(f"SSA: definición muerta eliminada: {store.operand_text(target)}")
+                        changed = True
+        return changes
+
+    # --- Destrucción ---
+
+    def destruct(self) -> int:
+        """Sale de SSA: copias en los predecesores de cada phi y fusión de versiones.
+
+        Las aristas críticas (salto condicional hacia un bloque con varios
+        predecesores) se parten con un bloque nuevo. Las copias de una arista
+        son paralelas y se secuencializan con un temporal cuando forman un
+        ciclo. Devuelve el número de copias insertadas. El CFG deja de ser
+        válido: el almacén se reubica.
+        """
+        cfg, store = self.cfg, self.store
+        moves: Dict[int, List[int]] = {}
+        copies_inserted = 0
+
+        for block_id, phis in self.phis.items():
+            if not phis:
+                continue
+            block = cfg.blocks[block_id]
+            fallthrough_copies: List[int] = []
+            split_blocks: List[List[int]] = []
+            for pred in block.predecessors:
+                if pred not in phis[0].arguments:
+                    continue
+                pairs = [(phi.target, phi.arguments[pred]) for phi in phis if phi.arguments[pred] != phi.target]
+                if not pairs:
+                    continue
+                sequence = self.sequentialize(pairs)
+                copies_inserted += len(sequence)
+                copies = [store.append(ASSIGNMENT, "", store.operand_text(source), None, store.operand_text(target))
+                          for target, source in sequence]
+                pred_block = cfg.blocks[pred]
+                last = pred_block.last(store)
+                is_jump = last is not None and store.kinds[last] == JUMP
+
+                if is_jump and pred_block.successors == [block_id]:
+                    # Único sucesor, alcanzado por salto: copias antes del salto
+                    moves.setdefault(last, []).extend(copies)
+                elif not is_jump or (block_id == pred + 1 and store.result[last] != block.label):
+                    # Se llega cayendo desde el bloque anterior: copias justo antes del bloque
+                    fallthrough_copies.extend(copies)
+                else:
+                    # Arista crítica hacia el destino de un salto condicional: bloque nuevo
+                    label = self.fresh_label(f"ssa_split_{store.operand_text(block.label)}")
+                    store.rewrite(last, result=label)
+                    split_blocks.append([store.append(LABEL, "", None, None, label)] + copies)
+
+            # [copias de la caída] [goto destino] [split_1: copias goto destino] ... [split_n: copias] destino:
+            sequence = list(fallthrough_copies)
+            previous = cfg.blocks[block_id - 1].last(store) if block_id > 0 else None
+            falls_through = previous is not None and (
+                store.kinds[previous] not in (JUMP, RETURN) or store.operator(previous) != "")
+            target = store.operand_text(block.label) if block.label is not None else None
+            for split in split_blocks:
+                if falls_through or sequence:
+                    sequence.append(store.append(JUMP, "", None, None, target))
+                sequence.extend(split)
+            if sequence:
+                moves.setdefault(block.start, []).extend(sequence)
+
+        self.phis = {}
+        if moves:
+            store.relocate(moves)
+        return copies_inserted
+
+    def sequentialize(self, pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Ordena copias paralelas (destino, origen); rompe ciclos con un nombre nuevo"""
+        pending = list(pairs)
+        sequence: List[Tuple[int, int]] = []
+        while pending:
+            sources = {source for _, source in pending}
+            ready = next((pair for pair in pending if pair[0] not in sources), None)
+            if ready is not None:
+                pending.remove(ready)
+                sequence.append(ready)
+                continue
+            # Ciclo: guardar un origen en un nombre nuevo y redirigir sus lecturas
+            target, source = pending[0]
+            saved = self.new_version(self.original.get(source, source))
+            sequence.append((saved, source))
+            pending = [(t, saved if s == source else s) for t, s in pending]
+        return sequence
+
+    def fresh_label(self, base: str) -> str:
+        name, counter = base, 0
+        while name in self.store.name_ids:
+            counter += 1
+            name = f"{base}_{counter}"
+        return name
+
+def coalesce_versions(store: QuadrupleStore, cfg: ControlFlowGraph, original: Dict[int, int]) -> int:
+    """Devuelve las versiones SSA a su nombre original cuando no interfieren.
+
+    Las versiones que sí interfieren reciben un identificador válido nuevo
+    (``x_N``). Las copias que quedan como ``x = x`` se eliminan. Devuelve el
+    número de versiones que conservaron un nombre propio.
+    """
+    liveness = Liveness(cfg).solve()
+    variables = liveness.variables
+    mask = 0
+    for oid in variables.variables:
+        mask |= variables.mask(oid)
+    graph = interference_graph(liveness, mask)
+
+    members: Dict[int, Set[int]] = {}  # variable original -> nombres ya fusionados con ella
+    renamed: Dict[int, int] = {}
+    kept = 0
+    for oid in variables.variables:
+        if oid not in original:
+            continue
+        variable = original[oid]
+        group = members.setdefault(variable, {variable})
+        if not graph.get(oid, set()) & group:
+            group.add(oid)
+            renamed[oid] = variable
+        else:
+            base = store.operand_text(variable)
+            name, counter = f"{base}_{oid}", 0
+            while name in store.name_ids:
+                counter += 1
+                name = f"{base}_{oid}_{counter}"
+            renamed[oid] = store.operand_id(name)
+            kept += 1
+
+    kinds = store.kinds
+    for i in range(cfg.start, cfg.end):
+        kind = kinds[i]
+        if kind == LABEL:
+            continue
+        fields = (store.arg1, store.arg2) if kind == JUMP else (store.arg1, store.arg2, store.result)
+        for field in fields:
+            new = renamed.get(field[i])
+            if new is not None:
+                field[i] = new
+        if kind == ASSIGNMENT and store.arg1[i] == store.result[i]:
+            store.delete(i)
+    return kept
+
+def ssa_round_trip(store: QuadrupleStore, optimize: bool = True) -> Dict[str, object]:
+    """Convierte cada función a SSA, la valida, la optimiza y la devuelve a cuádruplos.
+
+    Si la validación encuentra errores la función no se optimiza (solo se
+    destruye la forma SSA). Devuelve un resumen con cambios y errores.
+    """
+    summary: Dict[str, object] = {"functions": 0, "phis": 0, "changes": [], "errors": [], "split_copies": 0}
+    position = 0
+    while True:
+        cfgs = build_cfgs(store)
+        if position >= len(cfgs):
+            break
+        cfg = cfgs[position]
+        position += 1
+        ssa = SSAFunction(cfg).build()
+        summary["functions"] += 1
+        summary["phis"] += sum(len(phis) for phis in ssa.phis.values())
+
+        errors = ssa.validate()
+        if errors:
+            summary["errors"].extend(f"{cfg.name}: {error}" for error in errors)
+        elif optimize:
+            summary["changes"].extend(ssa.propagate())
+            summary["changes"].extend(ssa.eliminate_dead_code())
+            after = ssa.validate()
+            summary["errors"].extend(f"{cfg.name} (tras optimizar): {error}" for error in after)
+
+        original = ssa.original
+        summary["split_copies"] += ssa.destruct()
+        cfg = build_cfgs(store)[position - 1]
+        coalesce_versions(store, cfg, original)
+    store.compact()
+    return summary
@@ -0,0 +1,433 @@
+from app.compiler.ir import QuadrupleStore, JUMP, LABEL, RETURN
+from app.compiler.cfg import ControlFlowGraph, build_cfgs
+from typing import Dict, List, Optional, Set, FrozenSet
+
+# --- Árbol estructurado de una función ---
+# Lo recorren tanto el generador de texto Python como cualquier otro backend
+# que necesite if/else/while en lugar de saltos.
+
+class Condition:
+    """Condición de un if: un operando del código intermedio o variable de control == valor"""
+    __slots__ = ("operand", "variable", "value", "negate")
+
+    def __init__(self, operand: int = 0, variable: Optional[str] = None, value: int = 0, negate: bool = False):
+        self.operand = operand  # Id del operando (0 si se compara la variable de control)
+        self.variable = variable
+        self.value = value
+        self.negate = negate
+
+    def negated(self) -> "Condition":
+        return Condition(self.operand, self.variable, self.value, not self.negate)
+
+class Quad:
+    """Cuádruplo que se emite como sentencia (asignación, operación, PARAM, CALL, WRITE, RETURN...)"""
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+class If:
+    __slots__ = ("condition", "body", "orelse")
+
+    def __init__(self, condition: Condition, body: list, orelse: list):
+        self.condition = condition
+        self.body = body
+        self.orelse = orelse
+
+class Loop:
+    """Bucle ``while True``: se sale con Break o con un return"""
+    __slots__ = ("body",)
+
+    def __init__(self, body: list):
+        self.body = body
+
+class Break:
+    __slots__ = ()
+
+class Continue:
+    __slots__ = ()
+
+class SetVariable:
+    """Asignación de un entero a una variable de control (salida de varios bucles o estado del despacho)"""
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str, value: int):
+        self.name = name
+        self.value = value
+
+class ReturnNone:
+    """Fin de la función sin RETURN explícito"""
+    __slots__ = ()
+
+class StructuredFunction:
+    """Función del código intermedio reconstruida como árbol de sentencias"""
+    def __init__(self, name: str, parameters: List[int], body: list, strategy: str):
+        self.name = name
+        self.parameters = parameters  # Ids de los parámetros formales, en orden
+        self.body = body
+        self.strategy = strategy  # "estructurado" o "despacho"
+
+STRUCTURED = "estructurado"
+DISPATCH = "despacho"
+
+# --- Regiones intermedias (árbol de Ramsey antes de bajar a sentencias Python) ---
+
+class ExitRegion:
+    """Bloque con etiqueta al final: saltar a ``target`` es salir de la región"""
+    __slots__ = ("target", "body")
+
+    def __init__(self, target: int):
+        self.target = target
+        self.body: list = []
+
+class LoopRegion:
+    """Bucle cuya cabecera es el bloque ``header``: saltar a él es volver a empezar"""
+    __slots__ = ("header", "body")
+
+    def __init__(self, header: int):
+        self.header = header
+        self.body: list = []
+
+class IfRegion:
+    __slots__ = ("operand", "then", "orelse")
+
+    def __init__(self, operand: int, then: list, orelse: list):
+        self.operand = operand
+        self.then = then
+        self.orelse = orelse
+
+class BranchRegion:
+    """Salto a la salida de una ExitRegion o a la cabecera de una LoopRegion"""
+    __slots__ = ("target",)
+
+    def __init__(self, target):
+        self.target = target
+
+class EndRegion:
+    """El control cae al final de la función"""
+    __slots__ = ()
+
+FUNCTION_END = "fin de la función"
+
+class StructureError(Exception):
+    """El CFG no encaja en la estructuración (se recurre al bucle de despacho)"""
+
+class NeedsLoop(Exception):
+    """Una ExitRegion necesita emitirse como bucle de una vuelta para poder salir con break"""
+    def __init__(self, region: ExitRegion):
+        super().__init__()
+        self.region = region
+
+class ControlFlowStructurer:
+    """Reconstruye if/else y while a partir del CFG de una función.
+
+    Sigue el algoritmo de Ramsey ("Beyond Relooper"): se recorre el árbol de
+    dominadores; cada bloque con varias aristas de avance entrantes (unión) se
+    coloca tras una región de salida que lo envuelve, cada cabecera de bucle
+    abre un bucle y los demás sucesores se anidan dentro del salto que los
+    alcanza. Las salidas de un bucle se colocan detrás de él.
+
+    Al bajar a Python, un salto al final de la secuencia en curso desaparece,
+    la salida del bucle más interno es ``break`` y la vuelta a su cabecera es
+    ``continue``. Los saltos que cruzan varios bucles usan una variable de
+    salida que se comprueba tras cada bucle. Si el CFG es irreducible la
+    función se emite como un bucle de despacho sobre una variable de estado.
+    """
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg = cfg
+        self.store = cfg.store
+        self.position = {block_id: i for i, block_id in enumerate(cfg.order)}
+        self.children = cfg.dominator_tree()
+        self.loop_bodies: Dict[int, Set[int]] = {}
+        for loop in cfg.loops:
+            self.loop_bodies.setdefault(loop.header, set()).update(loop.body)
+
+        self.exit_variable = self.fresh_name("_salida")
+        self.state_variable = self.fresh_name("_estado")
+        self.exit_ids: Dict[int, int] = {}  # id(región destino) -> valor de la variable de salida
+        self.pending: Dict[int, list] = {}  # id(bucle) -> destinos que se comprueban tras él
+        self.after: Dict[int, FrozenSet] = {}  # id(bucle) -> destinos equivalentes a salir de él
+        self.one_shot: Set[int] = set()  # ExitRegion que se emiten como bucle de una vuelta
+
+    def fresh_name(self, base: str) -> str:
+        name = base
+        suffix = 0
+        while name in self.store.name_ids:
+            suffix += 1
+            name = f"{base}{suffix}"
+        return name
+
+    def structure(self) -> StructuredFunction:
+        parameters = [self.store.result[i] for i in range(self.cfg.start, self.cfg.end)
+                      if not self.store.is_deleted(i) and self.store.is_formal_parameter(i)]
+        if not self.cfg.order:
+            return StructuredFunction(self.cfg.name, parameters, [], STRUCTURED)
+        if self.is_reducible():
+            try:
+                return StructuredFunction(self.cfg.name, parameters, self.structured_body(), STRUCTURED)
+            except (StructureError, RecursionError):
+                pass
+        return StructuredFunction(self.cfg.name, parameters, self.dispatch_body(), DISPATCH)
+
+    def is_reducible(self) -> bool:
+        """Toda arista de retroceso (en RPO) debe llegar a un bloque que domina a su origen"""
+        cfg = self.cfg
+        for block_id in cfg.order:
+            for succ in cfg.blocks[block_id].successors:
+                if self.position[succ] <= self.position[block_id] and not cfg.dominates(succ, block_id):
+                    return False
+        return True
+
+    def is_merge(self, block_id: int) -> bool:
+        """Bloque con dos o más aristas de avance entrantes"""
+        position = self.position[block_id]
+        forward = 0
+        for pred in self.cfg.blocks[block_id].predecessors:
+            if pred in self.position and self.position[pred] < position:
+                forward += 1
+        return forward >= 2
+
+    # --- Construcción de regiones ---
+
+    def do_tree(self, block_id: int, context: list) -> list:
+        """Regiones del subárbol de dominadores de block_id"""
+        sequence = []
+        while block_id is not None:
+            regions, block_id = self.dominated(block_id, context)
+            sequence.extend(regions)
+        return sequence
+
+    def dominated(self, block_id: int, context: list):
+        """Regiones de block_id y sus hijos; devuelve aparte el último hijo, que va detrás"""
+        children = sorted(self.children[block_id], key=self.position.__getitem__)
+        body = self.loop_bodies.get(block_id)
+        if body is None:
+            merges = [child for child in children if self.is_merge(child)]
+            return self.nest(merges, lambda inner: self.block_code(block_id, inner), context)
+
+        inside = [child for child in children if child in body and self.is_merge(child)]
+        followers = [child for child in children if child not in body]
+
+        def loop_core(inner: list) -> list:
+            loop = LoopRegion(block_id)
+            loop.body = self.sequence(inside, lambda nested: self.block_code(block_id, nested), inner + [loop])
+            return [loop]
+
+        return self.nest(followers, loop_core, context)
+
+    def nest(self, targets: List[int], core, context: list):
+        """Envuelve core en una ExitRegion por destino (el de mayor RPO por fuera)"""
+        if not targets:
+            return core(context), None
+        target = targets[-1]
+        region = ExitRegion(target)
+        region.body = self.sequence(targets[:-1], core, context + [region])
+        return [region], target
+
+    def sequence(self, targets: List[int], core, context: list) -> list:
+        regions, follow = self.nest(targets, core, context)
+        if follow is not None:
+            regions = regions + self.do_tree(follow, context)
+        return regions
+
+    def statements(self, block_id: int) -> List[int]:
+        """Índices del bloque que se emiten como sentencias (sin etiquetas, parámetros ni salto final)"""
+        store = self.store
+        indices = []
+        for i in self.cfg.blocks[block_id].indices(store):
+            kind = store.kinds[i]
+            if kind == LABEL or kind == JUMP or store.is_formal_parameter(i):
+                continue
+            indices.append(i)
+        return indices
+
+    def block_code(self, block_id: int, context: list) -> list:
+        return [Quad(i) for i in self.statements(block_id)] + self.terminator(block_id, context)
+
+    def terminator(self, block_id: int, context: list) -> list:
+        cfg, store = self.cfg, self.store
+        last = cfg.blocks[block_id].last(store)
+        fallthrough = block_id + 1 if block_id + 1 < len(cfg.blocks) else None
+        kind = store.kinds[last] if last is not None else None
+        if kind == RETURN:
+            return []
+        if kind != JUMP:
+            return self.branch(block_id, fallthrough, context)
+
+        target = cfg.label_blocks.get(store.result[last])
+        if target is None:
+            raise StructureError(f"Etiqueta {store.operand_text(store.result[last])} fuera de la función")
+        if store.operator(last) == "" or target == fallthrough:
+            return self.branch(block_id, target, context)
+        # if_false: se salta al destino cuando la condición es falsa
+        return [IfRegion(store.arg1[last],
+                         self.branch(block_id, fallthrough, context),
+                         self.branch(block_id, target, context))]
+
+    def branch(self, source: int, target: Optional[int], context: list) -> list:
+        if target is None:
+            return [EndRegion()]
+        if self.position[target] <= self.position[source]:
+            for region in reversed(context):
+                if isinstance(region, LoopRegion) and region.header == target:
+                    return [BranchRegion(region)]
+            raise StructureError(f"Retroceso a B{target} fuera de su bucle")
+        for region in reversed(context):
+            if isinstance(region, ExitRegion) and region.target == target:
+                return [BranchRegion(region)]
+        if self.cfg.idom[target] != source:
+            raise StructureError(f"B{target} no está colocado al saltar desde B{source}")
+        return self.do_tree(target, context)
+
+    # --- Bajada a sentencias Python ---
+
+    def structured_body(self) -> list:
+        regions = self.do_tree(self.cfg.entry, [])
+        while True:
+            self.exit_ids, self.pending, self.after = {}, {}, {}
+            try:
+                body = self.lower_sequence(regions, frozenset([FUNCTION_END]), [])
+            except NeedsLoop as error:
+                self.one_shot.add(id(error.region))
+                continue
+            if self.exit_ids:
+                body.insert(0, SetVariable(self.exit_variable, 0))
+            return body
+
+    def is_python_loop(self, region) -> bool:
+        return isinstance(region, LoopRegion) or id(region) in self.one_shot
+
+    def lower_sequence(self, regions: list, falls: FrozenSet, context: list) -> list:
+        """Baja una secuencia; falls son los destinos a los que equivale caer al final de ella"""
+        statements = []
+        last = len(regions) - 1
+        for k, region in enumerate(regions):
+            here = falls if k == last else frozenset()
+            if isinstance(region, Quad):
+                statements.append(region)
+            elif isinstance(region, IfRegion):
+                statements.extend(self.make_if(Condition(region.operand),
+                                               self.lower_sequence(region.then, here, context),
+                                               self.lower_sequence(region.orelse, here, context)))
+            elif isinstance(region, BranchRegion):
+                statements.extend(self.lower_branch(region.target, here, context))
+            elif isinstance(region, ExitRegion):
+                inner = here | {id(region)}
+                body = self.lower_sequence(region.body, inner, context + [region])
+                if id(region) not in self.one_shot:
+                    statements.extend(body)
+                    continue
+                self.after[id(region)] = inner
+                if not self.terminates(body):
+                    body.append(Break())
+                statements.append(Loop(body))
+                statements.extend(self.exit_checks(region, context))
+            elif isinstance(region, LoopRegion):
+                self.after[id(region)] = here
+                body = self.lower_sequence(region.body, frozenset([id(region)]), context + [region])
+                statements.append(Loop(body))
+                statements.extend(self.exit_checks(region, context))
+            elif isinstance(region, EndRegion):
+                if FUNCTION_END not in here:
+                    statements.append(ReturnNone())
+        return statements
+
+    def lower_branch(self, target, falls: FrozenSet, context: list, flagged: bool = False) -> list:
+        """Salto a la región target desde el final de una secuencia"""
+        reset = [SetVariable(self.exit_variable, 0)] if flagged else []
+        if id(target) in falls:
+            return reset
+
+        innermost = None
+        for region in reversed(context):
+            if region is target:
+                break
+            if self.is_python_loop(region):
+                innermost = region
+                break
+        else:
+            raise StructureError("Destino de salto fuera de contexto")
+
+        if innermost is None:
+            if isinstance(target, LoopRegion):
+                return reset + [Continue()]
+            if id(target) in self.one_shot:
+                return reset + [Break()]
+            raise NeedsLoop(target)
+        if id(target) in self.after[id(innermost)]:
+            return reset + [Break()]
+
+        # Salida de varios bucles: se marca el destino y se comprueba tras cada bucle
+        pending = self.pending.setdefault(id(innermost), [])
+        if target not in pending:
+            pending.append(target)
+        value = self.exit_ids.setdefault(id(target), len(self.exit_ids) + 1)
+        if flagged:
+            return [Break()]  # La variable ya contiene el destino
+        return [SetVariable(self.exit_variable, value), Break()]
+
+    def exit_checks(self, loop, context: list) -> list:
+        checks = []
+        for target in self.pending.get(id(loop), ()):
+            condition = Condition(variable=self.exit_variable, value=self.exit_ids[id(target)])
+            body = self.lower_branch(target, self.after[id(loop)], context, flagged=True)
+            checks.append(If(condition, body, []))
+        return checks
+
+    def make_if(self, condition: Condition, then: list, orelse: list) -> list:
+        """If simplificado: sin ramas vacías y con la rama que termina primero y sin else"""
+        if not then and not orelse:
+            return []
+        if not then or (orelse and self.terminates(orelse) and not self.terminates(then)):
+            condition, then, orelse = condition.negated(), orelse, then
+        if orelse and self.terminates(then):
+            return [If(condition, then, [])] + orelse
+        return [If(condition, then, orelse)]
+
+    def terminates(self, statements: list) -> bool:
+        """True si la secuencia nunca cae a la sentencia siguiente"""
+        if not statements:
+            return False
+        last = statements[-1]
+        if isinstance(last, (Break, Continue, ReturnNone)):
+            return True
+        if isinstance(last, Quad):
+            return self.store.kinds[last.index] == RETURN
+        if isinstance(last, If):
+            return bool(last.orelse) and self.terminates(last.body) and self.terminates(last.orelse)
+        return False
+
+    # --- Respaldo: bucle de despacho ---
+
+    def dispatch_body(self) -> list:
+        """while True con un caso por bloque alcanzable, elegido por la variable de estado"""
+        state = self.state_variable
+        chain: list = []
+        for block_id in reversed(self.cfg.order):
+            body = [Quad(i) for i in self.statements(block_id)] + self.dispatch_terminator(block_id)
+            chain = [If(Condition(variable=state, value=block_id), body, chain)]
+        return [SetVariable(state, self.cfg.entry), Loop(chain)]
+
+    def dispatch_terminator(self, block_id: int) -> list:
+        cfg, store = self.cfg, self.store
+        last = cfg.blocks[block_id].last(store)
+        fallthrough = block_id + 1 if block_id + 1 < len(cfg.blocks) else None
+        kind = store.kinds[last] if last is not None else None
+        if kind == RETURN:
+            return []
+
+        def go(target: Optional[int]) -> list:
+            if target is None:
+                return [ReturnNone()]
+            return [SetVariable(self.state_variable, target), Continue()]
+
+        if kind != JUMP:
+            return go(fallthrough)
+        target = cfg.label_blocks.get(store.result[last])
+        if store.operator(last) == "":
+            return go(target)
+        return self.make_if(Condition(store.arg1[last]), go(fallthrough), go(target))
+
+def structure_program(store: QuadrupleStore) -> List[StructuredFunction]:
+    """Estructura cada función del almacén (se omite el código previo a la primera etiqueta func_)"""
+    return [ControlFlowStructurer(cfg).structure() for cfg in build_cfgs(store) if cfg.name is not None]
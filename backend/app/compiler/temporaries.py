@@ -0,0 +1,143 @@
+from app.models.schemas import SymbolTable, SymbolType
+from app.compiler.ir import QuadrupleStore, LABEL, JUMP, CALL
+from app.compiler.cfg import ControlFlowGraph, build_cfgs
+from app.compiler.dataflow import Liveness, iter_bits, interference_graph
+from typing import Dict, List, Optional, Set, Any
+import re
+
+TEMPORAL_PATTERN = re.compile(r'^t\d+$')
+
+class TemporaryAllocator:
+    """Reutiliza temporales cuyos rangos de vida no se solapan (asignación estilo registros).
+
+    Por función se construye el grafo de interferencia a partir de la
+    vivacidad: un temporal definido interfiere con todos los temporales vivos
+    después de su definición (salvo el origen de una copia t_a = t_b). El
+    coloreo voraz, en orden de primera aparición, asigna a cada temporal el
+    menor tN libre. Los temporales vivos a la entrada de la función conservan
+    su nombre.
+    """
+    def __init__(self, symbol_table: Optional[SymbolTable] = None):
+        self.reserved: Set[str] = set()  # Nombres de usuario con forma de temporal
+        if symbol_table is not None:
+            self.collect_declared(symbol_table)
+        self.temporaries_before = 0
+        self.temporaries_after = 0
+        self.peak_live = 0
+        self.functions: List[Dict[str, Any]] = []
+
+    def collect_declared(self, symbol_table: SymbolTable):
+        stack = [symbol_table]
+        while stack:
+            table = stack.pop()
+            for symbol in table.symbols.values():
+                if symbol.symbol_type != SymbolType.FUNCTION and TEMPORAL_PATTERN.match(symbol.name):
+                    self.reserved.add(symbol.name)
+            stack.extend(table.children)
+
+    @property
+    def temporal_counter(self) -> int:
+        """Número de nombres tN necesarios tras la asignación (t0 .. tN-1)"""
+        counter = 0
+        for function in self.functions:
+            counter = max(counter, function["highest"] + 1)
+        return counter
+
+    def is_temporary(self, store: QuadrupleStore, oid: int) -> bool:
+        if oid <= 0:
+            return False
+        name = store.operand_text(oid)
+        return bool(TEMPORAL_PATTERN.match(name)) and name not in self.reserved
+
+    def allocate(self, store: QuadrupleStore, cfgs: Optional[List[ControlFlowGraph]] = None) -> "TemporaryAllocator":
+        """Renombra en sitio los temporales de cada función"""
+        for cfg in cfgs if cfgs is not None else build_cfgs(store):
+            self.allocate_function(store, cfg)
+        return self
+
+    def allocate_function(self, store: QuadrupleStore, cfg: ControlFlowGraph):
+        liveness = Liveness(cfg).solve()
+        variables = liveness.variables
+        temporaries = [oid for oid in variables.variables if self.is_temporary(store, oid)]
+        if not temporaries:
+            self.functions.append({"function": cfg.name, "before": 0, "after": 0, "peak_live": 0, "highest": -1})
+            return
+        temp_mask = 0
+        for oid in temporaries:
+            temp_mask |= variables.mask(oid)
+
+        interference = interference_graph(liveness, temp_mask)
+        peak = 0
+        for block_id in cfg.order:
+            for i, live in liveness.live_after(block_id):
+                peak = max(peak, bin(live & temp_mask).count("1"))
+            peak = max(peak, bin(liveness.block_in[block_id] & temp_mask).count("1"))
+
+        # Temporales leídos antes de definirse: conservan su nombre
+        pinned = {variables.variables[bit] for bit in iter_bits(liveness.block_in[cfg.entry] & temp_mask)}
+
+        colors: Dict[int, str] = {oid: store.operand_text(oid) for oid in pinned}
+        always_taken = set(colors.values()) | self.reserved
+        for oid in self.first_appearance(store, cfg, interference):
+            if oid in colors:
+                continue
+            forbidden = always_taken | {colors[other] for other in interference[oid] if other in colors}
+            number = 0
+            while f"t{number}" in forbidden:
+                number += 1
+            colors[oid] = f"t{number}"
+
+        self.rename(store, cfg, colors)
+        used = set(colors.values())
+        highest = max(int(name[1:]) for name in used)
+        self.functions.append({
+            "function": cfg.name,
+            "before": len(temporaries),
+            "after": len(used),
+            "peak_live": peak,
+            "highest": highest
+        })
+        self.temporaries_before += len(temporaries)
+        self.temporaries_after += len(used)
+        self.peak_live = max(self.peak_live, peak)
+
+    def first_appearance(self, store: QuadrupleStore, cfg: ControlFlowGraph, interference: Dict[int, Set[int]]) -> List[int]:
+        """Temporales en el orden en que aparecen por primera vez en la función"""
+        order: List[int] = []
+        seen: Set[int] = set()
+        for block in cfg.blocks:
+            for i in block.indices(store):
+                for oid in (store.result[i], store.arg1[i], store.arg2[i]):
+                    if oid in interference and oid not in seen:
+                        seen.add(oid)
+                        order.append(oid)
+        return order
+
+    def rename(self, store: QuadrupleStore, cfg: ControlFlowGraph, colors: Dict[int, str]):
+        ids = {oid: store.operand_id(name) for oid, name in colors.items()}
+        kinds = store.kinds
+        for i in range(cfg.start, cfg.end):
+            kind = kinds[i]
+            if kind == LABEL:
+                continue
+            # En los saltos, result es la etiqueta destino; en las llamadas, arg1 es la función
+            if kind == JUMP:
+                fields = (store.arg1, store.arg2)
+            elif kind == CALL:
+                fields = (store.arg2, store.result)
+            else:
+                fields = (store.arg1, store.arg2, store.result)
+            for field in fields:
+                new = ids.get(field[i])
+                if new is not None:
+                    field[i] = new
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "temporaries_before": self.temporaries_before,
+            "temporaries_after": self.temporaries_after,
+            "peak_live": self.peak_live,
+            "temporal_counter": self.temporal_counter,
+            "functions": [{key: value for key, value in function.items() if key != "highest"}
+                          for function in self.functions]
+        }
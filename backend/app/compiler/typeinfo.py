@@ -0,0 +1,188 @@
+from app.models.schemas import DataType
+from app.compiler.ir import QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON
+from app.compiler.cfg import ControlFlowGraph, build_cfgs, function_ranges
+from app.compiler.dataflow import Liveness
+from app.compiler.constants import NUMERIC_TYPES, MAX_SHIFT, parse_literal
+from typing import Dict, Optional, List, Set
+
+def literal_type(text: Optional[str]) -> Optional[DataType]:
+    """Tipo de un literal del código intermedio (None si no es literal)"""
+    constant = parse_literal(text)
+    return None if constant is None else constant.data_type
+
+def binary_result_type(operator: str, left: Optional[DataType], right: Optional[DataType]) -> Optional[DataType]:
+    """Tipo del resultado de una operación binaria (None si no se puede saber)"""
+    if operator in ('>', '<', '>=', '<=', '==', '!='):
+        return DataType.BOOL
+    if left is None or right is None:
+        return None
+    if operator in ('<<', '>>'):
+        return DataType.INT if left == right == DataType.INT else None
+    if left in NUMERIC_TYPES and right in NUMERIC_TYPES:
+        return DataType.INT if left == right == DataType.INT else DataType.FLOAT
+    if operator == '+' and left == right == DataType.STRING:
+        return DataType.STRING
+    return None
+
+# Marcas del retículo de inferencia: sin información todavía / tipos en conflicto
+UNKNOWN = "unknown"
+CONFLICT = "conflict"
+
+# Tipos que se operan como enteros de Python (bool es subclase de int) y tipos comparables con '<'
+INTEGRAL_TYPES = frozenset((DataType.INT, DataType.BOOL))
+ORDERED_NUMBERS = frozenset((DataType.INT, DataType.BOOL, DataType.FLOAT))
+
+class TypeOracle:
+    """Tipos de los operandos del código intermedio.
+
+    El lenguaje no impone en ejecución los tipos declarados (``int k = 5;
+    k = k / 2.0;`` deja un float en k), así que la tabla de símbolos no se
+    usa: cada variable o temporal toma el tipo que producen sus definiciones
+    dentro de la función, de forma optimista e iterando hasta un punto fijo
+    para que las definiciones cíclicas (t = 0; t = t + 4) también reciban
+    tipo. Un operando con definiciones de tipos distintos, o que depende de
+    algo sin tipo conocido (parámetros, resultados de llamadas), queda sin
+    tipo. Una variable que puede leerse antes de su primera asignación
+    (viva al entrar a la función) vale None en ese punto y también queda
+    sin tipo.
+    """
+    def __init__(self, store: QuadrupleStore, cfgs: Optional[List[ControlFlowGraph]] = None):
+        self.store = store
+        self.cfgs = None if cfgs is None else {cfg.name: cfg for cfg in cfgs}
+        self.function_of_index: List[Optional[str]] = [None] * len(store)
+        self.function_definitions: Dict[Optional[str], List[int]] = {}  # función -> cuádruplos que definen
+        for start, end, name in function_ranges(store):
+            definitions = self.function_definitions.setdefault(name, [])
+            for i in range(start, end):
+                self.function_of_index[i] = name
+                if not store.is_deleted(i) and store.defined(i) > 0:
+                    definitions.append(i)
+        self.defined_names = {name: {store.result[i] for i in definitions}
+                              for name, definitions in self.function_definitions.items()}
+        self.inferred: Dict[Optional[str], Dict[int, object]] = {}
+        self.unassigned: Dict[Optional[str], Set[int]] = {}
+
+    def maybe_unassigned(self, function: Optional[str]) -> Set[int]:
+        """Variables vivas al entrar a la función: algún camino las lee antes de asignarlas"""
+        if function not in self.unassigned:
+            if self.cfgs is None or function not in self.cfgs:
+                self.cfgs = {cfg.name: cfg for cfg in build_cfgs(self.store)}
+            cfg = self.cfgs.get(function)
+            names: Set[int] = set()
+            if cfg is not None and cfg.blocks:
+                liveness = Liveness(cfg).solve()
+                live = liveness.block_in[cfg.entry]
+                names = {oid for oid in liveness.variables.variables if live & liveness.variables.mask(oid)}
+            self.unassigned[function] = names
+        return self.unassigned[function]
+
+    def operand_type(self, oid: int, function: Optional[str] = None) -> Optional[DataType]:
+        """Tipo de un operando dentro de una función"""
+        data_type = self.lookup(oid, function, self.inferred_types(function))
+        return None if data_type in (UNKNOWN, CONFLICT) else data_type
+
+    def lookup(self, oid: int, function: Optional[str], inferred: Dict[int, object]):
+        if oid == 0:
+            return None
+        if oid < 0:
+            return literal_type(self.store.operand_text(oid))
+        if oid not in self.defined_names.get(function, ()) or oid in self.maybe_unassigned(function):
+            return CONFLICT  # Sin definiciones en la función o leída sin asignar: no se sabe qué valor trae
+        return inferred.get(oid, UNKNOWN)
+
+    def inferred_types(self, function: Optional[str]) -> Dict[int, object]:
+        """Tipos de los operandos definidos en la función (punto fijo optimista)"""
+        if function in self.inferred:
+            return self.inferred[function]
+        store = self.store
+        definitions = self.function_definitions.get(function, ())
+        types: Dict[int, object] = {}
+        while True:
+            changed = True
+            while changed:
+                changed = False
+                for i in definitions:
+                    data_type = self.definition_type(i, function, types)
+                    if data_type == UNKNOWN:
+                        continue
+                    if data_type is None:
+                        data_type = CONFLICT
+                    target = store.result[i]
+                    previous = types.get(target)
+                    new = data_type if previous is None or previous == data_type else CONFLICT
+                    if new != previous:
+                        types[target] = new
+                        changed = True
+            # Una definición que sigue sin tipo (ciclo sin caso base) deja su variable sin tipo
+            pending = [store.result[i] for i in definitions
+                       if self.definition_type(i, function, types) == UNKNOWN
+                       and types.get(store.result[i]) != CONFLICT]
+            if not pending:
+                break
+            for target in pending:
+                types[target] = CONFLICT
+        self.inferred[function] = types
+        return types
+
+    def definition_type(self, index: int, function: Optional[str], types: Dict[int, object]):
+        """Tipo que produce el cuádruplo (UNKNOWN si depende de algo aún sin inferir)"""
+        store = self.store
+        kind = store.kinds[index]
+        if kind == ASSIGNMENT:
+            data_type = self.lookup(store.arg1[index], function, types)
+            return None if data_type == CONFLICT else data_type
+        if kind in (ARITHMETIC, COMPARISON):
+            if kind == COMPARISON:
+                return DataType.BOOL
+            left = self.lookup(store.arg1[index], function, types)
+            right = self.lookup(store.arg2[index], function, types)
+            if CONFLICT in (left, right):
+                return None
+            if UNKNOWN in (left, right):
+                return UNKNOWN
+            return binary_result_type(store.operator(index), left, right)
+        return None
+
+    def is_integer(self, oid: int, function: Optional[str] = None) -> bool:
+        return self.operand_type(oid, function) == DataType.INT
+
+    def is_numeric(self, oid: int, function: Optional[str] = None) -> bool:
+        return self.operand_type(oid, function) in NUMERIC_TYPES
+
+    def may_trap(self, index: int) -> bool:
+        """True si el cuádruplo puede fallar en ejecución aunque su resultado no se use.
+
+        Solo se descarta el error cuando los tipos de los operandos lo
+        prueban: sumas, restas y productos entre enteros o entre floats
+        (un int enorme por un float lanza OverflowError), concatenación de
+        strings, comparaciones de orden entre números o entre strings y
+        divisiones o desplazamientos con un divisor o desplazamiento
+        constante válido. Una copia nunca falla.
+        """
+        store = self.store
+        kind = store.kinds[index]
+        if kind == ASSIGNMENT:
+            return False
+        if kind not in (ARITHMETIC, COMPARISON):
+            return True
+        operator = store.operator(index)
+        if operator in ('==', '!='):
+            return False
+        function = self.function_of_index[index]
+        left = self.operand_type(store.arg1[index], function)
+        right = self.operand_type(store.arg2[index], function)
+        if kind == COMPARISON:
+            return not ((left in ORDERED_NUMBERS and right in ORDERED_NUMBERS) or
+                        left == right == DataType.STRING)
+        if operator == '+' and left == right == DataType.STRING:
+            return False
+        integral = left in INTEGRAL_TYPES and right in INTEGRAL_TYPES
+        floating = DataType.FLOAT in (left, right) and {left, right} <= {DataType.FLOAT, DataType.BOOL}
+        if operator in ('+', '-', '*'):
+            return not (integral or floating)
+        divisor = parse_literal(store.operand_text(store.arg2[index])) if store.arg2[index] < 0 else None
+        if operator == '/':
+            return not ((integral or floating) and divisor is not None and divisor.value != 0)
+        if operator in ('<<', '>>'):
+            return not (integral and divisor is not None and 0 <= divisor.value <= MAX_SHIFT)
+        return True
@@ -0,0 +1,376 @@
+from app.models.schemas import Quadruple
+from app.compiler.vm import (VMProgram, VMFunction, VirtualMachine, ExecutionResult,
+                             OP_MOVE, OP_JUMP_IF_FALSE, OP_GOTO, OP_ARGUMENT, OP_CALL, OP_RETURN, OP_PRINT,
+                             OP_ADD, OP_SUB, OP_MUL, DEFAULT_MAX_STEPS, DEFAULT_TIME_LIMIT, CHECK_INTERVAL)
+from typing import Any, Dict, List, Optional, Sequence
+import operator
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy solo está disponible la ejecución escalar
+    np = None
+
+# Con más puntos de divergencia que esto, los que tienen menos carriles pasan a la VM
+DEFAULT_MAX_GROUPS = 16
+# Con menos carriles vivos que esto no compensa seguir con arrays: los que quedan pasan a la VM
+DEFAULT_MIN_LANES = 8
+# Márgenes para que la aritmética en int64 coincida con los enteros de Python
+ADD_BOUND = 2 ** 62
+MUL_BOUND = 2 ** 31
+INTEGER_BOUNDS = {operator.add: ADD_BOUND, operator.sub: ADD_BOUND, operator.mul: MUL_BOUND,
+                  operator.floordiv: ADD_BOUND, operator.lshift: MUL_BOUND}
+
+class Fallback(Exception):
+    """El grupo (o parte de él) no puede seguir vectorizado; sus carriles pasan a la VM"""
+    def __init__(self, lanes: Optional["np.ndarray"] = None):
+        super().__init__()
+        self.lanes = lanes  # Máscara de los carriles afectados (None: todo el grupo)
+
+class LimitReached(Exception):
+    """El grupo superó el límite de pasos o de tiempo: sus carriles terminan con ese estado"""
+    def __init__(self, status: str, error: str):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+def is_vector(value: Any) -> bool:
+    return isinstance(value, np.ndarray)
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) or (is_vector(value) and value.dtype != object)
+
+def is_integer(value: Any) -> bool:
+    return isinstance(value, int) or (is_vector(value) and value.dtype.kind in "iub")
+
+class LaneGroup:
+    """Carriles que están en la misma instrucción: comparten pc y marco.
+
+    Cada posición del marco es un escalar de Python (igual en todos los
+    carriles del grupo) o un array con un valor por carril.
+    """
+    def __init__(self, lanes: "np.ndarray", frame: List[Any], pc: int = 0):
+        self.lanes = lanes  # Índices de las entradas que representa el grupo
+        self.frame = frame
+        self.pc = pc
+        self.steps = 0
+
+    @property
+    def width(self) -> int:
+        return len(self.lanes)
+
+    def select(self, mask: "np.ndarray") -> "LaneGroup":
+        """Subgrupo con los carriles de la máscara (los escalares se comparten)"""
+        frame = [value[mask] if is_vector(value) else value for value in self.frame]
+        group = LaneGroup(self.lanes[mask], frame, self.pc)
+        group.steps = self.steps
+        return group
+
+    @staticmethod
+    def merge(groups: List["LaneGroup"]) -> "LaneGroup":
+        """Reúne grupos que llegaron a la misma instrucción (reconvergencia)"""
+        if len(groups) == 1:
+            return groups[0]
+        frame = []
+        for values in zip(*(group.frame for group in groups)):
+            first = values[0]
+            if not any(is_vector(value) for value in values) and all(
+                    type(value) is type(first) and value == first for value in values):
+                frame.append(first)
+                continue
+            parts = [value if is_vector(value) else broadcast(value, group.width)
+                     for value, group in zip(values, groups)]
+            if len({part.dtype.kind for part in parts}) > 1:
+                # Sin promociones: un carril entero no debe pasar a float (ni un bool a entero)
+                parts = [part.astype(object) for part in parts]
+            frame.append(np.concatenate(parts))
+        merged = LaneGroup(np.concatenate([group.lanes for group in groups]), frame, groups[0].pc)
+        merged.steps = max(group.steps for group in groups)
+        return merged
+
+def broadcast(value: Any, width: int) -> "np.ndarray":
+    if isinstance(value, (bool, int, float)):
+        try:
+            return np.full(width, value)
+        except OverflowError:  # Enteros que no caben en int64
+            pass
+    array = np.empty(width, dtype=object)
+    array[:] = [value] * width
+    return array
+
+def column_array(column: Sequence[Any]) -> "np.ndarray":
+    """Array con un argumento por carril.
+
+    Solo se usa un dtype numérico si todos los valores son del mismo tipo de
+    Python: NumPy promovería una columna mixta (int y float, bool e int) y un
+    carril entero pasaría a float. Las columnas mixtas quedan como objetos,
+    igual que en LaneGroup.merge.
+    """
+    first = type(column[0])
+    if first in (bool, int, float) and all(type(value) is first for value in column):
+        array = np.asarray(column)
+        if array.dtype.kind in "bif":
+            return array
+    array = np.empty(len(column), dtype=object)
+    array[:] = column
+    return array
+
+def out_of_range(value: Any, bound: int) -> Any:
+    """Máscara (o bool) de los valores con |valor| >= bound; None si todos están dentro"""
+    if is_vector(value):
+        if value.size == 0 or (value.max() < bound and value.min() > -bound):
+            return None
+    elif -bound < value < bound:
+        return None
+    return (value >= bound) | (value <= -bound)
+
+def lane_value(value: Any, position: int) -> Any:
+    """Valor de Python de un carril (los escalares de NumPy se convierten a int/float/bool)"""
+    if is_vector(value):
+        value = value[position]
+    return value.item() if isinstance(value, np.generic) else value
+
+class BatchResult:
+    """Resultados de una ejecución por lotes, uno por conjunto de entradas"""
+    def __init__(self, lanes: int):
+        self.results: List[Optional[ExecutionResult]] = [None] * lanes
+        self.vectorized = 0  # Carriles que terminaron por la vía vectorizada
+        self.fallback = 0  # Carriles ejecutados (o re-ejecutados) por la VM
+        self.peak_groups = 0
+        self.elapsed = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lanes": len(self.results),
+            "vectorized": self.vectorized,
+            "fallback": self.fallback,
+            "peak_groups": self.peak_groups,
+            "elapsed": self.elapsed,
+            "results": [result.to_dict() for result in self.results]
+        }
+
+class VectorizedMachine:
+    """Ejecuta una función de un VMProgram sobre muchos conjuntos de argumentos a la vez.
+
+    Las instrucciones se aplican a arrays de NumPy con un carril por conjunto
+    de entradas. Un salto condicional cuyo valor no es igual en todo el grupo
+    lo parte en dos (los carriles que saltan y los que no); en cada paso se
+    avanza el grupo con el pc más bajo y los que coinciden en pc se vuelven a
+    juntar, así que las ramas de un if reconvergen al final y los carriles que
+    salen antes de un bucle esperan a los demás. Es el equivalente a ejecutar
+    ambas ramas con máscaras.
+
+    Lo que no se puede vectorizar sin cambiar el resultado (llamadas, valores
+    que no son numéricos, divisiones entre cero, enteros que se saldrían de
+    int64, demasiados grupos a la vez) se resuelve re-ejecutando esos carriles
+    desde el principio con la VirtualMachine escalar, que además informa de
+    los errores y límites con los mismos mensajes de siempre.
+    """
+    def __init__(self, program: VMProgram, max_steps: int = DEFAULT_MAX_STEPS,
+                 time_limit: Optional[float] = DEFAULT_TIME_LIMIT, max_groups: int = DEFAULT_MAX_GROUPS,
+                 min_lanes: int = DEFAULT_MIN_LANES):
+        if np is None:
+            raise RuntimeError("La ejecución vectorizada requiere NumPy")
+        self.program = program
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+        self.max_groups = max_groups
+        self.min_lanes = min_lanes
+        self.started = 0.0
+
+    def run(self, inputs: Sequence[Sequence[Any]], entry: str = "main") -> BatchResult:
+        started = self.started = time.perf_counter()
+        batch = BatchResult(len(inputs))
+        if entry not in self.program.function_index or not inputs:
+            self.run_scalar(batch, range(len(inputs)), inputs, entry)
+            batch.elapsed = time.perf_counter() - started
+            return batch
+
+        function = self.program.functions[self.program.function_index[entry]]
+        lanes = len(inputs)
+        frame = function.template[:]
+        columns = list(zip(*inputs)) if function.parameter_count else []
+        if any(len(arguments) != function.parameter_count for arguments in inputs):
+            self.run_scalar(batch, range(lanes), inputs, entry)
+            batch.elapsed = time.perf_counter() - started
+            return batch
+        for position, column in enumerate(columns):
+            frame[function.parameter_start + position] = column_array(column)
+
+        outputs: List[List[str]] = [[] for _ in range(lanes)]
+        returns: List[Any] = [None] * lanes
+        steps = [0] * lanes
+        done = [False] * lanes
+        fallback: List[int] = []
+        # pc -> grupos detenidos en esa instrucción (se juntan al retomarlos)
+        waiting: Dict[int, List[LaneGroup]] = {0: [LaneGroup(np.arange(lanes), frame)]}
+
+        with np.errstate(all="ignore"):
+            while waiting:
+                group = LaneGroup.merge(waiting.pop(min(waiting)))
+                if group.width < self.min_lanes and lanes >= self.min_lanes and \
+                        group.width + sum(other.width for pending in waiting.values() for other in pending) < self.min_lanes:
+                    # Cola de la ejecución (p. ej. las entradas con más iteraciones): mejor carril a carril
+                    fallback.extend(group.lanes.tolist())
+                    for pending in waiting.values():
+                        for other in pending:
+                            fallback.extend(other.lanes.tolist())
+                    break
+                try:
+                    stop = min(waiting) if waiting else len(function.code)
+                    returned, branches = self.step_group(function, group, outputs, stop)
+                except Fallback as e:
+                    if e.lanes is None:
+                        fallback.extend(group.lanes.tolist())
+                        continue
+                    # El resto del grupo sigue desde la instrucción que falló (group.pc)
+                    fallback.extend(group.lanes[e.lanes].tolist())
+                    waiting.setdefault(group.pc, []).append(group.select(~e.lanes))
+                    continue
+                except LimitReached as e:
+                    for lane in group.lanes.tolist():
+                        result = ExecutionResult()
+                        result.status, result.error = e.status, e.error
+                        result.output = outputs[lane]
+                        result.instructions = group.steps
+                        batch.results[lane] = result
+                    continue
+                if returned is not None:
+                    value = group.frame[returned]
+                    for position, lane in enumerate(group.lanes.tolist()):
+                        returns[lane] = lane_value(value, position)
+                        steps[lane] = group.steps
+                        done[lane] = True
+                    continue
+                for branch in branches:
+                    waiting.setdefault(branch.pc, []).append(branch)
+                batch.peak_groups = max(batch.peak_groups, len(waiting))
+                if len(waiting) > self.max_groups:
+                    # Demasiada divergencia: los puntos con menos carriles se ejecutan carril a carril
+                    widths = sorted(waiting, key=lambda pc: sum(group.width for group in waiting[pc]))
+                    for pc in widths[:len(waiting) - self.max_groups]:
+                        for evicted in waiting.pop(pc):
+                            fallback.extend(evicted.lanes.tolist())
+
+        for lane in range(lanes):
+            if done[lane]:
+                result = ExecutionResult()
+                result.output = outputs[lane]
+                result.return_value = returns[lane]
+                result.instructions = steps[lane]
+                batch.results[lane] = result
+                batch.vectorized += 1
+        self.run_scalar(batch, sorted(fallback), inputs, entry)
+        batch.elapsed = time.perf_counter() - started
+        for result in batch.results:
+            if result is not None and not result.elapsed:
+                result.elapsed = batch.elapsed
+        return batch
+
+    def run_scalar(self, batch: BatchResult, lanes, inputs: Sequence[Sequence[Any]], entry: str):
+        for lane in lanes:
+            machine = VirtualMachine(self.program, max_steps=self.max_steps, time_limit=self.time_limit)
+            batch.results[lane] = machine.run(entry, list(inputs[lane]))
+            batch.fallback += 1
+
+    def step_group(self, function: VMFunction, group: LaneGroup, outputs: List[List[str]], stop: int):
+        """Avanza el grupo hasta un salto divergente, el retorno o la instrucción ``stop``.
+
+        ``stop`` es el pc más bajo en el que esperan otros grupos: al
+        alcanzarlo (o pasarlo) el grupo se detiene para reconverger con ellos.
+        Devuelve (posición del valor devuelto o None, grupos resultantes).
+        ``group.pc`` apunta siempre a la instrucción en curso, de modo que si
+        una instrucción lanza Fallback el grupo puede continuar desde ella.
+        """
+        code, f = function.code, group.frame
+        pc = group.pc
+        next_check = group.steps + CHECK_INTERVAL
+        while True:
+            group.pc = pc
+            if pc >= stop:
+                return None, [group]
+            opcode, a, b, c, fn = code[pc]
+            pc += 1
+            group.steps += 1
+            if group.steps >= next_check:
+                next_check = self.checkpoint(group.steps)
+            if opcode == OP_MOVE:
+                f[c] = f[a]
+            elif opcode == OP_JUMP_IF_FALSE:
+                condition = f[a]
+                if not is_vector(condition):
+                    if not condition:
+                        pc = c
+                    continue
+                taken = ~condition.astype(bool)
+                if taken.all():
+                    pc = c
+                elif taken.any():
+                    jumping, staying = group.select(taken), group.select(~taken)
+                    jumping.pc, staying.pc = c, pc
+                    return None, [jumping, staying]
+            elif opcode == OP_GOTO:
+                pc = c
+            elif opcode == OP_RETURN:
+                return a, []
+            elif opcode == OP_PRINT:
+                value = f[a]
+                for position, lane in enumerate(group.lanes.tolist()):
+                    outputs[lane].append(str(lane_value(value, position)))
+            elif opcode == OP_ARGUMENT or opcode == OP_CALL:
+                raise Fallback()  # Las llamadas se ejecutan en la VM
+            else:
+                f[c] = self.binary(opcode, fn, f[a], f[b])
+
+    def checkpoint(self, steps: int) -> int:
+        if steps > self.max_steps:
+            raise LimitReached("step_limit", f"Se superó el límite de {self.max_steps} instrucciones")
+        if self.time_limit is not None and time.perf_counter() - self.started > self.time_limit:
+            raise LimitReached("time_limit", f"Se superó el límite de tiempo ({self.time_limit} s)")
+        return min(steps + CHECK_INTERVAL, self.max_steps + 1)
+
+    def binary(self, opcode: int, fn, left: Any, right: Any) -> Any:
+        if not is_vector(left) and not is_vector(right):
+            try:
+                return fn(left, right)  # Mismo valor en todos los carriles: aritmética de Python
+            except Exception:
+                raise Fallback()
+        if not is_number(left) or not is_number(right):
+            raise Fallback()
+        # En NumPy True + True es True; en Python es 2
+        if is_vector(left) and left.dtype == bool:
+            left = left.astype(np.int64)
+        if is_vector(right) and right.dtype == bool:
+            right = right.astype(np.int64)
+        unsafe = self.unsafe_lanes(fn, left, right)
+        if unsafe is not None:
+            raise Fallback(unsafe)
+        try:
+            return fn(left, right)
+        except Exception:
+            raise Fallback()
+
+    def unsafe_lanes(self, fn, left: Any, right: Any) -> Optional["np.ndarray"]:
+        """Carriles en los que NumPy no daría lo mismo que Python: división entre cero y desbordes de int64"""
+        checks = []
+        if fn is operator.floordiv:
+            checks.append(right == 0)
+        if is_integer(left) and is_integer(right):
+            bound = INTEGER_BOUNDS.get(fn)
+            if bound is not None:
+                checks.extend(value for value in (out_of_range(left, bound), out_of_range(right, bound))
+                              if value is not None)
+            if fn is operator.lshift or fn is operator.rshift:
+                checks.append((right < 0) | (right >= (32 if fn is operator.lshift else 63)))
+        unsafe = None
+        for check in checks:
+            if np.any(check):
+                unsafe = check if unsafe is None else unsafe | check
+        if unsafe is None:
+            return None
+        return np.broadcast_to(unsafe, left.shape if is_vector(left) else right.shape).copy()
+
+def run_batch(quadruples: List[Quadruple], inputs: Sequence[Sequence[Any]], entry: str = "main",
+              **limits) -> BatchResult:
+    """Decodifica los cuádruplos y ejecuta ``entry`` con cada conjunto de argumentos"""
+    return VectorizedMachine(VMProgram.from_quadruples(quadruples), **limits).run(inputs, entry)
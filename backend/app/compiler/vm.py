@@ -0,0 +1,379 @@
+from app.models.schemas import Quadruple
+from app.compiler.ir import (QuadrupleStore, ARITHMETIC, ASSIGNMENT, COMPARISON, JUMP, LABEL, PARAM,
+                             CALL, RETURN, WRITE, NO_OPERAND, NO_LINE)
+from app.compiler.cfg import function_ranges
+from app.compiler.constants import parse_literal
+from typing import Callable, Dict, List, Optional, Any, Sequence
+import ast
+import operator
+import time
+
+# Códigos de operación de la máquina virtual. Cada instrucción es una tupla
+# (código, a, b, c, función) con los operandos ya resueltos a posiciones del
+# marco y los destinos de salto a desplazamientos dentro de la función.
+OP_BINARY = 0  # f[c] = función(f[a], f[b]) (operadores sin código propio)
+OP_MOVE = 1  # f[c] = f[a]
+OP_JUMP_IF_FALSE = 2  # si not f[a]: pc = c
+OP_GOTO = 3  # pc = c
+OP_ARGUMENT = 4  # argumentos.append(f[a])
+OP_CALL = 5  # llamada a la función a con b argumentos; el valor va a f[c]
+OP_RETURN = 6  # devuelve f[a]
+OP_PRINT = 7  # salida.append(f[a])
+# Operadores frecuentes con código propio: f[c] = f[a] <op> f[b] sin llamar a una función
+OP_ADD, OP_SUB, OP_MUL, OP_LT, OP_LE, OP_GT, OP_GE, OP_EQ, OP_NE = range(8, 17)
+
+OPCODE_NAMES = ("BINARY", "MOVE", "JUMP_IF_FALSE", "GOTO", "ARGUMENT", "CALL", "RETURN", "PRINT",
+                "ADD", "SUB", "MUL", "LT", "LE", "GT", "GE", "EQ", "NE")
+
+# Misma semántica que el código Python generado: '/' es división entera
+BINARY_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.floordiv,
+    '<<': operator.lshift, '>>': operator.rshift,
+    '>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le,
+    '==': operator.eq, '!=': operator.ne
+}
+SPECIALIZED_OPERATORS = {
+    '+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '<': OP_LT, '<=': OP_LE,
+    '>': OP_GT, '>=': OP_GE, '==': OP_EQ, '!=': OP_NE
+}
+
+NONE_SLOT = 0  # Todo marco guarda None en la posición 0
+
+# Límites por defecto de una ejecución
+DEFAULT_MAX_STEPS = 10_000_000
+DEFAULT_TIME_LIMIT = 5.0  # segundos
+DEFAULT_MAX_DEPTH = 10_000
+CHECK_INTERVAL = 100_000  # Instrucciones entre comprobaciones del reloj
+
+class VMError(Exception):
+    """Código intermedio que la máquina virtual no puede cargar"""
+
+class StepLimitExceeded(Exception):
+    pass
+
+class TimeLimitExceeded(Exception):
+    pass
+
+def constant_value(text: str) -> Any:
+    """Valor de Python de un literal del código intermedio (las cadenas con sus escapes resueltos)"""
+    constant = parse_literal(text)
+    if constant is None:
+        raise VMError(f"Literal no válido: {text}")
+    if isinstance(constant.value, str):
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return constant.value
+    return constant.value
+
+class VMFunction:
+    """Función decodificada: instrucciones, plantilla del marco y posiciones de los parámetros"""
+    def __init__(self, name: str):
+        self.name = name
+        self.code: List[tuple] = []
+        self.lines: List[int] = []  # Línea de origen de cada instrucción
+        self.template: List[Any] = [None]  # Constantes y huecos de variables (None)
+        self.parameter_start = 0
+        self.parameter_count = 0
+        self.slots: Dict[int, int] = {}  # id de operando -> posición en el marco
+
+    @property
+    def frame_size(self) -> int:
+        return len(self.template)
+
+    def disassemble(self) -> List[str]:
+        return [f"{offset:4d} {OPCODE_NAMES[opcode]:<14} {a} {b} {c}"
+                for offset, (opcode, a, b, c, _) in enumerate(self.code)]
+
+class VMProgram:
+    """Cuádruplos predecodificados en instrucciones compactas, una lista por función"""
+    def __init__(self):
+        self.functions: List[VMFunction] = []
+        self.function_index: Dict[str, int] = {}
+
+    @classmethod
+    def from_quadruples(cls, quadruples: List[Quadruple]) -> "VMProgram":
+        return cls.decode(QuadrupleStore.from_quadruples(quadruples))
+
+    @classmethod
+    def decode(cls, store: QuadrupleStore) -> "VMProgram":
+        program = cls()
+        ranges = [(start, end, name) for start, end, name in function_ranges(store) if name is not None]
+        for _, _, name in ranges:
+            program.function_index[name] = len(program.functions)
+            program.functions.append(VMFunction(name))
+        for (start, end, _), function in zip(ranges, program.functions):
+            program.decode_function(store, start, end, function)
+        return program
+
+    def decode_function(self, store: QuadrupleStore, start: int, end: int, function: VMFunction):
+        indices = [i for i in range(start, end) if not store.is_deleted(i)]
+        kinds = store.kinds
+
+        # Marco: None, constantes, parámetros, resto de variables y un hueco para valores descartados
+        slots = function.slots
+        for i in indices:
+            for oid in (store.arg1[i], store.arg2[i], store.result[i]):
+                if oid < 0 and oid not in slots:
+                    slots[oid] = len(function.template)
+                    function.template.append(constant_value(store.operand_text(oid)))
+        function.parameter_start = len(function.template)
+        for i in indices:
+            if store.is_formal_parameter(i):
+                slots[store.result[i]] = len(function.template)
+                function.template.append(None)
+                function.parameter_count += 1
+        for i in indices:
+            kind = kinds[i]
+            if kind == LABEL:
+                continue
+            fields = (store.arg2[i], store.result[i]) if kind == CALL else (store.arg1[i], store.arg2[i], store.result[i])
+            if kind == JUMP:
+                fields = (store.arg1[i],)
+            for oid in fields:
+                if oid > 0 and oid not in slots:
+                    slots[oid] = len(function.template)
+                    function.template.append(None)
+        discard = len(function.template)
+        function.template.append(None)
+
+        labels: Dict[int, int] = {}
+        jumps: List[int] = []  # Instrucciones cuyo destino falta resolver
+        code, lines = function.code, function.lines
+        for i in indices:
+            kind = kinds[i]
+            a, b, c = store.arg1[i], store.arg2[i], store.result[i]
+            if kind == LABEL:
+                labels[c] = len(code)
+                continue
+            if kind == ARITHMETIC or kind == COMPARISON:
+                operator_text = store.operator(i)
+                fn = BINARY_OPERATORS.get(operator_text)
+                if fn is None:
+                    raise VMError(f"Operador no soportado: {operator_text}")
+                opcode = SPECIALIZED_OPERATORS.get(operator_text, OP_BINARY)
+                instruction = (opcode, slots[a], slots[b], slots[c], fn)
+            elif kind == ASSIGNMENT:
+                instruction = (OP_MOVE, slots[a], 0, slots[c], None)
+            elif kind == JUMP:
+                jumps.append(len(code))
+                if store.operator(i) == "":
+                    instruction = (OP_GOTO, 0, 0, c, None)
+                else:
+                    instruction = (OP_JUMP_IF_FALSE, slots[a], 0, c, None)
+            elif kind == PARAM:
+                if store.is_formal_parameter(i):
+                    continue
+                instruction = (OP_ARGUMENT, slots[a], 0, 0, None)
+            elif kind == CALL:
+                callee = store.operand_text(a)
+                if callee not in self.function_index:
+                    raise VMError(f"Llamada a una función inexistente: {callee}")
+                argument_count = int(store.operand_text(b) or 0)
+                instruction = (OP_CALL, self.function_index[callee], argument_count,
+                               slots[c] if c != NO_OPERAND else discard, None)
+            elif kind == RETURN:
+                instruction = (OP_RETURN, slots[a] if a != NO_OPERAND else NONE_SLOT, 0, 0, None)
+            elif kind == WRITE:
+                instruction = (OP_PRINT, slots[a], 0, 0, None)
+            else:
+                raise VMError(f"Cuádruplo no soportado: {store.quadruple(i)}")
+            code.append(instruction)
+            lines.append(store.lines[i])
+        # Caer al final de la función devuelve None
+        code.append((OP_RETURN, NONE_SLOT, 0, 0, None))
+        lines.append(NO_LINE)
+
+        for offset in jumps:
+            opcode, a, b, label, fn = code[offset]
+            if label not in labels:
+                raise VMError(f"Salto a una etiqueta fuera de {function.name}: {store.operand_text(label)}")
+            code[offset] = (opcode, a, b, labels[label], fn)
+
+class ExecutionResult:
+    """Resultado de una ejecución: salida, valor devuelto por main, contadores y estado"""
+    def __init__(self):
+        self.status = "ok"  # ok, error, step_limit, time_limit, memory_limit
+        self.output: List[str] = []
+        self.return_value: Any = None
+        self.error: Optional[str] = None
+        self.instructions = 0
+        self.calls = 0
+        self.max_depth = 0
+        self.elapsed = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "output": self.output,
+            "return_value": None if self.return_value is None else str(self.return_value),
+            "error": self.error,
+            "instructions": self.instructions,
+            "calls": self.calls,
+            "max_depth": self.max_depth,
+            "elapsed": self.elapsed
+        }
+
+class VirtualMachine:
+    """Ejecuta un VMProgram con un bucle de despacho sobre tuplas predecodificadas.
+
+    Los marcos son listas que se copian de la plantilla de la función, así que
+    leer una constante o una variable es siempre ``f[posición]``. Las
+    llamadas usan una pila explícita (la recursión del programa no consume
+    pila de Python). El límite de pasos y el de tiempo se comprueban en los
+    saltos tomados y en las llamadas, cada CHECK_INTERVAL instrucciones.
+    Con ``output`` cada valor impreso se entrega en el momento a esa función
+    en lugar de acumularse en el resultado (así el sandbox aplica su límite
+    de salida mientras el programa se ejecuta).
+    """
+    def __init__(self, program: VMProgram, max_steps: int = DEFAULT_MAX_STEPS,
+                 time_limit: Optional[float] = DEFAULT_TIME_LIMIT, max_depth: int = DEFAULT_MAX_DEPTH,
+                 output: Optional[Callable[[Any], None]] = None):
+        self.program = program
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.output = output
+        self.started = 0.0
+
+    def checkpoint(self, count: int) -> int:
+        """Comprueba los límites y devuelve el contador de la próxima comprobación"""
+        if count >= self.max_steps:
+            raise StepLimitExceeded()
+        if self.time_limit is not None and time.perf_counter() - self.started > self.time_limit:
+            raise TimeLimitExceeded()
+        return min(count + CHECK_INTERVAL, self.max_steps)
+
+    def record_failure(self, result: ExecutionResult, error: Exception, function_name: str, line: int):
+        """Anota en el resultado un límite superado o un error en tiempo de ejecución"""
+        if isinstance(error, StepLimitExceeded):
+            result.status = "step_limit"
+            result.error = f"Se superó el límite de {self.max_steps} instrucciones"
+        elif isinstance(error, TimeLimitExceeded):
+            result.status = "time_limit"
+            result.error = f"Se superó el límite de tiempo ({self.time_limit} s)"
+        elif isinstance(error, MemoryError):
+            # Mismo estado que el backend Python en el sandbox (no es un error del programa)
+            result.status = "memory_limit"
+            result.error = "Se superó el límite de memoria"
+        else:
+            result.status = "error"
+            where = f" (línea {line})" if line != NO_LINE else ""
+            message = "división entre cero" if isinstance(error, ZeroDivisionError) else str(error)
+            result.error = f"Error en tiempo de ejecución en {function_name}{where}: {message}"
+
+    def run(self, entry: str = "main", arguments: Sequence[Any] = ()) -> ExecutionResult:
+        result = ExecutionResult()
+        if entry not in self.program.function_index:
+            result.status = "error"
+            result.error = f"No existe la función {entry}"
+            return result
+
+        functions = self.program.functions
+        function = functions[self.program.function_index[entry]]
+        if len(arguments) != function.parameter_count:
+            result.status = "error"
+            result.error = f"{entry}() espera {function.parameter_count} argumentos"
+            return result
+        code, f, pc = function.code, function.template[:], 0
+        f[function.parameter_start:function.parameter_start + len(arguments)] = arguments
+        stack: List[tuple] = []
+        arguments: List[Any] = []
+        output: List[Any] = []
+        emit = output.append if self.output is None else self.output
+        max_depth = self.max_depth
+        # Las instrucciones se cuentan por tramos: al saltar se suma lo recorrido desde mark
+        count, mark, calls, depth, deepest = 0, 0, 0, 0, 0
+        self.started = time.perf_counter()
+        next_check = min(CHECK_INTERVAL, self.max_steps)
+
+        try:
+            while True:
+                opcode, a, b, c, fn = code[pc]
+                pc += 1
+                if opcode == OP_ADD:
+                    f[c] = f[a] + f[b]
+                elif opcode == OP_LT:
+                    f[c] = f[a] < f[b]
+                elif opcode == OP_MOVE:
+                    f[c] = f[a]
+                elif opcode == OP_JUMP_IF_FALSE:
+                    if not f[a]:
+                        count += pc - mark
+                        pc = mark = c
+                        if count >= next_check:
+                            next_check = self.checkpoint(count)
+                elif opcode == OP_GOTO:
+                    count += pc - mark
+                    pc = mark = c
+                    if count >= next_check:
+                        next_check = self.checkpoint(count)
+                elif opcode == OP_SUB:
+                    f[c] = f[a] - f[b]
+                elif opcode == OP_MUL:
+                    f[c] = f[a] * f[b]
+                elif opcode == OP_GT:
+                    f[c] = f[a] > f[b]
+                elif opcode == OP_LE:
+                    f[c] = f[a] <= f[b]
+                elif opcode == OP_GE:
+                    f[c] = f[a] >= f[b]
+                elif opcode == OP_EQ:
+                    f[c] = f[a] == f[b]
+                elif opcode == OP_NE:
+                    f[c] = f[a] != f[b]
+                elif opcode == OP_BINARY:
+                    f[c] = fn(f[a], f[b])
+                elif opcode == OP_ARGUMENT:
+                    arguments.append(f[a])
+                elif opcode == OP_CALL:
+                    count += pc - mark
+                    mark = 0
+                    if depth >= max_depth:
+                        raise RecursionError(f"se superó la profundidad máxima de llamadas ({max_depth})")
+                    if count >= next_check:
+                        next_check = self.checkpoint(count)
+                    callee = functions[a]
+                    if b != callee.parameter_count or len(arguments) != b:
+                        raise TypeError(f"{callee.name}() espera {callee.parameter_count} argumentos")
+                    stack.append((code, pc, f, c, function))
+                    function = callee
+                    code, pc, f = callee.code, 0, callee.template[:]
+                    start = callee.parameter_start
+                    f[start:start + b] = arguments
+                    arguments = []
+                    calls += 1
+                    depth += 1
+                    if depth > deepest:
+                        deepest = depth
+                elif opcode == OP_RETURN:
+                    count += pc - mark
+                    value = f[a]
+                    if not stack:
+                        mark = pc
+                        result.return_value = value
+                        break
+                    code, pc, f, c, function = stack.pop()
+                    mark = pc
+                    f[c] = value
+                    depth -= 1
+                elif opcode == OP_PRINT:
+                    emit(f[a])
+        except Exception as e:
+            line = function.lines[pc - 1] if 0 < pc <= len(function.lines) else NO_LINE
+            self.record_failure(result, e, function.name, line)
+
+        result.elapsed = time.perf_counter() - self.started
+        result.output = [str(value) for value in output]
+        result.instructions = count + pc - mark
+        result.calls = calls
+        result.max_depth = deepest
+        return result
+
+def run_quadruples(quadruples: List[Quadruple], **limits) -> ExecutionResult:
+    """Decodifica y ejecuta una lista de cuádruplos a partir de main"""
+    return VirtualMachine(VMProgram.from_quadruples(quadruples), **limits).run()
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 # Aquí importamos el router desde compile.py
 # Asumiendo que está en app/api/compile.py
 from app.api.compile import router as compile_router 
+from app.compiler.sandbox import worker_pool
 
 print("--- Iniciando main.py ---")
 
@@ -32,6 +33,16 @@ except Exception as e:
     print(f"!!! ERROR AL CARGAR EL ROUTER: {e} !!!")
 # ------------------------------------
 
+# Los trabajadores de /api/run se crean al arrancar, con los módulos del compilador ya importados
+@app.on_event("startup")
+async def start_workers():
+    worker_pool.start()
+    print(f"Pool de ejecución iniciado: {worker_pool.size} trabajadores ({worker_pool.context.get_start_method()})")
+
+@app.on_event("shutdown")
+async def stop_workers():
+    worker_pool.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Compilador Web Interactivo API", "status": "active"}
@@ -17,6 +17,7 @@ class DataType(str, Enum):
 
 class CompileRequest(BaseModel):
     code: str
+    optimization_level: str = "O2"  # O0 (sin optimizar), O1 (una pasada), O2 (punto fijo), O3 (O2 + SSA)
 
 class Token(BaseModel):
     type: str
@@ -135,6 +136,24 @@ class CompileResponse(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
+class RunRequest(BaseModel):
+    code: str
+    optimization_level: str = "O2"
+    backend: str = "python"  # python (objeto código) o vm (máquina virtual)
+    # Límites pedidos por el cliente; nunca superan los del servidor
+    cpu_time: Optional[float] = Field(None, gt=0)
+    max_output: Optional[int] = Field(None, gt=0)
+
+class RunResponse(BaseModel):
+    success: bool
+    status: str  # ok, error, compile_error, cpu_limit, time_limit, memory_limit, output_limit, step_limit
+    output: List[str] = []
+    truncated: bool = False
+    return_value: Optional[str] = None
+    errors: List[str] = []
+    warnings: List[str] = []
+    metrics: Optional[Dict[str, Any]] = None
+
 class LintResponse(BaseModel):
     errors: List[str] = []
     warnings: List[str] = []
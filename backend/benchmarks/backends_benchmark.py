@@ -0,0 +1,57 @@
+"""Compara los backends de ejecución con programas con muchos bucles.
+
+- vm: VirtualMachine (bucle de despacho sobre tuplas predecodificadas)
+- cierres: ClosureMachine (un cierre por cuádruplo, encadenados por bloque)
+- exec texto: compilar el texto Python generado y ejecutarlo
+- objeto código: ejecutar el objeto código ya compilado (CodeObjectGenerator)
+
+Para cada backend se mide la preparación (decodificar o compilar) y la
+ejecución por separado. Uso (desde backend/):
+python benchmarks/backends_benchmark.py [nivel] [repeticiones]
+"""
+import contextlib
+import io
+import sys
+
+from programs import compile_programs
+from vm_benchmark import best_of
+from app.compiler.vm import VMProgram, VirtualMachine
+from app.compiler.closures import ClosureProgram, ClosureMachine
+from app.compiler.codeobject import CodeObjectGenerator
+
+def exec_output(code) -> list:
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        exec(code, {"__name__": "__main__"})
+    return buffer.getvalue().splitlines()
+
+def backends(program):
+    """(nombre, preparar, ejecutar) por backend; ejecutar recibe lo que devuelve preparar"""
+    return [
+        ("vm", lambda: VMProgram.from_quadruples(program.quadruples),
+         lambda prepared: VirtualMachine(prepared, time_limit=None).run().output),
+        ("cierres", lambda: ClosureProgram.from_quadruples(program.quadruples),
+         lambda prepared: ClosureMachine(prepared, time_limit=None).run().output),
+        ("exec texto", lambda: compile(program.python, "<generado>", "exec"), exec_output),
+        ("objeto código", lambda: CodeObjectGenerator(program.symbol_table).compile(program.quadruples), exec_output),
+    ]
+
+def main():
+    level = sys.argv[1] if len(sys.argv) > 1 else "O2"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"Nivel {level}, mejor de {repeat}; tiempos en ms (preparación + ejecución)")
+    programs = compile_programs(level)
+    names = [name for name, _, _ in backends(programs[0])]
+    print(f"{'programa':<18}" + "".join(f"{name:>22}" for name in names))
+    for program in programs:
+        row, reference = [], None
+        for name, prepare, execute in backends(program):
+            setup, prepared = best_of(repeat, prepare)
+            elapsed, output = best_of(repeat, lambda: execute(prepared))
+            reference = output if reference is None else reference
+            mark = "" if output == reference else "!"
+            row.append(f"{1000 * setup:8.2f} + {1000 * elapsed:9.2f}{mark:1}")
+        print(f"{program.name:<18}" + "".join(f"{cell:>22}" for cell in row))
+
+if __name__ == "__main__":
+    main()
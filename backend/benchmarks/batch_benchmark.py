@@ -0,0 +1,59 @@
+"""Ejecución por lotes: VectorizedMachine frente a una VirtualMachine por conjunto de entradas.
+
+Ejecuta la misma función con N conjuntos de argumentos y comprueba que
+ambos caminos dan la misma salida y el mismo valor devuelto. Uso (desde
+backend/): python benchmarks/batch_benchmark.py [nivel] [carriles...]
+"""
+import random
+import sys
+
+from programs import PROGRAMS, CompiledProgram
+from vm_benchmark import best_of
+from app.compiler.vm import VMProgram, VirtualMachine
+from app.compiler.vectorized import VectorizedMachine
+
+GRADING = """
+function int nota(int parcial, int practicas, int examen) {
+    int total = parcial * 3 + practicas * 2 + examen * 5;
+    if (total < 300) {
+        print(0);
+        return total / 10;
+    }
+    if (practicas < 50) {
+        total = total - 100;
+    } else {
+        total = total + 20;
+    }
+    return total / 10;
+}
+function main() {
+    print(nota(80, 90, 70));
+}
+"""
+
+# (programa, función, generador de argumentos)
+CASES = [
+    ("collatz", PROGRAMS["collatz"], "steps", lambda: (random.randint(1, 1000),)),
+    ("nota", GRADING, "nota", lambda: tuple(random.randint(0, 100) for _ in range(3))),
+]
+
+def main():
+    level = sys.argv[1] if len(sys.argv) > 1 else "O2"
+    widths = [int(width) for width in sys.argv[2:]] or [100, 1000, 10000]
+    random.seed(0)
+    print(f"Nivel {level}; tiempos en ms (mejor de 3)")
+    print(f"{'programa':<10}{'carriles':>10}{'vectorizado':>14}{'vm':>12}{'aceleración':>14}{'a la vm':>10}")
+    for name, source, entry, arguments in CASES:
+        program = VMProgram.from_quadruples(CompiledProgram(name, source, level).quadruples)
+        for width in widths:
+            inputs = [arguments() for _ in range(width)]
+            vector_time, batch = best_of(3, lambda: VectorizedMachine(program, time_limit=None).run(inputs, entry))
+            scalar_time, scalar = best_of(3, lambda: [VirtualMachine(program, time_limit=None).run(entry, args)
+                                                      for args in inputs])
+            same = all((a.output, a.return_value) == (b.output, b.return_value)
+                       for a, b in zip(batch.results, scalar))
+            print(f"{name:<10}{width:>10}{1000 * vector_time:>14.1f}{1000 * scalar_time:>12.1f}"
+                  f"{scalar_time / vector_time:>13.1f}x{batch.fallback:>10}" + ("" if same else "  ¡distinto!"))
+
+if __name__ == "__main__":
+    main()
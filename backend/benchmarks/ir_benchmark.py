@@ -0,0 +1,39 @@
+"""Tamaño y tiempo de serialización del código intermedio: formato binario frente a pickle y JSON.
+
+"a almacén" incluye reconstruir el QuadrupleStore (lo que necesitan la VM y
+los trabajadores). Uso (desde backend/): python benchmarks/ir_benchmark.py [nivel] [copias]
+"""
+import pickle
+import sys
+
+from programs import compile_programs
+from vm_benchmark import best_of
+from app.models.schemas import IntermediateCode
+from app.compiler.ir import QuadrupleStore
+from app.compiler import ir_binary
+
+def main():
+    level = sys.argv[1] if len(sys.argv) > 1 else "O0"
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    # Copias independientes: pickle no puede aprovechar objetos repetidos
+    quadruples = [quadruple.model_copy() for _ in range(copies)
+                  for program in compile_programs(level) for quadruple in program.quadruples]
+    code = IntermediateCode(quadruples=quadruples)
+    store = QuadrupleStore.from_quadruples(quadruples)
+    formats = [
+        ("binario", lambda: ir_binary.encode_store(store),
+         lambda data: ir_binary.decode_store(memoryview(data))[0]),
+        ("pickle", lambda: pickle.dumps(quadruples),
+         lambda data: QuadrupleStore.from_quadruples(pickle.loads(data))),
+        ("json", lambda: code.model_dump_json().encode(),
+         lambda data: QuadrupleStore.from_quadruples(IntermediateCode.model_validate_json(data).quadruples)),
+    ]
+    print(f"{len(quadruples)} cuádruplos (nivel {level}); tiempos en ms, mejor de 5")
+    print(f"{'formato':<10}{'bytes':>10}{'codificar':>12}{'a almacén':>12}")
+    for name, encode, decode in formats:
+        encode_time, data = best_of(5, encode)
+        decode_time, _ = best_of(5, lambda: decode(data))
+        print(f"{name:<10}{len(data):>10}{1000 * encode_time:>12.2f}{1000 * decode_time:>12.2f}")
+
+if __name__ == "__main__":
+    main()
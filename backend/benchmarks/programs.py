@@ -0,0 +1,105 @@
+"""Programas de prueba para los benchmarks y compilación silenciosa hasta el código intermedio optimizado"""
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.compiler.lexer import Lexer
+from app.compiler.parser import Parser
+from app.compiler.semantic import SemanticAnalyzer
+from app.compiler.intermediate import IntermediateCodeGenerator
+from app.compiler.optimizer import CodeOptimizer
+from app.compiler.generator import CodeGenerator
+
+PROGRAMS = {
+    "suma": """
+function main() {
+    int i = 0;
+    int total = 0;
+    while (i < 300000) {
+        total = total + i * 3;
+        i = i + 1;
+    }
+    print(total);
+}
+""",
+    "bucles_anidados": """
+function main() {
+    int i = 0;
+    int count = 0;
+    while (i < 400) {
+        int j = 0;
+        while (j < 400) {
+            if (i + j > 300) {
+                count = count + 1;
+            } else {
+                count = count - 1;
+            }
+            j = j + 1;
+        }
+        i = i + 1;
+    }
+    print(count);
+}
+""",
+    "collatz": """
+function int steps(int n) {
+    int count = 0;
+    while (n != 1) {
+        int half = n / 2;
+        if (half * 2 == n) {
+            n = half;
+        } else {
+            n = 3 * n + 1;
+        }
+        count = count + 1;
+    }
+    return count;
+}
+function main() {
+    int i = 1;
+    int best = 0;
+    while (i < 3000) {
+        int s = steps(i);
+        if (s > best) {
+            best = s;
+        }
+        i = i + 1;
+    }
+    print(best);
+}
+""",
+    "fibonacci": """
+function int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+function main() {
+    print(fib(20));
+}
+""",
+}
+
+class CompiledProgram:
+    """Tabla de símbolos y cuádruplos optimizados de un programa de prueba"""
+    def __init__(self, name: str, source: str, level: str):
+        with contextlib.redirect_stdout(io.StringIO()):
+            tokens, lexer_errors = Lexer().tokenize(source)
+            ast, parser_errors = Parser().parse(tokens)
+            semantic = SemanticAnalyzer().analyze(ast)
+            if lexer_errors or parser_errors or semantic.errors:
+                raise ValueError(f"{name}: {lexer_errors + parser_errors + semantic.errors}")
+            intermediate = IntermediateCodeGenerator(semantic.symbol_table).generate(ast)
+            optimizer = CodeOptimizer(level=level, symbol_table=semantic.symbol_table)
+            self.quadruples = optimizer.optimize(intermediate.quadruples)
+            self.python = CodeGenerator(semantic.symbol_table).generate(self.quadruples)
+        self.name = name
+        self.level = level
+        self.symbol_table = semantic.symbol_table
+
+def compile_programs(level: str = "O2"):
+    return [CompiledProgram(name, source, level) for name, source in PROGRAMS.items()]
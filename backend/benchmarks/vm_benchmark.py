@@ -0,0 +1,43 @@
+"""Compara la máquina virtual de cuádruplos con la ejecución del Python generado.
+
+Uso (desde backend/): python benchmarks/vm_benchmark.py [nivel] [repeticiones]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from programs import compile_programs
+from app.compiler.vm import VMProgram, VirtualMachine
+
+def run_python(code: str) -> list:
+    compiled = compile(code, "<generado>", "exec")
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        exec(compiled, {"__name__": "__main__"})
+    return buffer.getvalue().splitlines()
+
+def best_of(repeat: int, function):
+    best, value = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+def main():
+    level = sys.argv[1] if len(sys.argv) > 1 else "O2"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"Nivel {level}, mejor de {repeat}")
+    print(f"{'programa':<18}{'instrucciones':>14}{'VM (s)':>10}{'Python (s)':>12}{'VM/Python':>11}")
+    for program in compile_programs(level):
+        vm_program = VMProgram.from_quadruples(program.quadruples)
+        vm_time, result = best_of(repeat, lambda: VirtualMachine(vm_program, time_limit=None).run())
+        python_time, output = best_of(repeat, lambda: run_python(program.python))
+        status = "" if result.output == output else "  (¡salidas distintas!)"
+        print(f"{program.name:<18}{result.instructions:>14}{vm_time:>10.3f}{python_time:>12.3f}"
+              f"{vm_time / python_time:>10.1f}x{status}")
+
+if __name__ == "__main__":
+    main()
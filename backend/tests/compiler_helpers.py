@@ -0,0 +1,63 @@
+"""Utilidades compartidas por las pruebas: compilar un programa hasta un nivel y ejecutarlo"""
+from app.models.schemas import IntermediateCode, SymbolTable
+from app.compiler.lexer import Lexer
+from app.compiler.parser import Parser
+from app.compiler.semantic import SemanticAnalyzer
+from app.compiler.intermediate import IntermediateCodeGenerator
+from app.compiler.optimizer import CodeOptimizer
+from app.compiler.generator import CodeGenerator
+from app.compiler.codeobject import CodeObjectGenerator
+from app.compiler import vm, closures
+from typing import List, Tuple
+import contextlib
+import io
+
+LEVELS = ("O0", "O1", "O2", "O3")
+BACKENDS = ("vm", "closures", "python")
+MAX_STEPS = 2_000_000
+
+class CompiledProgram:
+    def __init__(self, intermediate: IntermediateCode, optimized: IntermediateCode, symbol_table: SymbolTable):
+        self.intermediate = intermediate
+        self.optimized = optimized
+        self.symbol_table = symbol_table
+
+def compile_program(source: str, level: str) -> CompiledProgram:
+    """Mismo pipeline que /api/compile (las fases imprimen su progreso: se descarta)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokens, lexer_errors = Lexer().tokenize(source)
+        ast, parser_errors = Parser().parse(tokens)
+        assert not lexer_errors and not parser_errors, lexer_errors + parser_errors
+        semantic = SemanticAnalyzer().analyze(ast)
+        assert not semantic.errors, semantic.errors
+        generator = IntermediateCodeGenerator(semantic.symbol_table)
+        intermediate = generator.generate(ast)
+        optimizer = CodeOptimizer(level=level, symbol_table=semantic.symbol_table)
+        store = optimizer.optimize_store(generator.store.copy())
+        temporal_counter = intermediate.temporal_counter
+        if optimizer.temporaries is not None:
+            temporal_counter = optimizer.temporaries.temporal_counter
+        optimized = IntermediateCode(quadruples=store.to_quadruples(), temporal_counter=temporal_counter,
+                                     label_counter=intermediate.label_counter)
+    return CompiledProgram(intermediate, optimized, semantic.symbol_table)
+
+def run(program: CompiledProgram, backend: str) -> Tuple[bool, List[str]]:
+    """(terminó sin error, líneas impresas) al ejecutar el código optimizado en un backend"""
+    quadruples = program.optimized.quadruples
+    if backend == "vm":
+        result = vm.run_quadruples(quadruples, max_steps=MAX_STEPS)
+        return result.success, result.output
+    if backend == "closures":
+        result = closures.run_quadruples(quadruples, max_steps=MAX_STEPS)
+        return result.success, result.output
+    output: List[str] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = CodeGenerator(program.symbol_table)
+        generator.generate(quadruples)
+        code = CodeObjectGenerator(program.symbol_table).compile_generated(generator)
+    printer = lambda *values: output.append(" ".join(str(value) for value in values))
+    try:
+        exec(code, {"__name__": "__main__", "__builtins__": {"print": printer}})
+    except Exception:
+        return False, output
+    return True, output
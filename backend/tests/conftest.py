@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de la aplicación se importan como "app.*" desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
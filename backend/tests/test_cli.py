@@ -0,0 +1,72 @@
+"""Compilador por lotes (python -m app.cli)"""
+from compiler_helpers import compile_program
+from test_optimization_levels import PROGRAMS
+from app import cli
+from app.compiler import ir_binary
+from app.models.schemas import IntermediateCode
+import json
+import os
+import pytest
+
+@pytest.fixture
+def sources(tmp_path):
+    """Árbol de programas: uno por programa de prueba, algunos en un subdirectorio, y uno con errores"""
+    root = tmp_path / "programas"
+    (root / "sub").mkdir(parents=True)
+    for number, name in enumerate(sorted(PROGRAMS)):
+        directory = root / "sub" if number % 2 else root
+        (directory / f"{name}.src").write_text(PROGRAMS[name], encoding="utf-8")
+    (root / "notas.txt").write_text("no es un programa", encoding="utf-8")
+    return root
+
+def run_json(capsys, argv):
+    code = cli.main(argv + ["--json"])
+    return code, json.loads(capsys.readouterr().out)
+
+def test_artifacts_match_the_compile_pipeline(sources, tmp_path, capsys):
+    output = tmp_path / "salida"
+    code, report = run_json(capsys, [str(sources), "-O", "O2", "--emit", "ir,opt,qir,py", "-o", str(output), "-j", "1"])
+    assert code == 0
+    assert report["summary"]["files"] == len(PROGRAMS) == report["summary"]["succeeded"]
+    for result in report["files"]:
+        name = os.path.splitext(os.path.basename(result["path"]))[0]
+        base = os.path.splitext(os.path.join(output, os.path.relpath(result["path"], sources)))[0]
+        assert sorted(result["written"]) == sorted(base + extension for extension in cli.ARTIFACTS.values())
+        expected = compile_program(PROGRAMS[name], "O2")
+        with open(base + ".opt.json", encoding="utf-8") as optimized:
+            assert IntermediateCode.model_validate_json(optimized.read()) == expected.optimized
+        with open(base + ".ir.json", encoding="utf-8") as intermediate:
+            assert IntermediateCode.model_validate_json(intermediate.read()) == expected.intermediate
+        with open(base + ".qir", "rb") as binary:
+            assert ir_binary.decode(binary.read()) == expected.optimized
+        with open(base + ".py", encoding="utf-8") as python:
+            compile(python.read(), base + ".py", "exec")
+
+def test_process_pool_gives_the_same_results(sources, capsys):
+    _, serial = run_json(capsys, [str(sources), "-j", "1"])
+    _, parallel = run_json(capsys, [str(sources), "-j", "3"])
+    key = lambda result: result["path"]
+    strip = lambda results: [{k: v for k, v in result.items() if k != "timings"} for result in sorted(results, key=key)]
+    assert strip(parallel["files"]) == strip(serial["files"])
+    assert parallel["summary"]["jobs"] == 3
+
+def test_errors_set_the_exit_code(tmp_path, capsys):
+    broken = tmp_path / "roto.src"
+    broken.write_text("function main() { print(x); }", encoding="utf-8")
+    code, report = run_json(capsys, [str(broken), str(tmp_path / "no_existe.src"), "-j", "1"])
+    assert code == 1
+    assert report["summary"]["failed"] == 2
+    assert all(result["errors"] and not result["success"] for result in report["files"])
+
+def test_expand_inputs(sources):
+    pattern = os.path.join(str(sources), "**", "*.src")
+    expanded = cli.expand_inputs([pattern, str(sources)], "*.src")
+    assert len(expanded) == len(PROGRAMS)
+    assert cli.expand_inputs([str(sources)], "*.txt") == [os.path.join(str(sources), "notas.txt")]
+
+def test_no_inputs_and_bad_arguments(tmp_path, capsys):
+    assert cli.main([str(tmp_path / "*.src")]) == 2
+    with pytest.raises(SystemExit):
+        cli.parse_arguments(["a.src", "--emit", "py,exe"])
+    with pytest.raises(SystemExit):
+        cli.parse_arguments(["a.src", "-j", "0"])
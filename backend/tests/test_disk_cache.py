@@ -0,0 +1,105 @@
+"""Caché de compilación en disco: ida y vuelta, varios procesos y compactación"""
+from compiler_helpers import compile_program
+from test_optimization_levels import PROGRAMS
+from app.compiler.disk_cache import DiskCache, RECORD_HEADER, APP_ROOT, compiler_version, fcntl
+import multiprocessing
+import os
+import shutil
+import pytest
+
+SOURCE = PROGRAMS["funciones"]
+
+def artifacts_for(level: str):
+    program = compile_program(SOURCE, level)
+    artifacts = {"success": True, "object_code": "print(1)", "metrics": {"level": level}}
+    intermediate = {"intermediate_code": program.intermediate, "optimized_code": program.optimized}
+    return artifacts, intermediate
+
+def test_store_and_load(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    artifacts, intermediate = artifacts_for("O2")
+    assert cache.load(SOURCE, "O2") is None
+    cache.store(SOURCE, "O2", artifacts, intermediate)
+    loaded = cache.load(SOURCE, "O2")
+    assert loaded == {**artifacts, **intermediate}
+    assert cache.load(SOURCE, "O1") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_shared_between_instances(tmp_path):
+    writer, reader = DiskCache(str(tmp_path)), DiskCache(str(tmp_path))
+    assert reader.load(SOURCE, "O2") is None
+    artifacts, intermediate = artifacts_for("O2")
+    writer.store(SOURCE, "O2", artifacts, intermediate)
+    assert reader.load(SOURCE, "O2") == {**artifacts, **intermediate}
+
+def test_compiler_version_is_part_of_the_key(tmp_path):
+    DiskCache(str(tmp_path), version="a").store(SOURCE, "O2", {"success": True})
+    assert DiskCache(str(tmp_path), version="b").load(SOURCE, "O2") is None
+    assert DiskCache(str(tmp_path), version="a").load(SOURCE, "O2") == {"success": True}
+
+@pytest.mark.parametrize("module", ["compiler/optimizer.py", "models/schemas.py", "api/compile.py"])
+def test_version_covers_the_whole_app(tmp_path, module):
+    root = str(tmp_path / "app")
+    shutil.copytree(APP_ROOT, root, ignore=shutil.ignore_patterns("__pycache__"))
+    version = compiler_version(root)
+    assert version == compiler_version(APP_ROOT)
+    os.makedirs(os.path.join(root, "__pycache__"), exist_ok=True)
+    with open(os.path.join(root, "__pycache__", "main.cpython.pyc"), "wb") as compiled:
+        compiled.write(b"ignorado")
+    assert compiler_version(root) == version
+    with open(os.path.join(root, module), "a") as source:
+        source.write("\n# cambio\n")
+    assert compiler_version(root) != version
+
+def test_corrupted_record_is_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put(b"k" * 32, b"datos del registro")
+    with open(cache.path, "r+b") as data:
+        data.seek(-1, os.SEEK_END)
+        data.write(b"X")
+    assert DiskCache(str(tmp_path)).get(b"k" * 32) is None
+
+def test_compaction_keeps_newest_records(tmp_path):
+    max_bytes = 4096
+    cache = DiskCache(str(tmp_path), max_bytes=max_bytes)
+    payload = bytes(200)
+    keys = [bytes([number]) * 32 for number in range(60)]
+    for key in keys:
+        cache.put(key, payload)
+    assert cache.compactions > 0
+    assert os.path.getsize(cache.path) <= max_bytes
+    assert cache.get(keys[-1]) == payload
+    assert cache.get(keys[0]) is None
+    # Los supervivientes son un sufijo de los más recientes
+    kept = [key for key in keys if cache.get(key) is not None]
+    assert kept == keys[-len(kept):]
+    assert len(kept) * (RECORD_HEADER.size + len(payload)) <= max_bytes
+
+def test_clear(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put(b"k" * 32, b"datos")
+    other = DiskCache(str(tmp_path))
+    assert other.get(b"k" * 32) == b"datos"
+    cache.clear()
+    assert cache.get(b"k" * 32) is None
+    assert other.get(b"k" * 32) is None
+
+def write_records(directory: str, worker: int, count: int):
+    cache = DiskCache(directory)
+    for number in range(count):
+        cache.put(bytes([worker, number]) * 16, f"{worker}:{number}".encode() * 50)
+
+@pytest.mark.skipif(fcntl is None or "fork" not in multiprocessing.get_all_start_methods(),
+                    reason="requiere flock y fork")
+def test_concurrent_writers(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=write_records, args=(str(tmp_path), worker, 25)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+    cache = DiskCache(str(tmp_path))
+    for worker in range(4):
+        for number in range(25):
+            assert cache.get(bytes([worker, number]) * 16) == f"{worker}:{number}".encode() * 50
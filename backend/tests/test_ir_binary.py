@@ -0,0 +1,48 @@
+"""Ida y vuelta del formato binario del código intermedio (app.compiler.ir_binary)"""
+from compiler_helpers import LEVELS, compile_program
+from test_optimization_levels import PROGRAMS, random_program
+from app.compiler import ir_binary
+from app.compiler.ir import QuadrupleStore
+from app.compiler.ir_binary import IRFormatError
+import pytest
+
+@pytest.mark.parametrize("level", LEVELS)
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_roundtrip(name, level):
+    program = compile_program(PROGRAMS[name], level)
+    for code in (program.intermediate, program.optimized):
+        assert ir_binary.decode(ir_binary.encode(code)) == code
+
+@pytest.mark.parametrize("seed", range(10))
+def test_roundtrip_random_programs(seed):
+    code = compile_program(random_program(seed), "O3").optimized
+    assert ir_binary.decode(ir_binary.encode(code)) == code
+
+def test_encode_store_skips_deleted_quadruples():
+    code = compile_program(PROGRAMS["bucles"], "O0").intermediate
+    store = QuadrupleStore.from_quadruples(code.quadruples)
+    for index in range(0, len(store), 3):
+        store.delete(index)
+    decoded, temporal_counter, label_counter = ir_binary.decode_store(ir_binary.encode_store(store, 7, 3))
+    assert (temporal_counter, label_counter) == (7, 3)
+    assert len(decoded) == store.live_count
+    assert decoded.to_quadruples() == store.to_quadruples()
+
+def test_varints():
+    for value in (0, 1, 127, 128, 300, 2 ** 31 - 1, 2 ** 40):
+        out = bytearray()
+        ir_binary.write_varint(out, value)
+        assert ir_binary.read_varint(memoryview(bytes(out)), 0) == (value, len(out))
+    for value in (0, -1, 1, -64, 64, -(2 ** 31), 2 ** 31 - 1):
+        out = bytearray()
+        ir_binary.write_signed(out, value)
+        assert ir_binary.read_signed(memoryview(bytes(out)), 0) == (value, len(out))
+
+def test_rejects_invalid_data():
+    data = ir_binary.encode(compile_program(PROGRAMS["funciones"], "O2").optimized)
+    with pytest.raises(IRFormatError):
+        ir_binary.decode(b"XYZ" + data[3:])
+    with pytest.raises(IRFormatError):
+        ir_binary.decode(data[:3] + bytes([ir_binary.FORMAT_VERSION + 1]) + data[4:])
+    with pytest.raises(IRFormatError):
+        ir_binary.decode(data[:len(data) // 2])
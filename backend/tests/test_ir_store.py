@@ -0,0 +1,58 @@
+"""Almacén de cuádruplos en arreglos paralelos (app.compiler.ir.QuadrupleStore)"""
+from compiler_helpers import LEVELS, compile_program
+from test_optimization_levels import PROGRAMS
+from app.compiler.ir import QuadrupleStore, ARITHMETIC, ASSIGNMENT, JUMP, LABEL, TOMBSTONE
+import pytest
+
+def sample_store() -> QuadrupleStore:
+    store = QuadrupleStore()
+    store.append(LABEL, result="func_main")
+    store.append(ASSIGNMENT, "=", "1", result="a")
+    store.append(LABEL, result="L1")
+    store.append(ARITHMETIC, "+", "a", "1", "t1")
+    store.append(ASSIGNMENT, "=", "t1", result="a")
+    store.append(JUMP, "goto", result="L1")
+    return store
+
+@pytest.mark.parametrize("level", LEVELS)
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_quadruples_roundtrip(name, level):
+    code = compile_program(PROGRAMS[name], level).optimized.quadruples
+    assert QuadrupleStore.from_quadruples(code).to_quadruples() == code
+
+def test_operands_are_interned():
+    store = sample_store()
+    a, one = store.arg1[3], store.arg2[3]
+    assert a > 0 and store.operand_text(a) == "a"
+    assert store.is_constant(one) and store.operand_text(one) == "1"
+    assert store.arg1[1] == one and store.result[4] == a
+    assert store.defined(3) == store.result[3] and store.uses(3) == (a,)
+    assert store.operator(3) == "+"
+
+def test_label_index_follows_rewrite_and_delete():
+    store = sample_store()
+    label = store.result[2]
+    assert store.label_index(label) == 2 and store.jumps_to(label) == {5}
+    store.rewrite(5, result="L2")
+    assert not store.is_label_referenced(label)
+    store.delete(2)
+    assert store.label_index(label) is None
+    assert store.kinds[2] == TOMBSTONE and store.live_count == len(store) - 1
+
+def test_relocate_and_compact():
+    store = sample_store()
+    store.delete(4)
+    remap = store.relocate({2: [3]})
+    assert remap == [0, 1, 3, 2, -1, 4]
+    assert [quad.operator for quad in store.to_quadruples()] == ["", "=", "+", "", "goto"]
+    assert store.label_index(store.result[3]) == 3 and store.jumps_to(store.result[3]) == {4}
+    assert store.compact() == list(range(len(store)))
+
+def test_copy_is_independent():
+    store = sample_store()
+    clone = store.copy()
+    clone.rewrite(3, operator="*", arg2="2")
+    clone.delete(5)
+    assert store.operator(3) == "+" and store.operand_text(store.arg2[3]) == "1"
+    assert not store.is_deleted(5) and store.jumps_to(store.result[2]) == {5}
+    assert clone.to_quadruples() != store.to_quadruples()
@@ -0,0 +1,35 @@
+"""El lexer en streaming produce los mismos tokens y errores que tokenize"""
+from test_optimization_levels import PROGRAMS
+from app.compiler.lexer import Lexer
+from app.compiler.parser import Parser
+import pytest
+
+SOURCES = sorted(PROGRAMS.values()) + [
+    'function main() { string s = "ñandú"; @ é x = 1; /* año\n ü */ y = 2; // ß\n z = 3; }',
+    "a b",
+    "",
+]
+
+@pytest.mark.parametrize("source", SOURCES)
+@pytest.mark.parametrize("convert", [bytes, bytearray, memoryview], ids=["bytes", "bytearray", "memoryview"])
+def test_stream_over_buffers_matches_tokenize(source, convert):
+    lexer = Lexer()
+    expected, errors = lexer.tokenize(source)
+    assert list(lexer.stream(convert(source.encode("utf-8")))) == expected
+    assert lexer.errors == errors
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_stream_file(tmp_path, source):
+    path = tmp_path / "programa.src"
+    path.write_bytes(source.encode("utf-8"))
+    lexer = Lexer()
+    expected, errors = lexer.tokenize(source)
+    with open(path, "rb") as source_file:
+        assert list(lexer.stream_file(source_file)) == expected
+    assert lexer.errors == errors
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_parser_consumes_the_stream(name):
+    source = PROGRAMS[name]
+    tokens, _ = Lexer().tokenize(source)
+    assert Parser().parse(Lexer().stream(source.encode("utf-8"))) == Parser().parse(tokens)
@@ -0,0 +1,74 @@
+"""Movimiento de código invariante de bucles: solo se adelanta lo que no puede fallar"""
+from compiler_helpers import compile_program
+from test_optimization_levels import assert_equivalent, random_program
+from typing import List
+import pytest
+
+HOISTABLE = """
+function main() {
+    int n = 0;
+    while (n < 4) {
+        n = n + 1;
+    }
+    int s = 0;
+    int i = 0;
+    while (i < 3) {
+        s = s + n * n;
+        i = i + 1;
+    }
+    print(s);
+}
+"""
+
+# El bloque del if nunca se ejecuta: adelantar "s - 1" haría fallar el programa
+GUARDED_TYPE_ERROR = """
+function main() {
+    string s = "a";
+    int i = 0;
+    while (i < 3) {
+        if (i > 5) {
+            print(s - 1);
+        }
+        i = i + 1;
+    }
+    print(i);
+}
+"""
+
+# 1.5 * big lanza OverflowError en la segunda vuelta, después del primer print
+OVERFLOW_AFTER_OUTPUT = """
+function main() {
+    int big = 10;
+    int i = 0;
+    while (i < 9) {
+        big = big * big;
+        i = i + 1;
+    }
+    int j = 0;
+    while (j < 2) {
+        print(j);
+        float f = 1.5 * big;
+        print(f);
+        j = j + 1;
+    }
+}
+"""
+
+def operators_before_loop(source: str, level: str, loop_label: str) -> List[str]:
+    quadruples = compile_program(source, level).optimized.quadruples
+    labels = [quad.result for quad in quadruples]
+    return [quad.operator for quad in quadruples[:labels.index(loop_label)]]
+
+def test_typed_invariant_is_hoisted():
+    assert "*" in operators_before_loop(HOISTABLE, "O2", "while_start_2")
+    assert_equivalent(HOISTABLE)
+
+@pytest.mark.parametrize("source", [GUARDED_TYPE_ERROR, OVERFLOW_AFTER_OUTPUT], ids=["rama_no_ejecutada", "desborde"])
+def test_operations_that_may_fail_stay_in_the_loop(source):
+    assert_equivalent(source)
+
+def test_guarded_type_error_is_not_hoisted():
+    assert "-" not in operators_before_loop(GUARDED_TYPE_ERROR, "O2", "while_start_0")
+
+def test_random_program_with_float_overflow():
+    assert_equivalent(random_program(630))
@@ -0,0 +1,248 @@
+"""Equivalencia entre niveles de optimización y backends.
+
+Cada programa se compila en O0, O1, O2 y O3 y se ejecuta en la VM, en la
+máquina de cierres y como código objeto Python: todas las ejecuciones deben
+terminar igual (con o sin error) e imprimir lo mismo que O0 en la VM.
+"""
+from compiler_helpers import LEVELS, BACKENDS, compile_program, run
+from typing import List
+import pytest
+import random
+
+PROGRAMS = {
+    "bucles": """
+function main() {
+    int n = 5;
+    int k = 7;
+    int i = 0;
+    int s = 0;
+    while (i < n) {
+        int j = 0;
+        while (j < 3) {
+            s = s + n * k + j;
+            j = j + 1;
+        }
+        s = s + (k * 2 + n) / 3;
+        i = i + 1;
+    }
+    print(s);
+}
+""",
+    "subexpresiones": """
+function main() {
+    int a = 3;
+    int b = 4;
+    int c = a * b;
+    int i = 0;
+    while (i < 3) {
+        int e = i * b;
+        i = i + 1;
+        int f = i * b;
+        int g = b * i;
+        print(e + f + g);
+    }
+    print(a * b > c);
+    print(c < a * b);
+}
+""",
+    "funciones": """
+function int square(int x) {
+    return x * x;
+}
+function int add3(int a, int b, int c) {
+    int s = a + b;
+    return s + c;
+}
+function int fact(int n, int acc) {
+    if (n < 2) {
+        return acc;
+    }
+    return fact(n - 1, acc * n);
+}
+function int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+function show(int v) {
+    print(v);
+}
+function main() {
+    int i = 0;
+    int total = 0;
+    while (i < 5) {
+        total = total + square(i);
+        i = i + 1;
+    }
+    print(total);
+    print(add3(1, 2, 3));
+    print(fact(6, 1));
+    print(fib(10));
+    show(square(add3(i, 1, 2)));
+}
+""",
+    "tipos_mixtos": """
+function main() {
+    float f = 2.5;
+    f = f * 2.0;
+    print(f);
+    string s = "ab";
+    print(s + "cd");
+    bool c = 2.5 > 1;
+    print(c);
+    print(10 - 20);
+}
+""",
+    "division_entre_cero": """
+function main() {
+    int a = 7;
+    int z = 0;
+    print(a);
+    int q = a / z;
+    print(q);
+}
+""",
+    # Una definición muerta que puede fallar debe seguir fallando (user-030)
+    "division_muerta": """
+function main() {
+    int a = 7;
+    int z = a / 0;
+    print(a);
+}
+""",
+    "resta_muerta_de_string": """
+function main() {
+    string s = "a";
+    int z = s - 1;
+    print(1);
+}
+""",
+    "suma_muerta_sin_inicializar": """
+function main() {
+    int x;
+    int y = x + 1;
+    print(1);
+}
+""",
+    "producto_muerto_desbordado": """
+function main() {
+    int big = 10;
+    int i = 0;
+    while (i < 9) {
+        big = big * big;
+        i = i + 1;
+    }
+    float f = 1.5 * big;
+    print(i);
+}
+""",
+    # Los tipos declarados no se imponen en ejecución (user-035)
+    "tipo_declarado_no_impuesto": """
+function main() {
+    int k = 5;
+    k = k / 2.0;
+    print(k * 4);
+    int a = 3;
+    int b = (a < 5);
+    print(b + 0);
+    print(b * 1);
+    float x = 2.5;
+    print(x - x);
+}
+""",
+    # Una constante entera en una variable float no se convierte (user-037)
+    "constante_sin_conversion": """
+function main() {
+    float f = 3;
+    print(f);
+    float v = 1.5;
+    v = 3 - 1;
+    print(v);
+}
+""",
+    "reduccion_de_fuerza": """
+function main() {
+    int n = 7;
+    int i = 0;
+    int s = 0;
+    while (i < n) {
+        s = s + i * 4 + i * 2;
+        i = i + 1;
+    }
+    print(s / 2);
+    print(s * 8);
+    print(s - s);
+}
+""",
+}
+
+# --- Programas aleatorios ---
+
+VARIABLES = ("a", "b", "c", "d")
+
+def random_atom(rng: random.Random) -> str:
+    choice = rng.random()
+    if choice < 0.5:
+        return rng.choice(VARIABLES)
+    if choice < 0.75:
+        return str(rng.choice((0, 1, 2, 3, 4, 8)))
+    if choice < 0.9:
+        return rng.choice(("2.0", "0.5", "1.5"))
+    return f"({rng.choice(VARIABLES)} < {rng.randint(0, 5)})"
+
+def random_expression(rng: random.Random, depth: int = 0) -> str:
+    if depth > 2 or rng.random() < 0.3:
+        return random_atom(rng)
+    operator = rng.choice(("+", "-", "*", "/", "*", "-"))
+    if rng.random() < 0.15:
+        variable = rng.choice(VARIABLES)
+        return f"({variable} {operator} {variable})"
+    return f"({random_expression(rng, depth + 1)} {operator} {random_expression(rng, depth + 1)})"
+
+def random_statements(rng: random.Random, depth: int, counters: List[str]) -> str:
+    statements = []
+    for _ in range(rng.randint(1, 4)):
+        choice = rng.random()
+        if choice < 0.5 or depth > 2:
+            statements.append(f"{rng.choice(VARIABLES)} = {random_expression(rng)};")
+        elif choice < 0.7:
+            statements.append(f"print({random_expression(rng)});")
+        elif choice < 0.85:
+            condition = (f"{random_expression(rng, 1)} {rng.choice(('<', '>', '==', '!='))} "
+                         f"{random_expression(rng, 1)}")
+            statement = f"if ({condition}) {{ {random_statements(rng, depth + 1, counters)} }}"
+            if rng.random() < 0.5:
+                statement += f" else {{ {random_statements(rng, depth + 1, counters)} }}"
+            statements.append(statement)
+        else:
+            counter = f"i{len(counters)}"  # Cada bucle declara un contador distinto
+            counters.append(counter)
+            statements.append(f"int {counter} = 0; while ({counter} < {rng.randint(1, 4)}) "
+                              f"{{ {random_statements(rng, depth + 1, counters)} {counter} = {counter} + 1; }}")
+    return " ".join(statements)
+
+def random_program(seed: int) -> str:
+    rng = random.Random(seed)
+    declarations = " ".join(f"{rng.choice(('int', 'int', 'float'))} {variable} = "
+                            f"{rng.choice(('0', '1', '3', '5', '2.5'))};" for variable in VARIABLES)
+    prints = " ".join(f"print({variable});" for variable in VARIABLES)
+    return f"function main() {{ {declarations} {random_statements(rng, 0, [])} {prints} }}"
+
+def assert_equivalent(source: str):
+    reference = None
+    for level in LEVELS:
+        program = compile_program(source, level)
+        for backend in BACKENDS:
+            outcome = run(program, backend)
+            if reference is None:
+                reference = outcome
+            assert outcome == reference, f"{level}/{backend} difiere de O0/vm"
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_levels_and_backends_agree(name):
+    assert_equivalent(PROGRAMS[name])
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_programs_agree(seed):
+    assert_equivalent(random_program(seed))
@@ -0,0 +1,75 @@
+"""/api/run: estados y límites de ejecución en el pool de trabajadores, con ambos backends"""
+from fastapi.testclient import TestClient
+from app.main import app
+from app.compiler import sandbox
+from app.compiler.sandbox import BACKENDS, resource, worker_pool
+import app.api.compile as compile_api
+import signal
+import pytest
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+    worker_pool.shutdown()
+
+@pytest.fixture(autouse=True)
+def without_disk_cache(monkeypatch):
+    monkeypatch.setattr(compile_api, "disk_cache", None)
+
+def run(client: TestClient, code: str, backend: str, **limits) -> dict:
+    response = client.post("/api/run", json={"code": code, "backend": backend, **limits})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_ok(client, backend):
+    result = run(client, "function main() { int i = 0; while (i < 3) { print(i * 2); i = i + 1; } }", backend)
+    assert (result["success"], result["status"], result["output"]) == (True, "ok", ["0", "2", "4"])
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_runtime_error_keeps_previous_output(client, backend):
+    result = run(client, "function main() { int z = 0; print(1); print(5 / z); }", backend)
+    assert (result["success"], result["status"], result["output"]) == (False, "error", ["1"])
+    assert "división entre cero" in result["errors"][0]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_output_limit(client, backend):
+    result = run(client, "function main() { int i = 0; while (i < 1) { print(i); } }", backend, max_output=100)
+    assert (result["status"], result["truncated"]) == ("output_limit", True)
+    assert result["output"] == ["0"] * 50
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="requiere setitimer")
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cpu_limit(client, backend):
+    result = run(client, "function main() { int i = 0; while (i < 1) { i = i * 1; } }", backend, cpu_time=0.3)
+    assert result["status"] == "cpu_limit"
+    assert result["errors"] == ["Se superó el límite de tiempo de CPU (0.3 s)"]
+
+@pytest.mark.skipif(resource is None or not hasattr(resource, "RLIMIT_AS"), reason="requiere RLIMIT_AS")
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_memory_limit(client, backend):
+    code = 'function main() { string s = "ab"; int i = 0; while (i < 40) { s = s + s; i = i + 1; } print(1); }'
+    result = run(client, code, backend)
+    assert (result["status"], result["errors"]) == ("memory_limit", ["Se superó el límite de memoria"])
+
+def test_compile_error(client):
+    result = run(client, "function main() { print(x); }", "vm")
+    assert (result["success"], result["status"]) == (False, "compile_error")
+    assert result["errors"]
+
+@pytest.mark.parametrize("limits", [{"cpu_time": 0}, {"cpu_time": -1}, {"max_output": 0}])
+def test_non_positive_limits_are_rejected(client, limits):
+    response = client.post("/api/run", json={"code": "function main() { print(1); }", **limits})
+    assert response.status_code == 422
+
+def test_unknown_backend(client):
+    response = client.post("/api/run", json={"code": "function main() { print(1); }", "backend": "jvm"})
+    assert response.status_code == 400
+
+def test_output_capture_stops_at_the_limit():
+    capture = sandbox.OutputCapture(5)
+    capture.print("abc")
+    with pytest.raises(sandbox.OutputLimitExceeded):
+        capture.print("defg")
+    assert (capture.lines(), capture.truncated) == (["abc", "d"], True)
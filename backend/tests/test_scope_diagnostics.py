@@ -0,0 +1,54 @@
+"""Diagnósticos de variables no usadas / no inicializadas emitidos al cerrar cada scope"""
+from test_optimization_levels import PROGRAMS
+from test_semantic_cache import analyze
+from app.models.schemas import SymbolTable, SymbolType
+from typing import List
+import pytest
+
+NESTED = """function int f(int p) {
+    int a;
+    int b;
+    if (p > 0) {
+        int c;
+        int d = c + b;
+        while (p < 3) {
+            int e;
+            p = p + d;
+        }
+    }
+    return a;
+}
+function main() { int unused = 1; print(f(1)); }"""
+
+def table_walk(table: SymbolTable, message: str, selected) -> List[str]:
+    """Los mismos diagnósticos recorriendo la tabla de símbolos ya completa, en preorden"""
+    found = [f"Variable '{name}' {message} en scope '{symbol.scope}'"
+             for name, symbol in table.symbols.items()
+             if symbol.symbol_type == SymbolType.VARIABLE and selected(symbol)]
+    for child in table.children:
+        found.extend(table_walk(child, message, selected))
+    return found
+
+def scope_warnings(result) -> List[str]:
+    return [warning for warning in result.warnings if " en scope '" in warning]
+
+@pytest.mark.parametrize("source", [NESTED] + [PROGRAMS[name] for name in sorted(PROGRAMS)])
+def test_matches_walk_of_final_symbol_table(source):
+    result = analyze(source)[1]
+    expected = (table_walk(result.symbol_table, "declarada pero no usada", lambda symbol: not symbol.used) +
+                table_walk(result.symbol_table, "usada pero no inicializada",
+                           lambda symbol: symbol.used and not symbol.initialized))
+    assert scope_warnings(result) == expected
+
+def test_nested_scopes():
+    assert scope_warnings(analyze(NESTED)[1]) == [
+        "Variable 'e' declarada pero no usada en scope 'while_block_11'",
+        "Variable 'unused' declarada pero no usada en scope 'main'",
+        "Variable 'a' usada pero no inicializada en scope 'f'",
+        "Variable 'b' usada pero no inicializada en scope 'f'",
+        "Variable 'c' usada pero no inicializada en scope 'if_block_12'",
+    ]
+
+def test_use_in_inner_scope_marks_outer_variable():
+    source = "function main() { int x = 1; int i = 0; while (i < 2) { i = i + x; } }"
+    assert scope_warnings(analyze(source)[1]) == []
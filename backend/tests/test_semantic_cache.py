@@ -0,0 +1,62 @@
+"""Caché de análisis semántico por función (app.compiler.semantic.SemanticCache)"""
+from test_optimization_levels import PROGRAMS
+from app.compiler.lexer import Lexer
+from app.compiler.parser import Parser
+from app.compiler.semantic import SemanticAnalyzer, SemanticCache
+import contextlib
+import io
+import pytest
+
+def analyze(source: str, cache: SemanticCache = None):
+    """(analizador, resultado) del análisis semántico del programa"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokens, _ = Lexer().tokenize(source)
+        ast, errors = Parser().parse(tokens)
+        assert not errors, errors
+        analyzer = SemanticAnalyzer(cache)
+        return analyzer, analyzer.analyze(ast)
+
+CALLEE = "function int f(int x) { int unused; int y; return x + y; }"
+CALLER = "function main() { print(f(2)); }"
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_cached_analysis_matches_fresh_analysis(name):
+    cache = SemanticCache()
+    expected = analyze(PROGRAMS[name])[1].model_dump()
+    assert analyze(PROGRAMS[name], cache)[1].model_dump() == expected
+    analyzer, result = analyze(PROGRAMS[name], cache)
+    assert analyzer.reused_functions and cache.hits == len(analyzer.reused_functions)
+    assert result.model_dump() == expected
+
+def test_reused_function_keeps_its_diagnostics():
+    cache = SemanticCache()
+    source = f"{CALLEE} {CALLER}"
+    fresh = analyze(source)[1]
+    analyze(source, cache)
+    analyzer, result = analyze(source, cache)
+    assert analyzer.reused_functions == ["f", "main"]
+    assert result.warnings == fresh.warnings
+    assert "Variable 'unused' declarada pero no usada en scope 'f'" in result.warnings
+
+def test_only_the_edited_function_is_analyzed_again():
+    cache = SemanticCache()
+    analyze(f"{CALLEE} {CALLER}", cache)
+    edited = f"{CALLEE} function main() {{ print(f(3)); }}"
+    analyzer, result = analyze(edited, cache)
+    assert analyzer.reused_functions == ["f"]
+    assert result.model_dump() == analyze(edited)[1].model_dump()
+
+def test_changed_signature_invalidates_callers():
+    cache = SemanticCache()
+    analyze(f"{CALLEE} {CALLER}", cache)
+    changed = f"function int f(int x, int z) {{ return x + z; }} {CALLER}"
+    analyzer, result = analyze(changed, cache)
+    assert analyzer.reused_functions == []
+    assert result.errors == ["La función 'f' espera 2 argumentos pero recibe 1 (línea 1)"]
+
+def test_lru_eviction():
+    cache = SemanticCache(max_entries=2)
+    analyze(PROGRAMS["funciones"], cache)
+    assert len(cache.entries) == 2
+    cache.clear()
+    assert (len(cache.entries), cache.hits, cache.misses) == (0, 0, 0)
@@ -0,0 +1,85 @@
+"""Ejecución por lotes vectorizada: cada carril termina igual que en la VM escalar"""
+from compiler_helpers import compile_program
+from app.compiler.vm import VMProgram, VirtualMachine
+from app.compiler.vectorized import VectorizedMachine, np
+import pytest
+
+pytestmark = pytest.mark.skipif(np is None, reason="requiere NumPy")
+
+PROGRAMS = {
+    "collatz": ("steps", """
+function int steps(int n) {
+    int s = 0;
+    while (n != 1) {
+        if (n - (n / 2) * 2 == 0) { n = n / 2; } else { n = 3 * n + 1; }
+        s = s + 1;
+    }
+    return s;
+}
+function main() { print(steps(27)); }
+"""),
+    "ramas": ("grade", """
+function int grade(int a, int b, int c) {
+    int total = a * 3 + b * 2 + c;
+    int q = total / (a - b);
+    if (total < 50) { print(0); return 0; }
+    if (total < 100) { print(1); }
+    else { print(2); }
+    int i = 0;
+    while (i < c) { total = total * 2; i = i + 1; }
+    print(q);
+    return total;
+}
+function main() { print(grade(1, 2, 3)); }
+"""),
+    "llamadas": ("f", """
+function int sq(int x) { return x * x; }
+function int f(int a, int b) {
+    if (a < b) { return sq(a) + b; }
+    return a - b;
+}
+function main() { print(f(1, 2)); }
+"""),
+    "doble": ("double", """
+function int double(int x) {
+    print(x);
+    print(x * 2);
+    return x * 2 + x * 2;
+}
+function main() { print(double(1)); }
+"""),
+}
+
+def outcome(result):
+    return (result.status, result.output, result.return_value, result.error)
+
+def assert_matches_scalar(name: str, inputs):
+    entry, source = PROGRAMS[name]
+    program = VMProgram.from_quadruples(compile_program(source, "O2").optimized.quadruples)
+    batch = VectorizedMachine(program).run(inputs, entry)
+    for arguments, result in zip(inputs, batch.results):
+        expected = VirtualMachine(program).run(entry, list(arguments))
+        assert outcome(result) == outcome(expected), arguments
+    return batch
+
+def test_integer_lanes_are_vectorized():
+    batch = assert_matches_scalar("collatz", [(n,) for n in range(1, 200)])
+    assert batch.vectorized > 0
+
+def test_divergent_branches_and_errors():
+    inputs = [(a, b, c) for a in range(-3, 12, 2) for b in range(0, 10, 3) for c in range(0, 4)]
+    assert_matches_scalar("ramas", inputs)
+
+def test_calls_fall_back_to_the_vm():
+    assert_matches_scalar("llamadas", [(a, b) for a in range(10) for b in range(10)])
+
+@pytest.mark.parametrize("column", [
+    [1, 1.5] * 8,
+    [True, 2] * 8,
+    [False, 2.5, 3] * 6,
+    [2 ** 70, 1] * 8,
+    ["a", 1] * 8,
+], ids=["int_float", "bool_int", "bool_float_int", "int_enorme", "string_int"])
+def test_mixed_columns_are_not_promoted(column):
+    batch = assert_matches_scalar("doble", [(value,) for value in column])
+    assert batch.results[0].output == [str(column[0]), str(column[0] * 2)]